@@ -3,7 +3,7 @@ Application configurations
 """
 
 import os
-from typing import Type
+from typing import Literal, Type
 from functools import lru_cache
 import logging
 from pydantic import Field
@@ -16,6 +16,17 @@ from pydantic_settings import (
 from app.constants import VAULT_API_KEY_FIELD_NAME
 
 
+class TimeoutSettings(BaseSettings):
+    """
+    Upstream request timeouts in seconds
+    """
+
+    connect: float = 5.0
+    read: float = 5.0
+    write: float = 5.0
+    pool: float = 5.0
+
+
 class APISixInstanceSettings(BaseSettings):
     """
     APISix instance settings model
@@ -24,6 +35,8 @@ class APISixInstanceSettings(BaseSettings):
     name: str
     admin_url: str
     admin_api_key: str
+    http2: bool = False
+    timeout: TimeoutSettings = Field(default_factory=TimeoutSettings)
 
 
 class APISixSettings(BaseSettings):
@@ -34,6 +47,12 @@ class APISixSettings(BaseSettings):
     key_path: str
     key_name: str = VAULT_API_KEY_FIELD_NAME
     global_gateway_url: str
+    route_refresh_interval: int = 60
+    # How read-only requests are spread over the instances:
+    # "all" queries every instance, "primary" queries the first instance and falls back to the
+    # next one on error, "hedged" also queries the next instance if no answer in hedge_delay
+    read_strategy: Literal["all", "primary", "hedged"] = "primary"
+    hedge_delay: float = 0.2
     instances: list[APISixInstanceSettings]
 
 
@@ -45,6 +64,8 @@ class VaultInstanceSettings(BaseSettings):
     name: str
     url: str
     token: str
+    http2: bool = False
+    timeout: TimeoutSettings = Field(default_factory=TimeoutSettings)
 
 
 class VaultSettings(BaseSettings):
@@ -66,6 +87,12 @@ class KeyCloakSettings(BaseSettings):
     realm: str
     client_id: str
     client_secret: str
+    http2: bool = False
+    timeout: TimeoutSettings = Field(default_factory=TimeoutSettings)
+    jwks_refresh_interval: int = 300
+    jwks_min_refresh_interval: int = 30
+    jwks_timeout: float = 5.0
+    service_account_refresh_margin: int = 30
 
 
 class StatusServiceSettings(BaseSettings):
@@ -80,10 +107,110 @@ class StatusSettings(BaseSettings):
 
     max_attempts: int = 3
     retry_delay: int = 2
+    # Not used anymore, the services are polled every poll_interval seconds
     cache_ttl: int = 30
+    poll_interval: int = 30
+    stale_after: int = 90
+    # Number of checks kept per service and the windows in seconds reported by /status/history
+    history_size: int = 3000
+    history_windows: list[int] = [3600, 86400]
+    # Seconds between the keep-alive comments sent on /status/stream
+    stream_heartbeat: int = 15
     services: list[StatusServiceSettings] = []
 
 
+class HTTPClientSettings(BaseSettings):
+    """
+    Upstream HTTP client connection pool settings model
+    """
+
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+
+
+class CacheSettings(BaseSettings):
+    """
+    In-memory cache settings model
+    """
+
+    token_max_size: int = 1024
+    provisioned_users_max_size: int = 10000
+    # The cache is per process, other workers and replicas only notice that a user's key was
+    # removed or the user disabled when their entry expires, so keep this to a few seconds
+    provisioned_users_ttl: int = 10
+    keycloak_users_max_size: int = 1000
+    keycloak_users_ttl: int = 10
+    keycloak_groups_ttl: int = 60
+    snapshot_bodies_max_size: int = 256
+
+
+class CompressionSettings(BaseSettings):
+    """
+    Response compression settings model
+    """
+
+    enabled: bool = True
+    minimum_size: int = 500
+    gzip_level: int = 6
+    brotli_quality: int = 5
+
+
+class ServerTimingSettings(BaseSettings):
+    """
+    Server-Timing response header settings model
+    """
+
+    # The header is sent to every client, unauthenticated ones included, and reveals the
+    # upstream instances and their latencies, so only enable it where that is acceptable
+    enabled: bool = False
+    # Log the chain of upstream calls that determined the response time at debug level
+    log_critical_path: bool = False
+
+
+class TracingSettings(BaseSettings):
+    """
+    Request tracing settings model
+    """
+
+    enabled: bool = True
+    buffer_size: int = 200
+    # Only traces taking at least this long are kept
+    slow_threshold_ms: float = 500
+    max_spans: int = 1000
+    # Long-lived or scraped endpoints that would crowd out the interesting traces
+    excluded_paths: list[str] = ["/metrics", "/status/stream"]
+
+
+class MetricsSettings(BaseSettings):
+    """
+    Prometheus metrics settings model
+    """
+
+    enabled: bool = True
+
+
+class CircuitBreakerSettings(BaseSettings):
+    """
+    Circuit breaker settings model, applied to each Vault, APISIX and Keycloak instance
+    """
+
+    enabled: bool = True
+    failure_rate_threshold: float = 0.5
+    minimum_calls: int = 5
+    window_size: int = 20
+    open_seconds: float = 30.0
+
+
+class AdminSettings(BaseSettings):
+    """
+    Admin operations settings model
+    """
+
+    bulk_concurrency: int = 10
+    bulk_max_users: int = 1000
+
+
 class ServerSettings(BaseSettings):
     """
     FastAPI server settings model
@@ -107,6 +234,14 @@ class Settings(BaseSettings):
     vault: VaultSettings
     keycloak: KeyCloakSettings
     status: StatusSettings
+    http_client: HTTPClientSettings = Field(default_factory=HTTPClientSettings)
+    cache: CacheSettings = Field(default_factory=CacheSettings)
+    admin: AdminSettings = Field(default_factory=AdminSettings)
+    circuit_breaker: CircuitBreakerSettings = Field(default_factory=CircuitBreakerSettings)
+    compression: CompressionSettings = Field(default_factory=CompressionSettings)
+    metrics: MetricsSettings = Field(default_factory=MetricsSettings)
+    server_timing: ServerTimingSettings = Field(default_factory=ServerTimingSettings)
+    tracing: TracingSettings = Field(default_factory=TracingSettings)
 
     # Look first for specific config file or config.yaml
     # and fall back to the default config.default.yaml
@@ -2,26 +2,272 @@
 HTTP client dependency to make async http requests
 """
 
-from typing import AsyncGenerator, Mapping, Any, Tuple
-from httpx import AsyncClient, Response
+import time
+from functools import lru_cache
+from typing import AsyncGenerator, Mapping, Any, NamedTuple, Tuple
+from httpx import (
+    AsyncClient,
+    AsyncHTTPTransport,
+    Limits,
+    Response,
+    Timeout,
+    TransportError,
+    URL,
+    USE_CLIENT_DEFAULT,
+)
+from app.config import settings, logger, TimeoutSettings
+from app.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.utils.metrics import UPSTREAM_DURATION, UPSTREAM_ERRORS
+from app.utils.report import record_upstream_timing
+from app.utils.tracing import current_traceparent, span
+
+config = settings()
+
+# Circuit breakers of the configured upstreams, keyed by the upstream name
+_circuit_breakers: dict[str, CircuitBreaker] = {}
+
+# Process wide client shared by all requests so that upstream connections are kept warm,
+# set on startup and cleared on shutdown
+_client: AsyncClient | None = None  # pylint: disable=invalid-name
+
+
+def create_limits() -> Limits:
+    """
+    Create the connection pool limits from the configuration.
+
+    Returns:
+        Limits: The connection pool limits.
+    """
+    return Limits(
+        max_connections=config.http_client.max_connections,
+        max_keepalive_connections=config.http_client.max_keepalive_connections,
+        keepalive_expiry=config.http_client.keepalive_expiry,
+    )
+
+
+def mount_pattern(url: str) -> str:
+    """
+    Create a httpx mount pattern matching the scheme, host and port of the given url.
+
+    Args:
+        url (str): The base url of an upstream.
+
+    Returns:
+        str: The mount pattern, e.g. 'http://127.0.0.1:8200'.
+    """
+    parsed = URL(url)
+    port = f":{parsed.port}" if parsed.port else ""
+    return f"{parsed.scheme}://{parsed.host}{port}"
+
+
+class Upstream(NamedTuple):
+    """
+    A configured upstream instance.
+
+    Attributes:
+        name (str): The upstream name, e.g. 'vault:EWC'.
+        url (str): The base url of the upstream.
+        http2 (bool): Whether HTTP/2 is used with the upstream.
+        timeout (TimeoutSettings): The request timeouts of the upstream.
+    """
+
+    name: str
+    url: str
+    http2: bool
+    timeout: TimeoutSettings
+
+
+@lru_cache
+def configured_upstreams() -> tuple[Upstream, ...]:
+    """
+    List the configured Vault, APISIX and Keycloak instances.
+    The list is built on first use and then shared, the configuration does not change.
+
+    Returns:
+        tuple[Upstream, ...]: The configured upstreams.
+    """
+    return (
+        *[
+            Upstream(f"vault:{instance.name}", instance.url, instance.http2, instance.timeout)
+            for instance in config.vault.instances
+        ],
+        *[
+            Upstream(
+                f"apisix:{instance.name}", instance.admin_url, instance.http2, instance.timeout
+            )
+            for instance in config.apisix.instances
+        ],
+        Upstream("keycloak", config.keycloak.url, config.keycloak.http2, config.keycloak.timeout),
+    )
+
+
+def belongs_to(url: str, base_url: str) -> bool:
+    """
+    Check whether a url is the base url or below it, e.g. 'http://vault:8200/v1'
+    belongs to 'http://vault:8200' but 'http://vault:82001' does not.
+
+    Args:
+        url (str): The requested url.
+        base_url (str): The base url of an upstream.
+
+    Returns:
+        bool: True if the url is the base url or a path below it.
+    """
+    base_url = base_url.rstrip("/")
+    return url.startswith(base_url) and url[len(base_url) : len(base_url) + 1] in ("", "/")
+
+
+def find_upstream(url: str) -> Upstream | None:
+    """
+    Find the configured upstream the url belongs to.
+
+    Args:
+        url (str): The requested url.
+
+    Returns:
+        Upstream | None: The upstream with the longest matching base url, if any.
+    """
+    matches = [upstream for upstream in configured_upstreams() if belongs_to(url, upstream.url)]
+    return max(matches, key=lambda upstream: len(upstream.url), default=None)
+
+
+def resolve_upstream(url: str) -> str:
+    """
+    Resolve the name of the upstream the url belongs to.
+
+    Args:
+        url (str): The requested url.
+
+    Returns:
+        str: The upstream name or the host of the url for unknown upstreams.
+    """
+    if (upstream := find_upstream(url)) is not None:
+        return upstream.name
+    return URL(url).host
+
+
+def create_timeout(timeout: TimeoutSettings) -> Timeout:
+    """
+    Create httpx timeouts from the timeout settings.
+
+    Args:
+        timeout (TimeoutSettings): The timeout settings of an upstream.
+
+    Returns:
+        Timeout: The httpx timeouts.
+    """
+    return Timeout(
+        connect=timeout.connect, read=timeout.read, write=timeout.write, pool=timeout.pool
+    )
+
+
+def get_circuit_breakers() -> dict[str, CircuitBreaker]:
+    """
+    Get the circuit breakers of all the configured upstreams.
+
+    Returns:
+        dict[str, CircuitBreaker]: The circuit breakers keyed by the upstream name,
+            empty if circuit breakers are disabled.
+    """
+    if not config.circuit_breaker.enabled:
+        return {}
+    for upstream in configured_upstreams():
+        if upstream.name not in _circuit_breakers:
+            _circuit_breakers[upstream.name] = CircuitBreaker(
+                upstream.name,
+                failure_rate_threshold=config.circuit_breaker.failure_rate_threshold,
+                minimum_calls=config.circuit_breaker.minimum_calls,
+                window_size=config.circuit_breaker.window_size,
+                open_seconds=config.circuit_breaker.open_seconds,
+            )
+    return _circuit_breakers
+
+
+def reset_circuit_breakers() -> None:
+    """
+    Forget the state of all the circuit breakers.
+    """
+    _circuit_breakers.clear()
+
+
+def create_upstream_mounts() -> dict[str, AsyncHTTPTransport]:
+    """
+    Create a dedicated transport, and thus connection pool, for each upstream.
+    A slow upstream can then only exhaust its own connections, not those of the others.
+
+    Returns:
+        dict[str, AsyncHTTPTransport]: Transports keyed by their mount pattern.
+    """
+    return {
+        mount_pattern(upstream.url): AsyncHTTPTransport(
+            limits=create_limits(), http2=upstream.http2
+        )
+        for upstream in configured_upstreams()
+    }
+
+
+def create_http_client() -> AsyncClient:
+    """
+    Create the pooled HTTP client used for all upstream requests.
+
+    Returns:
+        AsyncClient: The HTTP client.
+    """
+    return AsyncClient(limits=create_limits(), mounts=create_upstream_mounts())
+
+
+async def open_http_client() -> AsyncClient:
+    """
+    Open the process wide HTTP client. Called on application startup.
+
+    Returns:
+        AsyncClient: The opened HTTP client.
+    """
+    global _client  # pylint: disable=global-statement
+    if _client is None:
+        _client = create_http_client()
+        logger.debug("Opened pooled HTTP client")
+    return _client
+
+
+async def close_http_client() -> None:
+    """
+    Close the process wide HTTP client and its connections. Called on application shutdown.
+    """
+    global _client  # pylint: disable=global-statement
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        logger.debug("Closed pooled HTTP client")
+
+
+async def shared_http_client() -> AsyncClient:
+    """
+    Get the process wide HTTP client, opening it if the application has not done so yet.
+
+    Returns:
+        AsyncClient: The HTTP client.
+    """
+    return _client or await open_http_client()
 
 
 async def get_http_client() -> AsyncGenerator[AsyncClient, None]:
     """
-    Create and provide an HTTP client for making requests.
+    Provide the pooled HTTP client for making requests.
 
-    This function is a context manager that creates an AsyncClient instance,
-    yields it for use, and then properly closes the client when done.
+    The client is owned by the application lifespan and shared between requests
+    so that connections to the upstreams are reused. If the application has not
+    been started through its lifespan (e.g. in tests) the client is opened lazily.
 
     Yields:
         AsyncClient: The HTTP client to use for making requests.
     """
-    async with AsyncClient() as client:
-        yield client
+    yield await shared_http_client()
 
 
 # pylint: disable=too-many-arguments,too-many-positional-arguments
-async def http_request(
+# The state of the call is shared by the timings, metrics, trace and circuit breaker
+async def http_request(  # pylint: disable=too-many-locals
     client: AsyncClient,
     method: str,
     url: str,
@@ -57,10 +303,53 @@ async def http_request(
     Raises:
         RequestError: If there is an error sending the request
                       or if the response status code is not valid.
+        CircuitOpenError: If the upstream is failing and is not called.
     """
-    response: Response = await client.request(
-        method=method, url=url, headers=headers, params=params, json=json, data=data
-    )
+    upstream = find_upstream(url)
+    upstream_name = upstream.name if upstream else URL(url).host
+    generation = 0
+    # Only configured upstreams have a breaker, e.g. monitored external services do not
+    if (circuit_breaker := get_circuit_breakers().get(upstream_name)) is not None:
+        try:
+            generation = circuit_breaker.before_call()
+        except CircuitOpenError:
+            UPSTREAM_ERRORS.labels(upstream_name, "circuit_open").inc()
+            raise
+
+    with span("http_request", upstream=upstream_name, method=method) as request_span:
+        # The trace is only propagated to the configured Vault, APISIX and Keycloak instances
+        if upstream is not None and (traceparent := current_traceparent()) is not None:
+            headers = {**(headers or {}), "traceparent": traceparent}
+
+        success = None
+        error_reason = "transport"
+        started = time.perf_counter()
+        try:
+            response: Response = await client.request(
+                method=method,
+                url=url,
+                headers=headers,
+                params=params,
+                json=json,
+                data=data,
+                timeout=create_timeout(upstream.timeout) if upstream else USE_CLIENT_DEFAULT,
+            )
+            success = response.status_code < 500
+            error_reason = "server_error"
+        except TransportError:
+            success = False
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            record_upstream_timing(upstream_name, elapsed, method=method, started=started)
+            UPSTREAM_DURATION.labels(upstream_name, method).observe(elapsed)
+            if success is False:
+                UPSTREAM_ERRORS.labels(upstream_name, error_reason).inc()
+            if circuit_breaker is not None:
+                circuit_breaker.record(success, generation)
+
+        if request_span is not None:
+            request_span.attributes["status_code"] = response.status_code
 
     if valid_status_codes is None or response.status_code not in valid_status_codes:
         response.raise_for_status()
@@ -0,0 +1,159 @@
+"""
+Process wide store for the Keycloak realm signing keys (JWKS)
+"""
+
+import asyncio
+import time
+import jwt
+from httpx import HTTPError
+from jwt import PyJWK, PyJWKClientConnectionError, PyJWKClientError, PyJWKSet, PyJWTError
+from app.config import settings, logger
+from app.dependencies.http_client import http_request, shared_http_client
+from app.utils.cache import CacheStats
+
+config = settings()
+
+
+async def fetch_jwks(jwks_url: str) -> dict:
+    """
+    Download the JSON Web Key Set from given url.
+
+    The keys are fetched with the shared async HTTP client so that a slow Keycloak
+    does not block the event loop. The fetch is limited to `keycloak.jwks_timeout` seconds.
+
+    Args:
+        jwks_url (str): The url of the JWKS endpoint.
+
+    Returns:
+        dict: The raw JWKS document.
+
+    Raises:
+        PyJWKClientConnectionError: If the keys could not be fetched in time.
+    """
+    try:
+        client = await shared_http_client()
+        async with asyncio.timeout(config.keycloak.jwks_timeout):
+            response = await http_request(client, "GET", jwks_url)
+        jwk_set: dict = response.json()
+        return jwk_set
+    except (HTTPError, TimeoutError, ValueError) as e:
+        raise PyJWKClientConnectionError(f"Failed to fetch JWKS from '{jwks_url}': {e!r}") from e
+
+
+# The settings, keys and refresh state of the store belong together
+class JWKSStore:  # pylint: disable=too-many-instance-attributes
+    """
+    Keeps the realm signing keys in memory indexed by their key id ('kid').
+
+    Keys are refreshed when they are older than `refresh_interval` seconds and when a token
+    is signed with an unknown key id (key rotation). Refreshes forced by unknown key ids
+    are limited to one per `min_refresh_interval` seconds so that tokens with bogus key ids
+    cannot be used to hammer Keycloak. Scheduled refreshes run in the background while the
+    current keys keep being served.
+    """
+
+    def __init__(self, jwks_url: str, refresh_interval: float, min_refresh_interval: float):
+        self.jwks_url = jwks_url
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self.stats = CacheStats(name="jwks")
+        self._keys: dict[str, PyJWK] = {}
+        self._fetched_at: float | None = None
+        self._lock = asyncio.Lock()
+        self._background_refresh: asyncio.Task | None = None
+
+    def _age(self) -> float:
+        if self._fetched_at is None:
+            return float("inf")
+        return time.monotonic() - self._fetched_at
+
+    async def refresh(self, max_age: float = 0) -> None:
+        """
+        Reload the keys from Keycloak unless they are younger than `max_age` seconds.
+
+        Concurrent callers wait for the same refresh. If the refresh fails
+        the previously loaded keys are kept.
+
+        Args:
+            max_age (float): Skip the refresh if the keys were loaded within this many seconds.
+
+        Raises:
+            PyJWTError: If the keys could not be loaded and there are no previous keys.
+        """
+        async with self._lock:
+            if self._age() < max_age:
+                return
+            try:
+                jwk_set = PyJWKSet.from_dict(await fetch_jwks(self.jwks_url))
+            except PyJWTError:
+                if not self._keys:
+                    raise
+                logger.exception("Failed to refresh JWKS, keeping the previously loaded keys")
+                return
+            finally:
+                # Failed refreshes are also rate limited
+                self._fetched_at = time.monotonic()
+
+            self._keys = {key.key_id: key for key in jwk_set.keys if key.key_id}
+            self.stats.refresh()
+            logger.debug("Loaded %d signing key(s) from JWKS", len(self._keys))
+
+    def _refresh_in_background(self) -> None:
+        if self._background_refresh is None or self._background_refresh.done():
+            self._background_refresh = asyncio.create_task(
+                self.refresh(max_age=self.refresh_interval)
+            )
+
+    async def get_signing_key(self, kid: str) -> PyJWK:
+        """
+        Get the signing key matching given key id.
+
+        Args:
+            kid (str): The key id from the token header.
+
+        Returns:
+            PyJWK: The matching signing key.
+
+        Raises:
+            PyJWKClientError: If there is no key matching the key id.
+        """
+        if self._age() >= self.refresh_interval:
+            if self._keys:
+                self._refresh_in_background()
+            else:
+                await self.refresh(max_age=self.refresh_interval)
+
+        if (key := self._keys.get(kid)) is not None:
+            self.stats.hit()
+            return key
+
+        self.stats.miss()
+        # The realm keys may have been rotated
+        await self.refresh(max_age=self.min_refresh_interval)
+
+        if (key := self._keys.get(kid)) is None:
+            raise PyJWKClientError(f'Unable to find a signing key that matches: "{kid}"')
+        return key
+
+    async def get_signing_key_from_jwt(self, token: str) -> PyJWK:
+        """
+        Get the signing key for given token based on the key id in its header.
+
+        Args:
+            token (str): The encoded JWT.
+
+        Returns:
+            PyJWK: The matching signing key.
+
+        Raises:
+            PyJWTError: If the token header cannot be decoded or there is no matching key.
+        """
+        header = jwt.get_unverified_header(token)
+        return await self.get_signing_key(header.get("kid", ""))
+
+
+jwks_store = JWKSStore(
+    f"{config.keycloak.url}/realms/{config.keycloak.realm}/protocol/openid-connect/certs",
+    refresh_interval=config.keycloak.jwks_refresh_interval,
+    min_refresh_interval=config.keycloak.jwks_min_refresh_interval,
+)
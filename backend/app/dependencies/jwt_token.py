@@ -3,19 +3,27 @@ JWT Token dependency
 """
 
 from http import HTTPStatus
+import hashlib
 import jwt
-from jwt import ExpiredSignatureError, PyJWKClient, PyJWTError
+from jwt import ExpiredSignatureError, PyJWTError
 from pydantic import ValidationError
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from app.config import settings, logger
+from app.dependencies.jwks import jwks_store
 from app.models.request import AccessToken
 from app.constants import ADMIN_GROUP
+from app.utils.cache import LRUCache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="tokenUrl")
 
 config = settings()
 
+# Verified tokens keyed by the SHA256 digest of the raw token, kept until the token expires
+token_cache: LRUCache[AccessToken] = LRUCache(
+    max_size=config.cache.token_max_size, name="access_tokens"
+)
+
 
 async def validate_token(token: str = Depends(oauth2_scheme)) -> AccessToken:
     """
@@ -26,14 +34,16 @@ async def validate_token(token: str = Depends(oauth2_scheme)) -> AccessToken:
         raise HTTPException(
             status_code=HTTPStatus.UNAUTHORIZED, detail="Token has not been provided"
         )
+    token_digest = hashlib.sha256(token.encode()).hexdigest()
+    if (access_token := token_cache.get(token_digest)) is not None:
+        return access_token
     try:
-        jwks_url = (
-            f"{config.keycloak.url}/realms/{config.keycloak.realm}" "/protocol/openid-connect/certs"
-        )
-        jwks_client = PyJWKClient(jwks_url)
-        signing_key = jwks_client.get_signing_key_from_jwt(token)
+        signing_key = await jwks_store.get_signing_key_from_jwt(token)
         payload = jwt.decode(token, signing_key.key, algorithms=["RS256"], audience="account")
-        return AccessToken(**payload)
+        access_token = AccessToken(**payload)
+        if "exp" in payload:
+            token_cache.set(token_digest, access_token, expires_at=payload["exp"])
+        return access_token
     except ExpiredSignatureError as e:
         logger.exception("JWT Token has expired: %s", e)
         raise HTTPException(
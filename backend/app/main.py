@@ -2,17 +2,47 @@
 Defines the FastAPI app.
 """
 
+from typing import AsyncGenerator
+from contextlib import asynccontextmanager
 import uvicorn
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import HTTPException
 from app.exceptions import http_exception_handler, general_exception_handler
-from app.routers import admin, apikey, routes, health, status
+from app.routers import admin, apikey, routes, health, status, metrics
+from app.dependencies.http_client import open_http_client, close_http_client
+from app.services.route_catalog import route_catalog
+from app.services.keycloak import service_account_token
+from app.services.status import status_poller
+from app.utils.compression import CompressionMiddleware
+from app.utils.metrics import MetricsMiddleware, mark_worker_stopped
+from app.utils.server_timing import ServerTimingMiddleware
+from app.utils.tracing import TracingMiddleware
 from app.config import settings
 
 config = settings()
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncGenerator[None, None]:
+    """
+    Open shared resources on startup and release them on shutdown
+    """
+    client = await open_http_client()
+    service_account_token.start(client)
+    route_catalog.start(client)
+    status_poller.start(client)
+    yield
+    await status_poller.stop()
+    await route_catalog.stop()
+    await service_account_token.stop()
+    await close_http_client()
+    mark_worker_stopped()
+
+
+# Snapshot-backed endpoints return pre-serialized bytes, the rest is encoded with orjson
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Middleware
 app.add_middleware(
@@ -22,6 +52,15 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if config.tracing.enabled:
+    app.add_middleware(TracingMiddleware, settings=config.tracing)
+if config.server_timing.enabled:
+    app.add_middleware(ServerTimingMiddleware, settings=config.server_timing)
+if config.compression.enabled:
+    app.add_middleware(CompressionMiddleware, settings=config.compression)
+# Added last so that it is the outermost and times the other middleware too
+if config.metrics.enabled:
+    app.add_middleware(MetricsMiddleware)
 
 # Exception handlers
 app.add_exception_handler(HTTPException, http_exception_handler)
@@ -33,6 +72,8 @@ app.include_router(admin.router)
 app.include_router(routes.router)
 app.include_router(health.router)
 app.include_router(status.router)
+if config.metrics.enabled:
+    app.include_router(metrics.router)
 
 
 def start_dev() -> None:
@@ -0,0 +1,20 @@
+"""
+API key models
+"""
+
+from pydantic import BaseModel
+
+
+class ProvisionedUser(BaseModel):
+    """
+    Represents a user whose API key has been confirmed to exist in Vault and APISIX instances.
+
+    Attributes:
+        api_key (str): The user's API key.
+        vault_instances (frozenset[str]): The Vault instances where the user was confirmed.
+        apisix_instances (frozenset[str]): The APISIX instances where the user was confirmed.
+    """
+
+    api_key: str
+    vault_instances: frozenset[str]
+    apisix_instances: frozenset[str]
@@ -80,3 +80,33 @@ class APISixRoutes(BaseModel):
             for route in value
             if route.get("value", {}).get("plugins", {}).get("key-auth") is not None
         ]
+
+
+class APISixRoute(BaseModel):
+    """
+    Represents a key-auth route in APISix.
+
+    Attributes:
+        uri (str): The URI of the route.
+        url (str): The URL of the route in the global gateway.
+        plugins (dict[str, Any]): The plugins configured on the route.
+    """
+
+    uri: str
+    url: str
+    plugins: dict[str, Any] = {}
+
+
+class APISixRouteSnapshot(BaseModel):
+    """
+    Represents the parsed key-auth routes of an APISix instance at a point in time.
+
+    Attributes:
+        instance_name (str): The name of the APISIX instance.
+        version (str): Identifies the state of the route list, changes when any route changes.
+        routes (list[APISixRoute]): The key-auth routes of the instance.
+    """
+
+    instance_name: str
+    version: str
+    routes: list[APISixRoute]
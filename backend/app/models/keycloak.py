@@ -12,13 +12,15 @@ config = settings()
 class TokenResponse(BaseModel):
     """
     Represents a token response from the TokenEndpoint.
-    Currently only the access_token is needed from the response.
 
     Attributes:
         access_token (str): The access token generated by the TokenEndpoint.
+        expires_in (int): The lifetime of the access token in seconds.
     """
 
     access_token: str
+    # Keycloak default access token lifespan
+    expires_in: int = 300
 
 
 class User(BaseModel):
@@ -2,7 +2,8 @@
 Access token model
 """
 
-from pydantic import BaseModel, field_validator, Field
+from typing import Literal
+from pydantic import BaseModel, field_validator, model_validator, Field
 from app.constants import GROUPS
 
 
@@ -14,6 +15,7 @@ class AccessToken(BaseModel):
         sub (str): The subject of the token, the user's ID.
         preferred_username (str): The preferred username of the user.
         groups list[str]: A list of groups the user belongs to.
+        exp (int | None): When the token expires, in seconds since the epoch.
 
     Validators:
         validate_groups(v: list[str]) -> list[str]:
@@ -23,6 +25,7 @@ class AccessToken(BaseModel):
     sub: str
     preferred_username: str
     groups: list[str]
+    exp: int | None = None
 
     @field_validator("groups")
     def validate_groups(cls, v: list[str]) -> list[str]:
@@ -58,3 +61,25 @@ class UserGroup(BaseModel):
     """
 
     group_name: str = Field(alias="groupName")
+
+
+BulkAction = Literal["disable", "enable", "delete", "add-group", "remove-group"]
+
+
+class BulkUserOperation(BaseModel):
+    """
+    Represents an admin operation applied to several users.
+    """
+
+    action: BulkAction
+    user_uuids: list[str] = Field(alias="userUuids", min_length=1)
+    group_name: str | None = Field(default=None, alias="groupName")
+
+    @model_validator(mode="after")
+    def validate_group_name(self) -> "BulkUserOperation":
+        """
+        Validates that group actions are given a group name.
+        """
+        if self.action in ("add-group", "remove-group") and not self.group_name:
+            raise ValueError("groupName is required for group actions")
+        return self
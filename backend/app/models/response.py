@@ -2,8 +2,10 @@
 API client response models
 """
 
+from datetime import datetime
+from typing import Literal
 from pydantic import BaseModel, Field
-from app.models.status import ServiceHealth, ServiceStatus
+from app.models.status import ServiceHealth, ServiceHistory, ServiceStatus
 
 
 class GetAPIKey(BaseModel):
@@ -24,6 +26,27 @@ class MessageResponse(BaseModel):
     message: str = Field(..., description="The response message")
 
 
+class UpstreamHealth(BaseModel):
+    """The health and circuit breaker state of an upstream instance"""
+
+    name: str = Field(..., description="The upstream name, e.g. 'vault:EWC'")
+    healthy: bool = Field(..., description="Whether the upstream is healthy")
+    circuit: Literal["closed", "open", "half-open", "disabled"] = Field(
+        ..., description="The state of the upstream's circuit breaker"
+    )
+    failureRate: float = Field(..., description="The share of failed calls in the latest calls")
+    rejectedCalls: int = Field(..., description="Calls rejected while the circuit was open")
+
+
+class HealthDetailsResponse(BaseModel):
+    """
+    Response model for the GET /health/details endpoint
+    """
+
+    healthy: bool = Field(..., description="Whether all the upstreams are healthy")
+    upstreams: list[UpstreamHealth] = Field(..., description="The health of each upstream")
+
+
 class RouteWithLimits(BaseModel):
     """A route URL with rate limit information"""
 
@@ -48,3 +71,75 @@ class StatusResponse(BaseModel):
 
     overall: ServiceStatus = Field(..., description="The overall status across all services")
     services: list[ServiceHealth] = Field(..., description="The health of each individual service")
+    version: str | None = Field(
+        default=None, exclude=True, description="Identifies the snapshot, used for the ETag"
+    )
+
+
+class StatusHistoryResponse(BaseModel):
+    """
+    Response model for the GET /status/history endpoint
+    """
+
+    services: list[ServiceHistory] = Field(..., description="The history of each service")
+
+
+class BulkUserResult(BaseModel):
+    """
+    The outcome of a bulk admin operation for a single user
+    """
+
+    userUuid: str = Field(..., description="The UUID of the user")
+    status: Literal["OK", "NOT_FOUND", "ERROR"] = Field(..., description="The outcome")
+    detail: str | None = Field(default=None, description="The error message if any")
+    timings: dict[str, float] = Field(
+        default_factory=dict, description="Milliseconds spent waiting for each upstream"
+    )
+    rolledBack: bool = Field(default=False, description="Whether a partial change was rolled back")
+
+
+class BulkUsersResponse(BaseModel):
+    """
+    Response model for the POST /admin/users/bulk endpoint
+    """
+
+    results: list[BulkUserResult] = Field(..., description="The outcome for each user")
+
+
+class TraceSpan(BaseModel):
+    """
+    A timed unit of work within a trace, e.g. a service function or an upstream call
+    """
+
+    spanId: str = Field(..., description="The id of the span")
+    parentId: str | None = Field(default=None, description="The id of the parent span")
+    name: str = Field(..., description="What was done, e.g. 'vault.save_user_to_vault'")
+    startMs: float = Field(..., description="Milliseconds from the start of the trace")
+    durationMs: float | None = Field(
+        default=None, description="How long the work took, None if still running"
+    )
+    attributes: dict[str, str | int | float | bool] = Field(
+        default_factory=dict, description="Details of the work, e.g. the upstream"
+    )
+    error: str | None = Field(default=None, description="The exception the work failed with")
+
+
+class TraceResponse(BaseModel):
+    """
+    The spans of a single request
+    """
+
+    traceId: str = Field(..., description="The id of the trace, sent in the X-Trace-Id header")
+    name: str = Field(..., description="The method and route of the request")
+    startedAt: datetime = Field(..., description="When the request started")
+    durationMs: float = Field(..., description="How long the request took")
+    droppedSpans: int = Field(default=0, description="Spans left out to bound the trace size")
+    spans: list[TraceSpan] = Field(..., description="The spans, the request first")
+
+
+class TracesResponse(BaseModel):
+    """
+    Response model for the GET /admin/traces endpoint
+    """
+
+    traces: list[TraceResponse] = Field(..., description="The slowest recent traces")
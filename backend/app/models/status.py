@@ -2,6 +2,7 @@
 Service status models
 """
 
+from datetime import datetime
 from enum import Enum
 from pydantic import BaseModel, Field
 
@@ -22,8 +23,71 @@ class ServiceHealth(BaseModel):
         name (str): The name of the service.
         status (ServiceStatus): The status of the service.
         url (str): The URL of the service.
+        latency_ms (float | None): How long the last check attempt took in milliseconds.
+        last_checked (datetime | None): When the service was last checked.
+        stale (bool): Whether the status is older than expected.
+
+    The latency and check time change on every check, they are left out of /status
+    so that its ETag only changes with the statuses and are reported by /status/history.
     """
 
     name: str = Field(..., description="The name of the service")
     status: ServiceStatus = Field(..., description="The health status of the service")
     url: str = Field(..., description="The URL of the service")
+    latency_ms: float | None = Field(
+        default=None,
+        exclude=True,
+        description="How long the last check attempt took in milliseconds",
+    )
+    last_checked: datetime | None = Field(
+        default=None, exclude=True, description="When the service was last checked"
+    )
+    stale: bool = Field(
+        default=False, description="Whether the status is older than expected, e.g. checks hang"
+    )
+
+
+class LatencyWindow(BaseModel):
+    """
+    Uptime and latency of a service over a time window.
+
+    Attributes:
+        window (int): The length of the window in seconds.
+        samples (int): The number of checks made in the window.
+        uptime (float | None): The share of checks where the service was up.
+        p50_ms (float | None): The median check latency in milliseconds.
+        p95_ms (float | None): The 95th percentile check latency in milliseconds.
+        p99_ms (float | None): The 99th percentile check latency in milliseconds.
+    """
+
+    window: int = Field(..., description="The length of the window in seconds")
+    samples: int = Field(..., description="The number of checks made in the window")
+    uptime: float | None = Field(..., description="The share of checks where the service was up")
+    p50_ms: float | None = Field(..., description="The median check latency in milliseconds")
+    p95_ms: float | None = Field(..., description="The 95th percentile latency in milliseconds")
+    p99_ms: float | None = Field(..., description="The 99th percentile latency in milliseconds")
+
+
+class ServiceHistory(BaseModel):
+    """
+    Representing the check history of a single service.
+
+    Attributes:
+        name (str): The name of the service.
+        url (str): The URL of the service.
+        latency_ms (float | None): How long the last check attempt took in milliseconds.
+        last_checked (datetime | None): When the service was last checked.
+        windows (list[LatencyWindow]): The uptime and latency over each configured window.
+    """
+
+    name: str = Field(..., description="The name of the service")
+    url: str = Field(..., description="The URL of the service")
+    latency_ms: float | None = Field(
+        default=None, description="How long the last check attempt took in milliseconds"
+    )
+    last_checked: datetime | None = Field(
+        default=None, description="When the service was last checked"
+    )
+    windows: list[LatencyWindow] = Field(
+        ..., description="The uptime and latency over each configured window"
+    )
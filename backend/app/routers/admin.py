@@ -2,22 +2,36 @@
 Users route handlers
 """
 
+import asyncio
+from datetime import datetime, timezone
 from http import HTTPStatus
-from fastapi import APIRouter, Depends, HTTPException, Body
+from typing import AsyncIterator
+from fastapi import APIRouter, Depends, HTTPException, Body, Header, Query
+from fastapi.responses import StreamingResponse
 from httpx import AsyncClient
 from app.config import settings, logger
 from app.dependencies.jwt_token import validate_admin_role, AccessToken
 from app.dependencies.http_client import get_http_client
-from app.models.request import UserGroup
-from app.models.response import MessageResponse
+from app.models.request import BulkUserOperation, UserGroup
+from app.models.response import (
+    BulkUsersResponse,
+    MessageResponse,
+    TraceResponse,
+    TraceSpan,
+    TracesResponse,
+)
 from app.services import users
 from app.services import keycloak
+from app.services.route_catalog import route_catalog
 from app.exceptions import APISIXError, VaultError, KeycloakError
+from app.utils.tracing import Span, Trace, trace_buffer
 
 router = APIRouter()
 
 config = settings()
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
 
 @router.delete("/admin/users/{user_uuid}", response_model=MessageResponse)
 async def delete_user(
@@ -172,20 +186,17 @@ async def update_user_to_group(
     )
 
     try:
-        groups = await keycloak.get_groups(client)
+        group_to_update, keycloak_user = await asyncio.gather(
+            keycloak.get_group_by_name(client, user_group.group_name),
+            keycloak.get_user(client, user_uuid),
+        )
 
-        if (
-            group_to_update := next(
-                (group for group in groups if group.name == user_group.group_name), None
-            )
-        ) is None:
+        if group_to_update is None:
             raise HTTPException(
                 status_code=HTTPStatus.NOT_FOUND,
                 detail=f"Group '{user_group.group_name}' not found",
             )
 
-        keycloak_user = await keycloak.get_user(client, user_uuid)
-
         logger.debug("Keycloak user: %s", keycloak_user)
 
         if keycloak_user is None or not keycloak_user.id:
@@ -235,20 +246,17 @@ async def remove_user_from_group(
     )
 
     try:
-        groups = await keycloak.get_groups(client)
+        group_to_update, keycloak_user = await asyncio.gather(
+            keycloak.get_group_by_name(client, user_group.group_name),
+            keycloak.get_user(client, user_uuid),
+        )
 
-        if (
-            group_to_update := next(
-                (group for group in groups if group.name == user_group.group_name), None
-            )
-        ) is None:
+        if group_to_update is None:
             raise HTTPException(
                 status_code=HTTPStatus.NOT_FOUND,
                 detail=f"Group '{user_group.group_name}' not found",
             )
 
-        keycloak_user = await keycloak.get_user(client, user_uuid)
-
         if keycloak_user is None or not keycloak_user.id:
             raise HTTPException(
                 status_code=HTTPStatus.NOT_FOUND, detail=f"User '{user_uuid}' not found"
@@ -261,3 +269,164 @@ async def remove_user_from_group(
         raise HTTPException(status_code=HTTPStatus.SERVICE_UNAVAILABLE, detail=str(e)) from e
 
     return MessageResponse(message="OK")
+
+
+@router.post("/admin/users/bulk", response_model=BulkUsersResponse)
+async def bulk_modify_users(
+    operation: BulkUserOperation = Body(...),
+    accept: str = Header(default=""),
+    token: AccessToken = Depends(validate_admin_role),
+    client: AsyncClient = Depends(get_http_client),
+) -> BulkUsersResponse | StreamingResponse:
+    """
+    Disable, enable, delete or change the group of several users at once.
+
+    Users are processed concurrently, at most `admin.bulk_concurrency` at the same time.
+    A failure for one user does not stop the others, the outcome is reported per user.
+    With 'Accept: application/x-ndjson' the outcomes are streamed one JSON line per user
+    as soon as the user is completed, otherwise they are returned once all are completed.
+
+    Args:
+        operation (BulkUserOperation): The action and the users to apply it to.
+        accept (str): The Accept header of the request.
+        token (AccessToken): The access token of the user making the request.
+        client (AsyncClient): The HTTP client to use for making requests.
+
+    Returns:
+        BulkUsersResponse | StreamingResponse: The outcome for each user.
+
+    Raises:
+        HTTPException: If there are too many users, the group is not found
+                       or there is an error communicating with Keycloak.
+    """
+    logger.info(
+        "Admin '%s' requested bulk action '%s' for %d user(s)",
+        token.sub,
+        operation.action,
+        len(operation.user_uuids),
+    )
+
+    if len(operation.user_uuids) > config.admin.bulk_max_users:
+        raise HTTPException(
+            status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+            detail=f"At most {config.admin.bulk_max_users} users can be processed at once",
+        )
+
+    group = None
+    if operation.group_name is not None and operation.action in ("add-group", "remove-group"):
+        try:
+            group = await keycloak.get_group_by_name(client, operation.group_name)
+        except KeycloakError as e:
+            raise HTTPException(status_code=HTTPStatus.SERVICE_UNAVAILABLE, detail=str(e)) from e
+
+        if group is None:
+            raise HTTPException(
+                status_code=HTTPStatus.NOT_FOUND,
+                detail=f"Group '{operation.group_name}' not found",
+            )
+
+    if NDJSON_MEDIA_TYPE in accept:
+
+        async def stream_results() -> AsyncIterator[str]:
+            async for _index, result in users.iter_bulk_action(
+                client, operation.user_uuids, operation.action, group
+            ):
+                yield result.model_dump_json() + "\n"
+
+        return StreamingResponse(stream_results(), media_type=NDJSON_MEDIA_TYPE)
+
+    results = await users.apply_bulk_action_to_users(
+        client, operation.user_uuids, operation.action, group
+    )
+
+    return BulkUsersResponse(results=results)
+
+
+@router.delete("/admin/cache/consumer-groups", response_model=MessageResponse)
+async def invalidate_consumer_groups(
+    token: AccessToken = Depends(validate_admin_role),
+) -> MessageResponse:
+    """
+    Drop the cached APISIX consumer groups so that they are reloaded on next use.
+    Use this after changing consumer group limits in APISIX.
+    The cache is per backend process, other replicas refresh on their own schedule.
+
+    Args:
+        token (AccessToken): The access token of the user making the request.
+
+    Returns:
+        MessageResponse: A response indicating that the cache was invalidated.
+    """
+    logger.info("Admin '%s' requested invalidating the consumer group cache", token.sub)
+
+    route_catalog.invalidate_consumer_groups()
+
+    return MessageResponse(message="OK")
+
+
+def describe_span(span: Span, trace_started: float) -> TraceSpan:
+    """
+    Create the response model of a span.
+
+    Args:
+        span (Span): The span.
+        trace_started (float): When the trace started, in perf_counter seconds.
+
+    Returns:
+        TraceSpan: The span with its start relative to the start of the trace.
+    """
+    return TraceSpan(
+        spanId=span.span_id,
+        parentId=span.parent_id,
+        name=span.name,
+        startMs=round((span.started - trace_started) * 1000, 1),
+        durationMs=round(span.seconds * 1000, 1) if span.seconds is not None else None,
+        attributes=span.attributes,
+        error=span.error,
+    )
+
+
+def describe_trace(trace: Trace) -> TraceResponse:
+    """
+    Create the response model of a trace.
+
+    Args:
+        trace (Trace): The finished trace.
+
+    Returns:
+        TraceResponse: The trace with its spans in the order they started.
+    """
+    spans = sorted(trace.spans, key=lambda span: span.started)
+    return TraceResponse(
+        traceId=trace.trace_id,
+        name=trace.root.name,
+        startedAt=datetime.fromtimestamp(trace.started_at, timezone.utc),
+        durationMs=round(trace.seconds * 1000, 1),
+        droppedSpans=trace.dropped_spans,
+        spans=[describe_span(span, trace.root.started) for span in [trace.root, *spans]],
+    )
+
+
+@router.get("/admin/traces", response_model=TracesResponse)
+async def slow_traces(
+    min_duration_ms: float = Query(default=0, ge=0),
+    limit: int = Query(default=20, ge=1, le=200),
+    token: AccessToken = Depends(validate_admin_role),
+) -> TracesResponse:
+    """
+    Get the slowest of the recent requests that took at least `tracing.slow_threshold_ms`,
+    with the spans of the handler, the service functions and the upstream calls.
+    The traces are kept in memory per backend process.
+
+    Args:
+        min_duration_ms (float): Leave out traces faster than this.
+        limit (int): The maximum number of traces.
+        token (AccessToken): The access token of the user making the request.
+
+    Returns:
+        TracesResponse: The traces, slowest first.
+    """
+    logger.debug("Admin '%s' requested the slow traces", token.sub)
+
+    traces = trace_buffer.slowest(min_seconds=min_duration_ms / 1000, limit=limit)
+    return TracesResponse(traces=[describe_trace(trace) for trace in traces])
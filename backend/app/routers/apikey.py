@@ -45,33 +45,18 @@ async def get_api_key(
     """
     user = User(id=token.sub, groups=token.groups)
 
-    vault_user = None
-
     logger.debug("Got request to retrieve API key for user '%s'", user.id)
 
-    try:
-        vault_users, apisix_users = await apikey.get_user_from_vault_and_apisix_instances(
-            client, user.id
-        )
-
-        if None in vault_users or None in apisix_users:
-            logger.debug(
-                "User '%s' not found in all Vault and/or APISIX instances --> Upserting user",
-                user.id,
-            )
-            vault_user = await apikey.create_user_to_vault_and_apisixes(
-                client, user, vault_users, apisix_users
-            )
+    if (api_key := apikey.get_provisioned_api_key(user.id)) is not None:
+        logger.debug("User '%s' is already provisioned --> Returning cached API key", user.id)
+        return GetAPIKey(apiKey=api_key)
 
+    try:
+        # Concurrent requests of the same user (e.g. several tabs) share one provisioning
+        api_key = await apikey.provisioning.do(user.id, apikey.provision_user, client, user)
     except (VaultError, APISIXError) as e:
         raise HTTPException(status_code=HTTPStatus.SERVICE_UNAVAILABLE, detail=str(e)) from e
 
-    # Use the created API key
-    # Or grab the first existing one since user's API key is same regardless the instance
-    api_key = (
-        vault_user.auth_key if vault_user else next(user for user in vault_users if user).auth_key
-    )
-
     return GetAPIKey(apiKey=api_key)
 
 
@@ -6,14 +6,17 @@ from http import HTTPStatus
 import asyncio
 from fastapi import APIRouter, Depends, HTTPException
 from httpx import AsyncClient
-from app.config import logger
-from app.dependencies.http_client import get_http_client
+from app.config import logger, settings
+from app.dependencies.http_client import get_circuit_breakers, get_http_client
 from app.services import vault, apisix
-from app.models.response import MessageResponse
+from app.services.route_catalog import route_catalog
+from app.models.response import HealthDetailsResponse, MessageResponse, UpstreamHealth
 from app.exceptions import APISIXError, VaultError
 
 router = APIRouter()
 
+config = settings()
+
 
 # For now just refactor the existing endpoint as is
 # Either naming this route differently or creating routes for routes and apikey
@@ -39,7 +42,7 @@ async def health_check(client: AsyncClient = Depends(get_http_client)) -> Messag
 
     results = await asyncio.gather(
         *vault.create_tasks(vault.healthcheck, client),
-        *apisix.create_tasks(apisix.get_routes, client),
+        *apisix.create_tasks(route_catalog.check_health, client),
         return_exceptions=True,
     )
 
@@ -52,3 +55,46 @@ async def health_check(client: AsyncClient = Depends(get_http_client)) -> Messag
 
     logger.debug("Vault and APISIX instances are healthy")
     return MessageResponse(message="OK")
+
+
+@router.get("/health/details", response_model=HealthDetailsResponse)
+async def health_details(client: AsyncClient = Depends(get_http_client)) -> HealthDetailsResponse:
+    """
+    Endpoint for inspecting the health of each upstream instance.
+    Vault and APISIX instances are checked like in the health check,
+    Keycloak is reported healthy unless its circuit breaker is open.
+
+    Args:
+    - client (AsyncClient): The HTTP client used for making requests.
+
+    Returns:
+    - HealthDetailsResponse: The health and circuit breaker state of each upstream.
+    """
+    results = await asyncio.gather(
+        *vault.create_tasks(vault.healthcheck, client),
+        *apisix.create_tasks(route_catalog.check_health, client),
+        return_exceptions=True,
+    )
+    checked = [
+        *[f"vault:{instance.name}" for instance in config.vault.instances],
+        *[f"apisix:{instance.name}" for instance in config.apisix.instances],
+    ]
+    circuit_breakers = get_circuit_breakers()
+
+    upstreams = []
+    for name, result in [*zip(checked, results), ("keycloak", None)]:
+        circuit_breaker = circuit_breakers.get(name)
+        upstreams.append(
+            UpstreamHealth(
+                name=name,
+                healthy=not isinstance(result, BaseException)
+                and (circuit_breaker is None or circuit_breaker.state != "open"),
+                circuit=circuit_breaker.state if circuit_breaker else "disabled",
+                failureRate=round(circuit_breaker.failure_rate, 3) if circuit_breaker else 0.0,
+                rejectedCalls=circuit_breaker.rejected_calls if circuit_breaker else 0,
+            )
+        )
+
+    return HealthDetailsResponse(
+        healthy=all(upstream.healthy for upstream in upstreams), upstreams=upstreams
+    )
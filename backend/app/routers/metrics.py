@@ -0,0 +1,20 @@
+"""
+Prometheus metrics endpoint
+"""
+
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST
+from app.utils.metrics import render_metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """
+    Endpoint for scraping the request, upstream, cache and rollback metrics by Prometheus.
+
+    Returns:
+    - Response: The metrics in the Prometheus text format.
+    """
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
@@ -3,38 +3,81 @@
 """
 
 from http import HTTPStatus
-import asyncio
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
 from httpx import AsyncClient
 from app.config import settings, logger
 from app.dependencies.jwt_token import validate_token, AccessToken
 from app.dependencies.http_client import get_http_client
 from app.services import apisix
+from app.services.route_catalog import get_routes_for_consumer
 from app.models.response import GetRoutes, RouteWithLimits
-from app.models.apisix import APISixConsumer
 from app.models.request import User
+from app.exceptions import APISIXError
+from app.utils.compression import SnapshotBodies, snapshot_response
 
 router = APIRouter()
 
 config = settings()
 
+# Bodies keyed by the version of the routes resolved for a consumer group
+routes_bodies = SnapshotBodies(
+    config.cache.snapshot_bodies_max_size, config.compression, name="routes_bodies"
+)
+
+
+def serialize_routes(routes: list[dict[str, str]]) -> bytes:
+    """
+    Serialize routes with their limits as the GetRoutes JSON body, one entry per URL.
+
+    Args:
+        routes (list[dict[str, str]]): The routes with their formatted limits.
+
+    Returns:
+        bytes: The JSON body.
+    """
+    unique_routes_dict = {}
+    for route in routes:
+        url = route["url"]
+        if url not in unique_routes_dict:
+            unique_routes_dict[url] = route
+
+    routes_with_limits = [
+        RouteWithLimits(
+            url=route["url"],
+            limits=route["limits"],
+        )
+        for route in unique_routes_dict.values()
+    ]
+
+    logger.debug("found %s unique routes: %s", len(routes_with_limits), routes_with_limits)
+    return GetRoutes(routes=routes_with_limits).model_dump_json().encode()
+
 
 # For now just refactor the existing endpoint as is
 # Either naming this route differently or creating routes for routes and apikey
 @router.get("/routes", response_model=GetRoutes)
 async def get_routes(
+    if_none_match: str | None = Header(default=None),
+    accept_encoding: str | None = Header(default=None),
     token: AccessToken = Depends(validate_token),
     client: AsyncClient = Depends(get_http_client),
-) -> GetRoutes:
+) -> GetRoutes | Response:
     """
     Retrieve all the APISIX routes that requires key authentication.
 
+    The response has an ETag derived from the route and limit versions,
+    when it matches the If-None-Match header a 304 response without body is returned.
+    The body of each version is serialized and compressed once.
+
     Args:
+    - if_none_match (str | None): The If-None-Match header of the request.
+    - accept_encoding (str | None): The Accept-Encoding header of the request.
     - token (AccessToken): The access token used for authentication.
     - client (AsyncClient): The HTTP client used for making requests.
 
     Returns:
     - GetRoutes: An object containing the retrieved routes with rate limits.
+    - Response: 304 Not Modified if the client has the current routes.
 
     Raises:
     - HTTPException: If there is an error retrieving the routes.
@@ -45,49 +88,13 @@ async def get_routes(
 
     logger.debug("retrieving all the routes that requires key authentication")
 
-    # Get APISIX consumer for the user from all instances
+    # Routes are same across all instances so the read strategy decides
+    # which instance(s) are queried for the consumer and its routes
     user = User(id=token.sub, groups=token.groups)
-    apisix_consumers = await asyncio.gather(
-        *apisix.create_tasks(apisix.get_apisix_consumer, client, user.id),
-        return_exceptions=True,
-    )
-    valid_consumers = [
-        consumer if isinstance(consumer, APISixConsumer) else None for consumer in apisix_consumers
-    ]
-
-    routes_responses = await asyncio.gather(
-        *[
-            apisix.get_routes_with_limits(client, instance, consumer)
-            for instance, consumer in zip(config.apisix.instances, valid_consumers)
-        ],
-        return_exceptions=True,
-    )
-
-    # Routes are same across all instances so error only if all instances failed
-    if all(isinstance(response, Exception) for response in routes_responses):
-        raise HTTPException(
-            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
-            detail=str(routes_responses[0]),
-        )
+    try:
+        version, routes = await apisix.read_from_instances(get_routes_for_consumer, client, user.id)
+    except APISIXError as e:
+        raise HTTPException(status_code=HTTPStatus.SERVICE_UNAVAILABLE, detail=str(e)) from e
 
-    all_routes = []
-    for response in routes_responses:
-        if isinstance(response, list):
-            all_routes.extend(response)
-
-    unique_routes_dict = {}
-    for route in all_routes:
-        url = route["url"]
-        if url not in unique_routes_dict:
-            unique_routes_dict[url] = route
-
-    routes_with_limits = [
-        RouteWithLimits(
-            url=route["url"],
-            limits=route["limits"],
-        )
-        for route in unique_routes_dict.values()
-    ]
-
-    logger.debug("found %s unique routes: %s", len(routes_with_limits), routes_with_limits)
-    return GetRoutes(routes=routes_with_limits)
+    body = routes_bodies.get(version, lambda: serialize_routes(routes))
+    return snapshot_response(body, accept_encoding, version, if_none_match)
@@ -2,32 +2,102 @@
 Service status route handlers
 """
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, Response
+from fastapi.responses import StreamingResponse
 from httpx import AsyncClient
+from app.config import settings
 from app.dependencies.jwt_token import validate_token, AccessToken
 from app.dependencies.http_client import get_http_client
-from app.models.response import StatusResponse
+from app.models.response import StatusHistoryResponse, StatusResponse
 from app.services import status
+from app.utils.compression import SnapshotBodies, snapshot_response
 
 router = APIRouter()
 
+config = settings()
+
+EVENT_STREAM_MEDIA_TYPE = "text/event-stream"
+
+status_bodies = SnapshotBodies(
+    config.cache.snapshot_bodies_max_size, config.compression, name="status_bodies"
+)
+
 
 @router.get("/status", response_model=StatusResponse)
 async def service_status(
+    if_none_match: str | None = Header(default=None),
+    accept_encoding: str | None = Header(default=None),
     _token: AccessToken = Depends(validate_token),
     client: AsyncClient = Depends(get_http_client),
-) -> StatusResponse:
+) -> StatusResponse | Response:
     """
     Authenticated endpoint returning health status of external services.
 
-    Services are loaded from config. Results are cached to avoid excessive
-    health checks. Requires a valid access token.
+    Services are loaded from config and polled in the background,
+    the latest results are returned. Requires a valid access token.
+    The ETag identifies the snapshot, when it matches the If-None-Match header
+    a 304 response without body is returned. The body of each snapshot is serialized
+    and compressed once.
+
+    Args:
+        if_none_match (str | None): The If-None-Match header of the request.
+        accept_encoding (str | None): The Accept-Encoding header of the request.
+        token (AccessToken): The access token used for authentication.
+        client: The HTTP client used for making requests.
+
+    Returns:
+        StatusResponse with overall and per-service status,
+        or 304 Not Modified if the client has the current snapshot.
+    """
+    snapshot = await status.fetch_service_status(client)
+    if snapshot.version is None:
+        return snapshot
+
+    body = status_bodies.get(snapshot.version, lambda: snapshot.model_dump_json().encode())
+    return snapshot_response(body, accept_encoding, snapshot.version, if_none_match)
+
+
+@router.get("/status/history", response_model=StatusHistoryResponse)
+async def service_status_history(
+    _token: AccessToken = Depends(validate_token),
+    client: AsyncClient = Depends(get_http_client),
+) -> StatusHistoryResponse:
+    """
+    Authenticated endpoint returning the uptime and check latency percentiles
+    of external services over the configured time windows.
+
+    Args:
+        token (AccessToken): The access token used for authentication.
+        client: The HTTP client used for making requests.
+
+    Returns:
+        StatusHistoryResponse with the history of each service.
+    """
+    return await status.fetch_service_history(client)
+
+
+@router.get("/status/stream", response_class=StreamingResponse)
+async def service_status_stream(
+    token: AccessToken = Depends(validate_token),
+    client: AsyncClient = Depends(get_http_client),
+) -> StreamingResponse:
+    """
+    Authenticated endpoint streaming the health status of external services
+    as server-sent events.
+
+    The StatusResponse is sent on connect and then whenever it changes, with heartbeat
+    comments in between. The stream ends when the access token expires so that
+    the client reconnects with a renewed token.
 
     Args:
         token (AccessToken): The access token used for authentication.
         client: The HTTP client used for making requests.
 
     Returns:
-        StatusResponse with overall and per-service status.
+        StreamingResponse of server-sent events.
     """
-    return await status.fetch_service_status(client)  # type: ignore[no-any-return]
+    return StreamingResponse(
+        status.stream_service_status(client, config.status.stream_heartbeat, token.exp),
+        media_type=EVENT_STREAM_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
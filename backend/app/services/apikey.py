@@ -9,12 +9,90 @@ from app.config import logger, settings
 from app.models.request import User
 from app.models.vault import VaultUser
 from app.models.apisix import APISixConsumer
+from app.models.apikey import ProvisionedUser
 from app.exceptions import APISIXError, VaultError
 from app.services import vault, apisix
+from app.utils.cache import LRUCache
+from app.utils.metrics import ROLLBACKS
+from app.utils.report import mark_rolled_back
+from app.utils.singleflight import SingleFlight
+from app.utils.tracing import traced
 
 config = settings()
 
+# Users whose API key is known to exist in all Vault and APISIX instances.
+# Entries expire after a while as changes made by other replicas are not seen here.
+provisioned_users: LRUCache[ProvisionedUser] = LRUCache(
+    max_size=config.cache.provisioned_users_max_size,
+    ttl=config.cache.provisioned_users_ttl,
+    name="provisioned_users",
+)
 
+# Concurrent provisioning calls for the same user share one in-flight operation
+provisioning: SingleFlight[str] = SingleFlight()
+
+
+def remember_provisioned_user(
+    uuid_not_dashes: str,
+    vault_users: Sequence[VaultUser | None],
+    apisix_users: Sequence[APISixConsumer | None],
+) -> None:
+    """
+    Cache the user's API key if the user exists in all Vault and APISIX instances.
+
+    Args:
+        uuid_not_dashes (str): The user's UUID, formatted without dashes.
+        vault_users (Sequence[VaultUser | None]): The user from each Vault instance.
+        apisix_users (Sequence[APISixConsumer | None]): The user from each APISIX instance.
+    """
+    if None in vault_users or None in apisix_users or not vault_users:
+        return
+    provisioned_users.set(
+        uuid_not_dashes,
+        ProvisionedUser(
+            api_key=cast(VaultUser, vault_users[0]).auth_key,
+            vault_instances=frozenset(user.instance_name for user in vault_users if user),
+            apisix_instances=frozenset(user.instance_name for user in apisix_users if user),
+        ),
+    )
+
+
+def get_provisioned_api_key(uuid_not_dashes: str) -> str | None:
+    """
+    Get the cached API key of a user that exists in all the configured instances.
+
+    Args:
+        uuid_not_dashes (str): The user's UUID, formatted without dashes.
+
+    Returns:
+        str | None: The API key or None if the user is not known to be fully provisioned.
+    """
+    provisioned_user = provisioned_users.get(uuid_not_dashes)
+    if (
+        provisioned_user is None
+        or not provisioned_user.vault_instances.issuperset(
+            instance.name for instance in config.vault.instances
+        )
+        or not provisioned_user.apisix_instances.issuperset(
+            instance.name for instance in config.apisix.instances
+        )
+    ):
+        return None
+    return provisioned_user.api_key
+
+
+def forget_provisioned_user(uuid_not_dashes: str) -> None:
+    """
+    Remove a user from the provisioned users cache.
+    Must be called whenever the user's API key or APISIX consumer is changed or removed.
+
+    Args:
+        uuid_not_dashes (str): The user's UUID, formatted without dashes.
+    """
+    provisioned_users.delete(uuid_not_dashes)
+
+
+@traced
 async def get_user_from_vault_and_apisix_instances(
     client: AsyncClient, uuid_not_dashes: str
 ) -> tuple[list[VaultUser | None], list[APISixConsumer | None]]:
@@ -54,11 +132,15 @@ async def get_user_from_vault_and_apisix_instances(
 
     # Stupid to use cast here but mypy does not seem to understand
     # that we are not returning BaseException nor derived classes
-    return cast(list[VaultUser | None], results[: len(vault_tasks)]), cast(
-        list[APISixConsumer | None], results[len(vault_tasks) :]
-    )
+    vault_users = cast(list[VaultUser | None], results[: len(vault_tasks)])
+    apisix_users = cast(list[APISixConsumer | None], results[len(vault_tasks) :])
+
+    remember_provisioned_user(uuid_not_dashes, vault_users, apisix_users)
+
+    return vault_users, apisix_users
 
 
+@traced
 async def handle_rollback(
     client: AsyncClient,
     user: User,
@@ -83,6 +165,9 @@ async def handle_rollback(
     Raises:
         HTTPException: If there is an error during the rollback process.
     """
+    mark_rolled_back()
+    ROLLBACKS.labels(rollback_from).inc()
+
     tasks: list[Coroutine[Any, Any, VaultUser | APISixConsumer]] = []
     vault_user = None
 
@@ -140,6 +225,42 @@ async def handle_rollback(
         raise error
 
 
+@traced
+async def provision_user(client: AsyncClient, user: User) -> str:
+    """
+    Ensure the user exists in all Vault and APISIX instances and return the user's API key.
+
+    If the user does not exist in Vault, it saves the user to Vault.
+    If the user does not exist in APISIX, it creates the user in APISIX.
+
+    Args:
+        client (AsyncClient): The HTTP client used for making requests.
+        user (User): The user to provision.
+
+    Returns:
+        str: The user's API key.
+
+    Raises:
+        APISIXError: If there is an error getting or creating the user in APISIX.
+        VaultError: If there is an error getting or saving the user to Vault.
+    """
+    vault_users, apisix_users = await get_user_from_vault_and_apisix_instances(client, user.id)
+
+    if None in vault_users or None in apisix_users:
+        logger.debug(
+            "User '%s' not found in all Vault and/or APISIX instances --> Upserting user",
+            user.id,
+        )
+        vault_user = await create_user_to_vault_and_apisixes(
+            client, user, vault_users, apisix_users
+        )
+        return vault_user.auth_key
+
+    # User's API key is same regardless the instance
+    return next(user for user in vault_users if user).auth_key
+
+
+@traced
 async def create_user_to_vault_and_apisixes(
     client: AsyncClient,
     user: User,
@@ -237,9 +358,19 @@ async def create_user_to_vault_and_apisixes(
         logger.info("Rollback operation completed successfully")
         raise error
 
+    provisioned_users.set(
+        user.id,
+        ProvisionedUser(
+            api_key=vault_user.auth_key,
+            vault_instances=frozenset(instance.name for instance in config.vault.instances),
+            apisix_instances=frozenset(instance.name for instance in config.apisix.instances),
+        ),
+    )
+
     return vault_user
 
 
+@traced
 async def delete_user_from_vault_and_apisixes(
     client: AsyncClient,
     user: User,
@@ -268,6 +399,8 @@ async def delete_user_from_vault_and_apisixes(
         APISIXError: If there is an error deleting the user from an APISIX instance.
         VaultError: If there is an error deleting the user from Vault.
     """
+    forget_provisioned_user(user.id)
+
     tasks: list[Coroutine[Any, Any, VaultUser | APISixConsumer]] = []
 
     for u in vault_users:
@@ -313,6 +446,9 @@ async def delete_user_from_vault_and_apisixes(
             await asyncio.gather(*tasks, return_exceptions=True),
         )
 
+        # A concurrent read may have cached the user while the deletion was in flight
+        forget_provisioned_user(user.id)
+
         if error := next(
             (response for response in responses if isinstance(response, (VaultError, APISIXError))),
             None,
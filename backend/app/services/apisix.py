@@ -2,6 +2,7 @@
 Service for interacting with the APISIX API.
 """
 
+import asyncio
 from typing import Callable, Coroutine, Any
 from functools import lru_cache
 from httpx import AsyncClient, HTTPError
@@ -10,6 +11,7 @@ from app.dependencies.http_client import http_request
 from app.models.request import User
 from app.models.apisix import APISixConsumer, APISixRoutes, APISixConsumerGroup
 from app.exceptions import APISIXError
+from app.utils.tracing import traced
 
 config = settings()
 
@@ -33,6 +35,7 @@ def create_headers(api_key: str) -> dict[str, str]:
     return {"Content-Type": "application/json", "X-API-KEY": api_key}
 
 
+@traced
 async def upsert_apisix_consumer(
     client: AsyncClient, instance: APISixInstanceSettings, user: User | APISixConsumer
 ) -> APISixConsumer:
@@ -90,6 +93,7 @@ async def upsert_apisix_consumer(
         raise APISIXError("APISIX service error") from e
 
 
+@traced
 async def get_apisix_consumer(
     client: AsyncClient, instance: APISixInstanceSettings, identifier: str
 ) -> APISixConsumer | None:
@@ -132,6 +136,7 @@ async def get_apisix_consumer(
         raise APISIXError("APISIX service error") from e
 
 
+@traced
 async def get_apisix_consumer_group(
     client: AsyncClient, instance: APISixInstanceSettings, group_id: str
 ) -> APISixConsumerGroup | None:
@@ -191,15 +196,55 @@ async def get_apisix_consumer_group(
         raise APISIXError("APISIX service error") from e
 
 
-async def get_routes(client: AsyncClient, instance: APISixInstanceSettings) -> APISixRoutes:
+@traced
+async def get_apisix_consumer_groups(
+    client: AsyncClient, instance: APISixInstanceSettings
+) -> list[APISixConsumerGroup]:
     """
-    Retrieve a list of key-auth routes from APISIX.
+    Retrieve all the consumer groups from given APISIX instance.
 
     Args:
         client (AsyncClient): The HTTP client to use for making the request.
+        instance (APISixInstanceSettings): The APISIX instance configuration.
 
     Returns:
-        list[str]: A list of routes.
+        list[APISixConsumerGroup]: The consumer groups of the instance.
+
+    Raises:
+        APISIXError: If there is an HTTP error while retrieving the consumer groups.
+    """
+    try:
+        response = await http_request(
+            client,
+            "GET",
+            f"{instance.admin_url}/apisix/admin/consumer_groups",
+            headers=create_headers(instance.admin_api_key),
+        )
+        # {'total': 1, 'list': [{'key': '/apisix/consumer_groups/foobar', 'value': {...}}]}
+        return [
+            APISixConsumerGroup(instance_name=instance.name, **group["value"])
+            for group in response.json().get("list") or []
+        ]
+    except HTTPError as e:
+        logger.exception(
+            "Error retrieving APISIX consumer groups from instance '%s'", instance.name
+        )
+        raise APISIXError("APISIX service error") from e
+
+
+@traced
+async def get_raw_routes(
+    client: AsyncClient, instance: APISixInstanceSettings
+) -> list[dict[str, Any]]:
+    """
+    Retrieve the full list of routes from APISIX as returned by the admin API.
+
+    Args:
+        client (AsyncClient): The HTTP client to use for making the request.
+        instance (APISixInstanceSettings): The APISIX instance configuration.
+
+    Returns:
+        list[dict[str, Any]]: A list of raw route items.
 
     Raises:
         APISIXError: If there is an HTTP error while retrieving the routes.
@@ -211,7 +256,7 @@ async def get_routes(client: AsyncClient, instance: APISixInstanceSettings) -> A
             f"{instance.admin_url}/apisix/admin/routes",
             headers=create_headers(instance.admin_api_key),
         )
-        routes = response.json().get("list", [])
+        routes: list[dict[str, Any]] = response.json().get("list", [])
         # {'total': 1,
         #'list': [{'value':
         # {'update_time': 1710230570, 'plugins':
@@ -221,12 +266,31 @@ async def get_routes(client: AsyncClient, instance: APISixInstanceSettings) -> A
         # {'type': 'roundrobin', 'pass_host': 'pass', 'nodes': {'httpbin.org:80': 1},
         #'hash_on': 'vars', 'scheme': 'http'}, 'status': 1, 'id': 'foo'},
         #'createdIndex': 101, 'key': '/apisix/routes/foo', 'modifiedIndex': 128}]}
-        return APISixRoutes(gateway_url=config.apisix.global_gateway_url, routes=routes)
+        return routes
     except HTTPError as e:
         logger.exception("Error retrieving APISIX routes from instance '%s'", instance.name)
         raise APISIXError("APISIX service error") from e
 
 
+@traced
+async def get_routes(client: AsyncClient, instance: APISixInstanceSettings) -> APISixRoutes:
+    """
+    Retrieve a list of key-auth routes from APISIX.
+
+    Args:
+        client (AsyncClient): The HTTP client to use for making the request.
+
+    Returns:
+        list[str]: A list of routes.
+
+    Raises:
+        APISIXError: If there is an HTTP error while retrieving the routes.
+    """
+    routes = await get_raw_routes(client, instance)
+    return APISixRoutes(gateway_url=config.apisix.global_gateway_url, routes=routes)
+
+
+@traced
 async def delete_apisix_consumer(
     client: AsyncClient, instance: APISixInstanceSettings, user: User
 ) -> APISixConsumer:
@@ -314,6 +378,71 @@ def create_tasks(
     ]
 
 
+@traced
+async def read_from_instances(
+    func: Callable[..., Coroutine], client: AsyncClient, *args: Any, **kwargs: Any
+) -> Any:
+    """
+    Execute a read-only function against the APISIX instances using the configured strategy.
+
+    The instances hold the same data so the result of the first successful instance is used.
+    With "all" every instance is queried at once, with "primary" the instances are
+    queried one at a time in the configured order until one succeeds, and with "hedged"
+    the next instance is queried also when the previous one has not answered in
+    `hedge_delay` seconds.
+
+    Args:
+        func (Callable[..., Coroutine]): The function to execute. Called with the client,
+            the instance and the rest of the arguments.
+        client (AsyncClient): The HTTP client to use for making the requests.
+
+    Returns:
+        Any: The result of the first instance that succeeded.
+
+    Raises:
+        APISIXError: The first error if all the queried instances failed.
+    """
+    if config.apisix.read_strategy == "all":
+        results = await asyncio.gather(
+            *create_tasks(func, client, *args, **kwargs), return_exceptions=True
+        )
+        for result in results:
+            if not isinstance(result, BaseException):
+                return result
+        raise results[0]
+
+    hedge_delay = config.apisix.hedge_delay if config.apisix.read_strategy == "hedged" else None
+    remaining = list(config.apisix.instances)
+    pending: set[asyncio.Task] = set()
+    errors: list[BaseException] = []
+
+    def query_next_instance() -> None:
+        if remaining:
+            instance = remaining.pop(0)
+            pending.add(asyncio.create_task(func(client, instance, *args, **kwargs)))
+
+    query_next_instance()
+    try:
+        while pending:
+            done, _ = await asyncio.wait(
+                pending,
+                timeout=hedge_delay if remaining else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for task in done:
+                pending.discard(task)
+                if (error := task.exception()) is None:
+                    return task.result()
+                errors.append(error)
+            # Either the hedge delay passed or an instance failed
+            query_next_instance()
+    finally:
+        for task in pending:
+            task.cancel()
+
+    raise errors[0]
+
+
 def get_effective_limit(
     plugin_name: str,
     route_plugins: dict[str, Any],
@@ -461,68 +590,3 @@ def format_rate_limits(
     limits_str = " | ".join(parts) if parts else "No rate limits"
 
     return f"{limits_str} ({source})"
-
-
-async def get_routes_with_limits(
-    client: AsyncClient,
-    instance: APISixInstanceSettings,
-    consumer: APISixConsumer | None = None,
-) -> list[dict[str, Any]]:
-    """
-    Retrieve routes with their effective rate limits for a consumer.
-
-    Args:
-        client (AsyncClient): The HTTP client to use for making the request.
-        instance (APISixInstanceSettings): The APISIX instance configuration.
-        consumer (APISixConsumer | None): The consumer to check limits for.
-
-    Returns:
-        list[dict[str, Any]]: A list of routes with rate limit information.
-
-    Raises:
-        APISIXError: If there is an HTTP error while retrieving the routes.
-    """
-    try:
-        # Get consumer group if consumer exists
-        consumer_group = None
-        if consumer and consumer.group_id:
-            consumer_group = await get_apisix_consumer_group(client, instance, consumer.group_id)
-
-        # Get raw route data for limit checking
-        response = await http_request(
-            client,
-            "GET",
-            f"{instance.admin_url}/apisix/admin/routes",
-            headers=create_headers(instance.admin_api_key),
-        )
-        raw_routes = response.json().get("list", [])
-
-        routes_with_limits = []
-        for route in raw_routes:
-            plugins = route.get("value", {}).get("plugins", {})
-            uri = route.get("value", {}).get("uri")
-
-            # Only process routes with key-auth
-            if plugins.get("key-auth") is None:
-                continue
-
-            # Determine effective rate limits
-            limit_req, limit_count, source = determine_rate_limits(
-                plugins, consumer, consumer_group
-            )
-
-            # Format limits as a human-readable string
-            limits_str = format_rate_limits(limit_req, limit_count, source)
-
-            routes_with_limits.append(
-                {
-                    "url": f"{config.apisix.global_gateway_url}{uri}",
-                    "limits": limits_str,
-                }
-            )
-
-        return routes_with_limits
-
-    except HTTPError as e:
-        logger.exception("Error retrieving routes with limits from instance '%s'", instance.name)
-        raise APISIXError("APISIX service error") from e
@@ -2,19 +2,36 @@
 Service for interacting with the Keycloak.
 """
 
-from typing import Literal
+import asyncio
+import time
+from http import HTTPStatus
+from typing import Any, Literal, Mapping
 from urllib.parse import urlparse
-from aiocache import cached, Cache  # type: ignore
-from httpx import AsyncClient, HTTPError
+from httpx import AsyncClient, HTTPError, HTTPStatusError, Response
 from app.config import settings, logger
 from app.dependencies.http_client import http_request
 from app.exceptions import KeycloakError
 from app.models.keycloak import TokenResponse, User, Group
+from app.utils.cache import CacheStats, LRUCache
+from app.utils.tracing import traced
 
 config = settings()
 
-# Keycloak access token ttl is 5 mins. subtract 10 seconds to account for possible time skew
-TTL = 60 * 5 - 10
+# Seconds to wait before retrying a failed background refresh,
+# doubled after each consecutive failure up to the maximum
+REFRESH_RETRY_INTERVAL = 5
+REFRESH_MAX_RETRY_INTERVAL = 60
+
+# Admin operations look up the same users and groups repeatedly within a short time
+users_cache: LRUCache[User] = LRUCache(
+    max_size=config.cache.keycloak_users_max_size,
+    ttl=config.cache.keycloak_users_ttl,
+    name="keycloak_users",
+)
+# Realms have a handful of groups, the size limit is only a safeguard
+groups_by_name: LRUCache[Group] = LRUCache(
+    max_size=1000, ttl=config.cache.keycloak_groups_ttl, name="keycloak_groups"
+)
 
 
 def extract_uuid_from_url(url: str) -> str:
@@ -25,15 +42,14 @@ def extract_uuid_from_url(url: str) -> str:
     return urlparse(url).path.split("/")[-1]
 
 
-@cached(cache=Cache.MEMORY, ttl=TTL, key="service_account_token")
-async def get_service_account_token(client: AsyncClient) -> str:
+async def fetch_service_account_token(client: AsyncClient) -> TokenResponse:
     """
     Get a service account token from Keycloak.
 
     This function gets a token from Keycloak using the client credentials flow.
 
     Returns:
-        str: The token from Keycloak.
+        TokenResponse: The token response from Keycloak.
 
     Raises:
         KeycloakError: If there is an HTTP error while getting the token.
@@ -50,50 +66,268 @@ async def get_service_account_token(client: AsyncClient) -> str:
 
         response = await http_request(client, "POST", token_url, data=data)
 
-        return TokenResponse(**response.json()).access_token
+        return TokenResponse(**response.json())
 
     except HTTPError as e:
         logger.exception("Error retrieving Keycloak service account token.")
         raise KeycloakError("Keycloak service error") from e
 
 
+# The token and the state of its foreground and background renewals belong together
+class ServiceAccountToken:  # pylint: disable=too-many-instance-attributes
+    """
+    Keeps the Keycloak service account access token in memory.
+
+    The token is renewed `refresh_margin` seconds (at most half of its lifetime) before it
+    expires according to `expires_in` of the token response. While running, a background
+    task renews the token ahead of time so that callers never wait for a token fetch.
+    Concurrent renewals are coalesced into one request.
+    """
+
+    def __init__(self, refresh_margin: float):
+        self.refresh_margin = refresh_margin
+        self.stats = CacheStats(name="service_account_token")
+        self._token: str | None = None
+        self._expires_at = 0.0
+        self._refresh_at = 0.0
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._background_refresh: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        """
+        Whether the background refresh is running.
+        """
+        return self._task is not None and not self._task.done()
+
+    async def refresh(self, client: AsyncClient, stale_token: str | None = None) -> str:
+        """
+        Fetch a new token unless the current one was renewed while waiting.
+
+        Args:
+            client (AsyncClient): The HTTP client to use for making the request.
+            stale_token (str | None): A token rejected by Keycloak, renewed even if not expired.
+
+        Returns:
+            str: A valid token.
+
+        Raises:
+            KeycloakError: If there is an HTTP error while getting the token.
+        """
+        async with self._lock:
+            if (
+                self._token is not None
+                and self._token != stale_token
+                and time.monotonic() < self._refresh_at
+            ):
+                return self._token
+
+            requested_at = time.monotonic()
+            response = await fetch_service_account_token(client)
+
+            self._token = response.access_token
+            self._expires_at = requested_at + response.expires_in
+            self._refresh_at = self._expires_at - min(self.refresh_margin, response.expires_in / 2)
+            self.stats.refresh()
+            logger.debug(
+                "Renewed Keycloak service account token, expires in %ss", response.expires_in
+            )
+            return self._token
+
+    async def _refresh_quietly(self, client: AsyncClient) -> None:
+        try:
+            await self.refresh(client)
+        except KeycloakError:
+            # Already logged, the current token is still valid
+            pass
+
+    async def get_token(self, client: AsyncClient) -> str:
+        """
+        Get a valid service account token.
+
+        Args:
+            client (AsyncClient): The HTTP client to use for making the request.
+
+        Returns:
+            str: A valid token.
+
+        Raises:
+            KeycloakError: If there is no valid token and fetching one fails.
+        """
+        now = time.monotonic()
+        if self._token is not None and now < self._expires_at:
+            self.stats.hit()
+            if now >= self._refresh_at and not self.running:
+                if self._background_refresh is None or self._background_refresh.done():
+                    self._background_refresh = asyncio.create_task(self._refresh_quietly(client))
+            return self._token
+
+        self.stats.miss()
+        return await self.refresh(client)
+
+    async def _refresh_loop(self, client: AsyncClient) -> None:
+        failures = 0
+        while True:
+            try:
+                await self.refresh(client)
+            except KeycloakError:
+                # Already logged
+                failures += 1
+            # Anything else is a bug, but the token must still be renewed
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Unexpected error renewing Keycloak service account token")
+                failures += 1
+            else:
+                failures = 0
+
+            if failures:
+                delay = min(
+                    REFRESH_RETRY_INTERVAL * 2 ** (failures - 1), REFRESH_MAX_RETRY_INTERVAL
+                )
+            else:
+                delay = max(self._refresh_at - time.monotonic(), 0)
+            await asyncio.sleep(delay)
+
+    def start(self, client: AsyncClient) -> None:
+        """
+        Start renewing the token in the background.
+
+        Args:
+            client (AsyncClient): The HTTP client to use for making the requests.
+        """
+        if not self.running:
+            self._task = asyncio.create_task(self._refresh_loop(client))
+
+    async def stop(self) -> None:
+        """
+        Stop the background refresh.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+service_account_token = ServiceAccountToken(
+    refresh_margin=config.keycloak.service_account_refresh_margin
+)
+
+
+@traced
+async def get_service_account_token(client: AsyncClient) -> str:
+    """
+    Get a valid service account token from the token store.
+
+    Args:
+        client (AsyncClient): The HTTP client to use for making the request.
+
+    Returns:
+        str: The token from Keycloak.
+
+    Raises:
+        KeycloakError: If there is an HTTP error while getting the token.
+    """
+    return await service_account_token.get_token(client)
+
+
+async def admin_request(
+    client: AsyncClient,
+    method: str,
+    url: str,
+    json: Mapping[str, Any] | None = None,
+    valid_status_codes: tuple[int, ...] | None = None,
+) -> Response:
+    """
+    Send an authenticated request to the Keycloak admin API.
+
+    If Keycloak rejects the token (e.g. it was revoked or Keycloak was restarted)
+    the token is renewed and the request is retried once.
+
+    Args:
+        client (AsyncClient): The HTTP client to use for making the request.
+        method (str): The HTTP method to use.
+        url (str): The URL to send the request to.
+        json (Mapping[str, Any], optional): The JSON payload of the request.
+        valid_status_codes (tuple[int, ...], optional): The expected status codes.
+
+    Returns:
+        Response: The HTTP response.
+
+    Raises:
+        HTTPError: If there is an error sending the request or the status code is not valid.
+        KeycloakError: If there is an HTTP error while getting the token.
+    """
+    token = await get_service_account_token(client)
+    try:
+        return await http_request(
+            client,
+            method,
+            url,
+            headers={"Authorization": f"Bearer {token}"},
+            json=json,
+            valid_status_codes=valid_status_codes,
+        )
+    except HTTPStatusError as e:
+        if e.response.status_code != HTTPStatus.UNAUTHORIZED:
+            raise
+        logger.warning("Keycloak rejected the service account token --> Renewing token")
+
+    token = await service_account_token.refresh(client, stale_token=token)
+    return await http_request(
+        client,
+        method,
+        url,
+        headers={"Authorization": f"Bearer {token}"},
+        json=json,
+        valid_status_codes=valid_status_codes,
+    )
+
+
+@traced
 async def get_user(client: AsyncClient, user_uuid: str) -> User | None:
     """
     Get a user from Keycloak.
 
+    The user and the user's groups are requested concurrently.
+    Users are cached for `cache.keycloak_users_ttl` seconds.
+
     Args:
         client (AsyncClient): The HTTP client to use for making the request.
         user_uuid (str): The UUID of the user to get.
 
     Returns:
-        dict[str, Any]: The user information.
+        User | None: The user information or None if the user does not exist.
 
     Raises:
         KeycloakError: If there is an HTTP error while getting the user.
     """
+    if (cached_user := users_cache.get(user_uuid)) is not None:
+        # Callers modify the user before updating it
+        return cached_user.model_copy(deep=True)
+
     try:
-        token = await get_service_account_token(client)
-        headers = {"Authorization": f"Bearer {token}"}
         user_url = f"{config.keycloak.url}/admin/realms/{config.keycloak.realm}/users/{user_uuid}"
-        response = await http_request(
-            client, "GET", user_url, headers=headers, valid_status_codes=(200, 404)
+        response, groups_response = await asyncio.gather(
+            admin_request(client, "GET", user_url, valid_status_codes=(200, 404)),
+            admin_request(client, "GET", f"{user_url}/groups", valid_status_codes=(200, 404)),
         )
-
-        # Fetch the user's groups
-        if response.status_code == 200:
-            user_data = response.json()
-
-            groups_url = f"{user_url}/groups"
-            groups_response = await http_request(client, "GET", groups_url, headers=headers)
-            user_data["groups"] = groups_response.json()
-
-            return User(**user_data)
-        return None
     except HTTPError as e:
         logger.exception("Error getting user '%s' from Keycloak.", user_uuid)
         raise KeycloakError("Keycloak service error") from e
 
+    if response.status_code != 200 or groups_response.status_code != 200:
+        return None
 
+    user = User(**response.json(), groups=groups_response.json())
+    users_cache.set(user_uuid, user)
+    return user.model_copy(deep=True)
+
+
+@traced
 async def create_user(client: AsyncClient, user: User) -> str:
     """
     Create a user in Keycloak.
@@ -109,13 +343,9 @@ async def create_user(client: AsyncClient, user: User) -> str:
         KeycloakError: If there is an HTTP error while creating the user.
     """
     try:
-        token = await get_service_account_token(client)
-        headers = {"Authorization": f"Bearer {token}"}
         users_url = f"{config.keycloak.url}/admin/realms/{config.keycloak.realm}/users"
 
-        response = await http_request(
-            client, "POST", users_url, headers=headers, json=user.model_dump()
-        )
+        response = await admin_request(client, "POST", users_url, json=user.model_dump())
         # Keycloak provides the user location in headers which contains the uuid
         return extract_uuid_from_url(response.headers["location"])
     except HTTPError as e:
@@ -123,6 +353,7 @@ async def create_user(client: AsyncClient, user: User) -> str:
         raise KeycloakError("Keycloak service error") from e
 
 
+@traced
 async def delete_user(client: AsyncClient, user_uuid: str) -> None:
     """
     Delete a user from Keycloak.
@@ -134,16 +365,19 @@ async def delete_user(client: AsyncClient, user_uuid: str) -> None:
     Raises:
         KeycloakError: If there is an HTTP error while deleting the user.
     """
+    users_cache.delete(user_uuid)
     try:
-        token = await get_service_account_token(client)
-        headers = {"Authorization": f"Bearer {token}"}
         user_url = f"{config.keycloak.url}/admin/realms/{config.keycloak.realm}/users/{user_uuid}"
-        await http_request(client, "DELETE", user_url, headers=headers)
+        await admin_request(client, "DELETE", user_url)
     except HTTPError as e:
         logger.exception("Error deleting user with id '%s' from Keycloak.", user_uuid)
         raise KeycloakError("Keycloak service error") from e
+    finally:
+        # A concurrent lookup may have cached the user again while the request was in flight
+        users_cache.delete(user_uuid)
 
 
+@traced
 async def update_user(client: AsyncClient, user_uuid: str, user: User) -> User:
     """
     Updates a user in Keycloak.
@@ -159,20 +393,23 @@ async def update_user(client: AsyncClient, user_uuid: str, user: User) -> User:
     Raises:
         KeycloakError: If there is an HTTP error while updating the user.
     """
+    users_cache.delete(user_uuid)
     try:
-        token = await get_service_account_token(client)
-        headers = {"Authorization": f"Bearer {token}"}
         users_url = f"{config.keycloak.url}/admin/realms/{config.keycloak.realm}/users/{user_uuid}"
 
         # Keycloak returns 200 OK
         # https://www.keycloak.org/docs-api/22.0.1/rest-api/index.html#_users
-        await http_request(client, "PUT", users_url, headers=headers, json=user.model_dump())
+        await admin_request(client, "PUT", users_url, json=user.model_dump())
         return user
     except HTTPError as e:
         logger.exception("Error creating user '%s' to Keycloak.", user)
         raise KeycloakError("Keycloak service error") from e
+    finally:
+        # A concurrent lookup may have cached the user again while the request was in flight
+        users_cache.delete(user_uuid)
 
 
+@traced
 async def get_groups(client: AsyncClient) -> list[Group]:
     """
     Get all groups in Keycloak.
@@ -187,17 +424,45 @@ async def get_groups(client: AsyncClient) -> list[Group]:
         KeycloakError: If there is an HTTP error while getting the groups.
     """
     try:
-        token = await get_service_account_token(client)
-        headers = {"Authorization": f"Bearer {token}"}
         groups_url = f"{config.keycloak.url}/admin/realms/{config.keycloak.realm}/groups"
-        response = await http_request(client, "GET", groups_url, headers=headers)
+        response = await admin_request(client, "GET", groups_url)
 
-        return [Group(**group) for group in response.json()]
+        groups = [Group(**group) for group in response.json()]
     except HTTPError as e:
         logger.exception("Error getting groups from Keycloak.")
         raise KeycloakError("Keycloak service error") from e
 
+    groups_by_name.clear()
+    for group in groups:
+        groups_by_name.set(group.name, group)
+    return groups
+
+
+@traced
+async def get_group_by_name(client: AsyncClient, group_name: str) -> Group | None:
+    """
+    Get a group by its name.
+
+    Groups are served from an index refreshed at most every `cache.keycloak_groups_ttl`
+    seconds. Unknown group names reload the index as the group may have been just created.
+
+    Args:
+        client (AsyncClient): The HTTP client to use for making the request.
+        group_name (str): The name of the group.
+
+    Returns:
+        Group | None: The group or None if there is no group with given name.
+
+    Raises:
+        KeycloakError: If there is an HTTP error while getting the groups.
+    """
+    if (group := groups_by_name.get(group_name)) is not None:
+        return group
+
+    return next((group for group in await get_groups(client) if group.name == group_name), None)
+
 
+@traced
 async def modify_user_group_membership(
     client: AsyncClient, user_uuid: str, group_uuid: str, action: Literal["PUT", "DELETE"]
 ) -> None:
@@ -213,18 +478,17 @@ async def modify_user_group_membership(
     Raises:
         KeycloakError: If there is an HTTP error while modifying the group membership.
     """
+    users_cache.delete(user_uuid)
     try:
-        token = await get_service_account_token(client)
-        headers = {"Authorization": f"Bearer {token}"}
         membership_url = (
             f"{config.keycloak.url}/admin/realms/{config.keycloak.realm}/users/"
             f"{user_uuid}/groups/{group_uuid}"
         )
 
         if action == "PUT":
-            await http_request(client, action, membership_url, headers=headers)
+            await admin_request(client, action, membership_url)
         elif action == "DELETE":
-            await http_request(client, action, membership_url, headers=headers)
+            await admin_request(client, action, membership_url)
     except HTTPError as e:
         logger.exception(
             "Error modifying user '%s' group membership for group '%s' in Keycloak.",
@@ -232,3 +496,6 @@ async def modify_user_group_membership(
             group_uuid,
         )
         raise KeycloakError("Keycloak service error") from e
+    finally:
+        # A concurrent lookup may have cached the user again while the request was in flight
+        users_cache.delete(user_uuid)
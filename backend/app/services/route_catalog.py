@@ -0,0 +1,524 @@
+"""
+In-memory catalog of the key-auth routes of each APISIX instance.
+
+Route definitions change rarely compared to how often they are read, so the routes are
+kept as a parsed snapshot per instance and refreshed in the background.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import defaultdict
+from typing import Any
+from httpx import AsyncClient
+from app.config import settings, logger, APISixInstanceSettings
+from app.exceptions import APISIXError
+from app.models.apisix import (
+    APISixConsumer,
+    APISixConsumerGroup,
+    APISixRoute,
+    APISixRouteSnapshot,
+)
+from app.services import apisix
+from app.utils.cache import CacheStats
+from app.utils.tracing import traced
+
+config = settings()
+
+LIMIT_PLUGINS = ("limit-req", "limit-count")
+
+
+def route_list_version(raw_routes: list[dict[str, Any]]) -> str:
+    """
+    Create a version identifier for a raw route list.
+
+    Every change to a route in APISIX bumps its 'modifiedIndex' and 'update_time',
+    and deleting a route changes the number of routes.
+
+    Args:
+        raw_routes (list[dict[str, Any]]): The raw routes from the APISIX admin API.
+
+    Returns:
+        str: The version of the route list.
+    """
+    modified_index = max((route.get("modifiedIndex", 0) for route in raw_routes), default=0)
+    update_time = max(
+        (route.get("value", {}).get("update_time", 0) for route in raw_routes), default=0
+    )
+    return f"{len(raw_routes)}-{modified_index}-{update_time}"
+
+
+def parse_key_auth_routes(raw_routes: list[dict[str, Any]]) -> list[APISixRoute]:
+    """
+    Parse the routes that have the key-auth plugin enabled.
+
+    Args:
+        raw_routes (list[dict[str, Any]]): The raw routes from the APISIX admin API.
+
+    Returns:
+        list[APISixRoute]: The key-auth routes.
+    """
+    return [
+        APISixRoute(
+            uri=route["value"].get("uri", ""),
+            url=f"{config.apisix.global_gateway_url}{route['value'].get('uri', '')}",
+            plugins=route["value"]["plugins"],
+        )
+        for route in raw_routes
+        if route.get("value", {}).get("plugins", {}).get("key-auth") is not None
+    ]
+
+
+def limit_plugins_fingerprint(plugins: dict[str, Any]) -> str:
+    """
+    Create a fingerprint of the rate limit plugins in given plugin configuration.
+
+    Args:
+        plugins (dict[str, Any]): Plugins of a consumer group.
+
+    Returns:
+        str: The fingerprint, changes when any of the limit plugins changes.
+    """
+    return json.dumps({name: plugins.get(name) for name in LIMIT_PLUGINS}, sort_keys=True)
+
+
+def routes_version(
+    snapshot: APISixRouteSnapshot,
+    consumer: APISixConsumer | None,
+    consumer_group: APISixConsumerGroup | None,
+) -> str:
+    """
+    Create a version identifier for the routes with limits resolved for a consumer.
+
+    The resolved limits only depend on the routes and on the limit plugins of the
+    consumer group and of a consumer with its own limits.
+
+    Args:
+        snapshot (APISixRouteSnapshot): The route snapshot of an instance.
+        consumer (APISixConsumer | None): The consumer the limits are resolved for.
+        consumer_group (APISixConsumerGroup | None): The consumer group of the consumer.
+
+    Returns:
+        str: The version, changes when the resolved routes may change.
+    """
+    parts = [snapshot.instance_name, snapshot.version]
+    if consumer_group is not None:
+        parts.append(limit_plugins_fingerprint(consumer_group.plugins))
+    if consumer is not None and has_limit_override(consumer):
+        parts.append(limit_plugins_fingerprint(consumer.plugins))
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()[:32]
+
+
+def has_limit_override(consumer: APISixConsumer | None) -> bool:
+    """
+    Check whether a consumer has its own rate limits which take precedence over the others.
+
+    Args:
+        consumer (APISixConsumer | None): The consumer.
+
+    Returns:
+        bool: True if the consumer has limit plugins configured.
+    """
+    return consumer is not None and any(consumer.plugins.get(name) for name in LIMIT_PLUGINS)
+
+
+def resolve_route_limits(
+    routes: list[APISixRoute],
+    consumer: APISixConsumer | None,
+    consumer_group: APISixConsumerGroup | None,
+) -> list[dict[str, str]]:
+    """
+    Resolve and format the effective rate limits of given routes.
+
+    Args:
+        routes (list[APISixRoute]): The routes.
+        consumer (APISixConsumer | None): The consumer to resolve the limits for.
+        consumer_group (APISixConsumerGroup | None): The consumer group of the consumer.
+
+    Returns:
+        list[dict[str, str]]: The route urls with their formatted limits.
+    """
+    routes_with_limits = []
+    for route in routes:
+        # Determine effective rate limits
+        limit_req, limit_count, source = apisix.determine_rate_limits(
+            route.plugins, consumer, consumer_group
+        )
+
+        # Format limits as a human-readable string
+        limits_str = apisix.format_rate_limits(limit_req, limit_count, source)
+
+        routes_with_limits.append({"url": route.url, "limits": limits_str})
+
+    return routes_with_limits
+
+
+# Each kind of data cached per APISIX instance needs an attribute of its own
+class RouteCatalog:  # pylint: disable=too-many-instance-attributes
+    """
+    Keeps a snapshot of the key-auth routes and the consumer groups per APISIX instance.
+
+    When the background refresh is running the routes and groups are always served from
+    memory and the last good data is kept if a refresh fails. Without it (e.g. in tests)
+    they are refreshed on demand once they are older than `refresh_interval` seconds.
+    """
+
+    def __init__(self, refresh_interval: float):
+        self.refresh_interval = refresh_interval
+        self.stats = CacheStats(name="apisix_routes")
+        self.consumer_group_stats = CacheStats(name="apisix_consumer_groups")
+        self._snapshots: dict[str, APISixRouteSnapshot] = {}
+        self._refreshed_at: dict[str, float] = {}
+        self._consumer_groups: dict[str, dict[str, APISixConsumerGroup]] = {}
+        self._groups_refreshed_at: dict[str, float] = {}
+        self._errors: dict[str, APISIXError] = {}
+        self._locks: defaultdict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._task: asyncio.Task | None = None
+        # Resolved limits per instance and consumer group: {instance: {group: (fingerprint, table)}}
+        self._limit_tables: defaultdict[str, dict[str | None, tuple[str, list[dict[str, str]]]]] = (
+            defaultdict(dict)
+        )
+
+    @property
+    def running(self) -> bool:
+        """
+        Whether the background refresh is running.
+        """
+        return self._task is not None and not self._task.done()
+
+    async def refresh(
+        self, client: AsyncClient, instance: APISixInstanceSettings
+    ) -> APISixRouteSnapshot:
+        """
+        Load the routes of an instance and replace its snapshot if the routes have changed.
+
+        Args:
+            client (AsyncClient): The HTTP client to use for making the request.
+            instance (APISixInstanceSettings): The APISIX instance configuration.
+
+        Returns:
+            APISixRouteSnapshot: The current snapshot of the instance.
+
+        Raises:
+            APISIXError: If there is an error retrieving the routes.
+        """
+        async with self._locks[instance.name]:
+            try:
+                raw_routes = await apisix.get_raw_routes(client, instance)
+            except APISIXError as e:
+                self._errors[instance.name] = e
+                raise
+
+            self._errors.pop(instance.name, None)
+            self._refreshed_at[instance.name] = time.monotonic()
+
+            version = route_list_version(raw_routes)
+            current = self._snapshots.get(instance.name)
+            if current is not None and current.version == version:
+                return current
+
+            snapshot = APISixRouteSnapshot(
+                instance_name=instance.name,
+                version=version,
+                routes=parse_key_auth_routes(raw_routes),
+            )
+            self._snapshots[instance.name] = snapshot
+            self._limit_tables.pop(instance.name, None)
+            self._compile_limit_tables(instance.name)
+            self.stats.refresh()
+            logger.info(
+                "Loaded %d key-auth routes from APISIX instance '%s' (version %s)",
+                len(snapshot.routes),
+                instance.name,
+                version,
+            )
+            return snapshot
+
+    def _is_fresh(self, refreshed_at: float | None) -> bool:
+        if self.running:
+            return True
+        return refreshed_at is not None and time.monotonic() - refreshed_at < self.refresh_interval
+
+    async def get_snapshot(
+        self, client: AsyncClient, instance: APISixInstanceSettings
+    ) -> APISixRouteSnapshot:
+        """
+        Get the route snapshot of an instance, loading it if needed.
+
+        Args:
+            client (AsyncClient): The HTTP client to use for making the request.
+            instance (APISixInstanceSettings): The APISIX instance configuration.
+
+        Returns:
+            APISixRouteSnapshot: The snapshot of the instance.
+
+        Raises:
+            APISIXError: If the routes have never been loaded and loading them fails.
+        """
+        snapshot = self._snapshots.get(instance.name)
+        if snapshot is not None and self._is_fresh(self._refreshed_at.get(instance.name)):
+            self.stats.hit()
+            return snapshot
+
+        self.stats.miss()
+        try:
+            return await self.refresh(client, instance)
+        except APISIXError:
+            if snapshot is None:
+                raise
+            logger.warning("Serving stale routes for APISIX instance '%s'", instance.name)
+            return snapshot
+
+    async def refresh_consumer_groups(
+        self, client: AsyncClient, instance: APISixInstanceSettings
+    ) -> dict[str, APISixConsumerGroup]:
+        """
+        Load all the consumer groups of an instance and compile their limit tables.
+
+        Args:
+            client (AsyncClient): The HTTP client to use for making the request.
+            instance (APISixInstanceSettings): The APISIX instance configuration.
+
+        Returns:
+            dict[str, APISixConsumerGroup]: The consumer groups by their id.
+
+        Raises:
+            APISIXError: If there is an error retrieving the consumer groups.
+        """
+        async with self._locks[f"{instance.name}/consumer_groups"]:
+            groups = await apisix.get_apisix_consumer_groups(client, instance)
+            self._consumer_groups[instance.name] = {group.id: group for group in groups}
+            self._groups_refreshed_at[instance.name] = time.monotonic()
+            self.consumer_group_stats.refresh()
+            self._compile_limit_tables(instance.name)
+            return self._consumer_groups[instance.name]
+
+    async def get_consumer_group(
+        self, client: AsyncClient, instance: APISixInstanceSettings, group_id: str
+    ) -> APISixConsumerGroup | None:
+        """
+        Get a consumer group of an instance, loading the groups if needed.
+
+        Args:
+            client (AsyncClient): The HTTP client to use for making the request.
+            instance (APISixInstanceSettings): The APISIX instance configuration.
+            group_id (str): The consumer group ID.
+
+        Returns:
+            APISixConsumerGroup | None: The consumer group if it exists, None otherwise.
+
+        Raises:
+            APISIXError: If the groups have not been loaded and loading them fails.
+        """
+        groups = self._consumer_groups.get(instance.name)
+        if groups is not None and self._is_fresh(self._groups_refreshed_at.get(instance.name)):
+            self.consumer_group_stats.hit()
+            return groups.get(group_id)
+
+        self.consumer_group_stats.miss()
+        try:
+            groups = await self.refresh_consumer_groups(client, instance)
+        except APISIXError:
+            if groups is None:
+                raise
+            logger.warning("Serving stale consumer groups for APISIX instance '%s'", instance.name)
+        return groups.get(group_id)
+
+    def invalidate_consumer_groups(self) -> None:
+        """
+        Drop the cached consumer groups of all instances. They are reloaded on next use.
+        """
+        self._consumer_groups.clear()
+        self._groups_refreshed_at.clear()
+        logger.info("Invalidated cached APISIX consumer groups")
+
+    def _compile_limit_tables(self, instance_name: str) -> None:
+        if (snapshot := self._snapshots.get(instance_name)) is None:
+            return
+        self.get_limit_table(snapshot, None)
+        for group in self._consumer_groups.get(instance_name, {}).values():
+            self.get_limit_table(snapshot, group)
+
+    def get_limit_table(
+        self, snapshot: APISixRouteSnapshot, consumer_group: APISixConsumerGroup | None
+    ) -> list[dict[str, str]]:
+        """
+        Get the routes with the limits resolved for a consumer group.
+
+        The tables are compiled when the routes or the consumer groups change.
+
+        Args:
+            snapshot (APISixRouteSnapshot): The route snapshot of an instance.
+            consumer_group (APISixConsumerGroup | None): The consumer group or None.
+
+        Returns:
+            list[dict[str, str]]: The route urls with their formatted limits.
+        """
+        tables = self._limit_tables[snapshot.instance_name]
+        group_id = consumer_group.id if consumer_group else None
+        fingerprint = snapshot.version + (
+            limit_plugins_fingerprint(consumer_group.plugins) if consumer_group else ""
+        )
+
+        compiled = tables.get(group_id)
+        if compiled is None or compiled[0] != fingerprint:
+            compiled = (fingerprint, resolve_route_limits(snapshot.routes, None, consumer_group))
+            tables[group_id] = compiled
+        return compiled[1]
+
+    async def check_health(self, client: AsyncClient, instance: APISixInstanceSettings) -> str:
+        """
+        Check that the routes of an instance can be loaded.
+
+        With the background refresh running the result of the latest refresh is used.
+
+        Args:
+            client (AsyncClient): The HTTP client to use for making the request.
+            instance (APISixInstanceSettings): The APISIX instance configuration.
+
+        Returns:
+            str: "OK" if the instance is healthy.
+
+        Raises:
+            APISIXError: If the latest refresh of the instance failed.
+        """
+        if not self.running:
+            await self.refresh(client, instance)
+        elif instance.name in self._errors or instance.name not in self._snapshots:
+            raise APISIXError("APISIX service error")
+        return "OK"
+
+    async def refresh_all(self, client: AsyncClient) -> None:
+        """
+        Refresh the routes and consumer groups of all the APISIX instances.
+        Errors are logged, not raised.
+
+        Args:
+            client (AsyncClient): The HTTP client to use for making the requests.
+        """
+        await asyncio.gather(
+            *apisix.create_tasks(self.refresh, client),
+            *apisix.create_tasks(self.refresh_consumer_groups, client),
+            return_exceptions=True,
+        )
+
+    async def _refresh_loop(self, client: AsyncClient) -> None:
+        while True:
+            await self.refresh_all(client)
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self, client: AsyncClient) -> None:
+        """
+        Start refreshing the snapshots in the background.
+
+        Args:
+            client (AsyncClient): The HTTP client to use for making the requests.
+        """
+        if not self.running:
+            self._task = asyncio.create_task(self._refresh_loop(client))
+
+    async def stop(self) -> None:
+        """
+        Stop the background refresh.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+route_catalog = RouteCatalog(refresh_interval=config.apisix.route_refresh_interval)
+
+
+@traced
+async def get_versioned_routes_with_limits(
+    client: AsyncClient,
+    instance: APISixInstanceSettings,
+    consumer: APISixConsumer | None = None,
+) -> tuple[str, list[dict[str, str]]]:
+    """
+    Retrieve routes with their effective rate limits for a consumer and their version.
+
+    The limits come from a table precompiled per consumer group unless the consumer
+    has its own limits, in which case they are resolved per route.
+
+    Args:
+        client (AsyncClient): The HTTP client to use for making the request.
+        instance (APISixInstanceSettings): The APISIX instance configuration.
+        consumer (APISixConsumer | None): The consumer to check limits for.
+
+    Returns:
+        tuple[str, list[dict[str, str]]]: The version of the routes (see `routes_version`)
+            and a list of routes with rate limit information.
+
+    Raises:
+        APISIXError: If there is an error while retrieving the routes or the consumer group.
+    """
+    # Get consumer group if consumer exists
+    consumer_group = None
+    if consumer and consumer.group_id:
+        consumer_group = await route_catalog.get_consumer_group(client, instance, consumer.group_id)
+
+    snapshot = await route_catalog.get_snapshot(client, instance)
+    version = routes_version(snapshot, consumer, consumer_group)
+
+    if has_limit_override(consumer):
+        return version, resolve_route_limits(snapshot.routes, consumer, consumer_group)
+
+    return version, route_catalog.get_limit_table(snapshot, consumer_group)
+
+
+async def get_routes_with_limits(
+    client: AsyncClient,
+    instance: APISixInstanceSettings,
+    consumer: APISixConsumer | None = None,
+) -> list[dict[str, str]]:
+    """
+    Retrieve routes with their effective rate limits for a consumer.
+
+    Args:
+        client (AsyncClient): The HTTP client to use for making the request.
+        instance (APISixInstanceSettings): The APISIX instance configuration.
+        consumer (APISixConsumer | None): The consumer to check limits for.
+
+    Returns:
+        list[dict[str, str]]: A list of routes with rate limit information.
+
+    Raises:
+        APISIXError: If there is an error while retrieving the routes or the consumer group.
+    """
+    _version, routes = await get_versioned_routes_with_limits(client, instance, consumer)
+    return routes
+
+
+@traced
+async def get_routes_for_consumer(
+    client: AsyncClient, instance: APISixInstanceSettings, identifier: str
+) -> tuple[str, list[dict[str, str]]]:
+    """
+    Retrieve routes with their effective rate limits for the consumer with given identifier
+    and the version of the routes.
+
+    If the consumer cannot be retrieved the limits are resolved without consumer.
+
+    Args:
+        client (AsyncClient): The HTTP client to use for making the request.
+        instance (APISixInstanceSettings): The APISIX instance configuration.
+        identifier (str): The identifier of the consumer.
+
+    Returns:
+        tuple[str, list[dict[str, str]]]: The version of the routes
+            and a list of routes with rate limit information.
+
+    Raises:
+        APISIXError: If there is an error while retrieving the routes.
+    """
+    try:
+        consumer = await apisix.get_apisix_consumer(client, instance, identifier)
+    except APISIXError:
+        consumer = None
+    return await get_versioned_routes_with_limits(client, instance, consumer)
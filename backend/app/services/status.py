@@ -3,18 +3,29 @@ Service for checking the health of external services.
 """
 
 import asyncio
-from aiocache import cached, Cache  # type: ignore
+import hashlib
+import time
+from collections import defaultdict
+from typing import AsyncIterator
+from datetime import datetime, timezone
 from httpx import AsyncClient, HTTPStatusError
-from app.config import settings, logger
+from app.config import settings, logger, StatusServiceSettings
 from app.dependencies.http_client import http_request
-from app.models.status import ServiceHealth, ServiceStatus
-from app.models.response import StatusResponse
+from app.models.status import LatencyWindow, ServiceHealth, ServiceHistory, ServiceStatus
+from app.models.response import StatusHistoryResponse, StatusResponse
+from app.utils.ring_buffer import PROBE_DEGRADED, PROBE_DOWN, PROBE_UP, ProbeHistory, percentile
+from app.utils.tracing import traced
 
 config = settings()
 
 MAX_ATTEMPTS = config.status.max_attempts
 RETRY_DELAY = config.status.retry_delay
-STATUS_CACHE_TTL = config.status.cache_ttl
+
+PROBE_OUTCOMES = {
+    ServiceStatus.UP: PROBE_UP,
+    ServiceStatus.DEGRADED: PROBE_DEGRADED,
+    ServiceStatus.DOWN: PROBE_DOWN,
+}
 
 
 async def check_http_service(
@@ -39,20 +50,27 @@ async def check_http_service(
         retry_delay: Delay in seconds between retry attempts.
 
     Returns:
-        ServiceHealth with the result.
+        ServiceHealth with the result and the latency of the last attempt.
     """
     last_error = None
+    latency_ms = None
 
     for attempt in range(1, max_attempts + 1):
+        started = time.perf_counter()
         try:
             await http_request(client, "GET", url)
-            return ServiceHealth(name=name, status=ServiceStatus.UP, url=url)
+            latency_ms = (time.perf_counter() - started) * 1000
+            return ServiceHealth(name=name, status=ServiceStatus.UP, url=url, latency_ms=latency_ms)
         except HTTPStatusError as e:
+            latency_ms = (time.perf_counter() - started) * 1000
             status_code = e.response.status_code
             if status_code < 500:
-                return ServiceHealth(name=name, status=ServiceStatus.DEGRADED, url=url)
+                return ServiceHealth(
+                    name=name, status=ServiceStatus.DEGRADED, url=url, latency_ms=latency_ms
+                )
             last_error = f"HTTP {status_code}"
         except Exception as e:  # pylint: disable=broad-except
+            latency_ms = (time.perf_counter() - started) * 1000
             last_error = str(e)
 
         if attempt < max_attempts:
@@ -70,7 +88,7 @@ async def check_http_service(
     logger.warning(
         "Service check failed for %s after %d attempts: %s", name, max_attempts, last_error
     )
-    return ServiceHealth(name=name, status=ServiceStatus.DOWN, url=url)
+    return ServiceHealth(name=name, status=ServiceStatus.DOWN, url=url, latency_ms=latency_ms)
 
 
 def determine_overall_status(services: list[ServiceHealth]) -> ServiceStatus:
@@ -85,13 +103,239 @@ def determine_overall_status(services: list[ServiceHealth]) -> ServiceStatus:
     return ServiceStatus.DEGRADED
 
 
-@cached(cache=Cache.MEMORY, ttl=STATUS_CACHE_TTL, key="service_status")
+# The results, history and polling state of the monitored services belong together
+class StatusPoller:  # pylint: disable=too-many-instance-attributes
+    """
+    Keeps the latest health of each monitored service.
+
+    While running, each service is checked in a loop of its own every `poll_interval`
+    seconds, so a slow or failing service delays neither the other services nor the readers.
+    Readers get the latest results, results older than `stale_after` seconds are marked stale.
+    Without the background loops (e.g. in tests) services are checked on read when due.
+    The latency and outcome of the latest `history_size` checks of each service are kept
+    for computing the uptime and latency percentiles over the given `history_windows`.
+    """
+
+    def __init__(
+        self,
+        poll_interval: float,
+        stale_after: float,
+        history_size: int,
+        history_windows: list[int],
+    ):
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.history_size = history_size
+        self.history_windows = history_windows
+        self._history: dict[str, ProbeHistory] = {}
+        self._health: dict[str, ServiceHealth] = {}
+        self._checked_at: dict[str, float] = {}
+        self._locks: defaultdict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._tasks: list[asyncio.Task] = []
+        self._changed = asyncio.Event()
+        # Bumped when the status of a service changes, the built response is reused until then
+        self._version = 0
+        self._snapshot_key: tuple[int, tuple[bool, ...]] | None = None
+        self._snapshot: StatusResponse | None = None
+
+    @property
+    def running(self) -> bool:
+        """
+        Whether the background polling is running.
+        """
+        return any(not task.done() for task in self._tasks)
+
+    def _is_due(self, name: str) -> bool:
+        checked_at = self._checked_at.get(name)
+        return checked_at is None or time.monotonic() - checked_at >= self.poll_interval
+
+    async def check(self, client: AsyncClient, service: StatusServiceSettings) -> None:
+        """
+        Check a service unless it was checked within the poll interval.
+        Concurrent checks of the same service wait for the one in progress.
+
+        Args:
+            client (AsyncClient): The HTTP client used for making requests.
+            service (StatusServiceSettings): The service to check.
+        """
+        async with self._locks[service.name]:
+            if not self._is_due(service.name):
+                return
+            health = await check_http_service(client, service.name, service.url)
+            health.last_checked = datetime.now(timezone.utc)
+            previous = self._health.get(service.name)
+            self._health[service.name] = health
+            if previous is None or previous.status != health.status:
+                self._version += 1
+                self._notify_change()
+            if service.name not in self._history:
+                self._history[service.name] = ProbeHistory(self.history_size)
+            self._history[service.name].append(
+                health.last_checked.timestamp(),
+                (health.latency_ms or 0.0) / 1000,
+                PROBE_OUTCOMES[health.status],
+            )
+            self._checked_at[service.name] = time.monotonic()
+
+    def _notify_change(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_for_change(self, timeout: float) -> bool:
+        """
+        Wait until the status of a service changes.
+
+        Args:
+            timeout (float): How long to wait at most in seconds.
+
+        Returns:
+            bool: Whether a status changed before the timeout.
+        """
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    async def _refresh(self, client: AsyncClient, services: list[StatusServiceSettings]) -> None:
+        # With polling running only services not checked yet (right after startup) are awaited
+        pending = [
+            service
+            for service in services
+            if service.name not in self._health or (not self.running and self._is_due(service.name))
+        ]
+        if pending:
+            await asyncio.gather(*(self.check(client, service) for service in pending))
+
+    async def get_status(self, client: AsyncClient) -> StatusResponse:
+        """
+        Get the latest status of all configured services.
+
+        Args:
+            client (AsyncClient): The HTTP client used for making requests.
+
+        Returns:
+            StatusResponse: The overall and per-service status. The same object is returned
+                until a status changes or a result turns stale, it must not be modified.
+        """
+        services = config.status.services
+
+        if not services:
+            logger.warning("No services configured for status monitoring")
+
+        await self._refresh(client, services)
+
+        now = time.monotonic()
+        checked = [service.name for service in services if service.name in self._health]
+        stale = [now - self._checked_at[name] > self.stale_after for name in checked]
+        key = (self._version, tuple(stale))
+
+        if self._snapshot is None or self._snapshot_key != key:
+            results = [
+                self._health[name].model_copy(update={"stale": flag})
+                for name, flag in zip(checked, stale)
+            ]
+            snapshot = StatusResponse(overall=determine_overall_status(results), services=results)
+            # Derived from the statuses only, the latencies and check times are not part of the
+            # body, so the ETag stays the same while the services keep their status
+            snapshot.version = hashlib.sha256(snapshot.model_dump_json().encode()).hexdigest()[:32]
+            self._snapshot, self._snapshot_key = snapshot, key
+        return self._snapshot
+
+    async def get_history(self, client: AsyncClient) -> StatusHistoryResponse:
+        """
+        Get the uptime and latency percentiles of all configured services over each window.
+
+        The uptime is the share of checks where the service was up. The latency percentiles
+        cover the checks that got an answer, i.e. the service was up or degraded.
+
+        Args:
+            client (AsyncClient): The HTTP client used for making requests.
+
+        Returns:
+            StatusHistoryResponse: The history of each service.
+        """
+        services = config.status.services
+        await self._refresh(client, services)
+
+        now = time.time()
+        results = []
+        for service in services:
+            history = self._history.get(service.name)
+            windows = []
+            for window in self.history_windows:
+                latencies, outcomes = history.since(now - window) if history else ([], [])
+                answered = sorted(
+                    latency * 1000
+                    for latency, outcome in zip(latencies, outcomes)
+                    if outcome != PROBE_DOWN
+                )
+                windows.append(
+                    LatencyWindow(
+                        window=window,
+                        samples=len(outcomes),
+                        uptime=outcomes.count(PROBE_UP) / len(outcomes) if outcomes else None,
+                        p50_ms=percentile(answered, 0.50),
+                        p95_ms=percentile(answered, 0.95),
+                        p99_ms=percentile(answered, 0.99),
+                    )
+                )
+            health = self._health.get(service.name)
+            results.append(
+                ServiceHistory(
+                    name=service.name,
+                    url=service.url,
+                    latency_ms=health.latency_ms if health else None,
+                    last_checked=health.last_checked if health else None,
+                    windows=windows,
+                )
+            )
+
+        return StatusHistoryResponse(services=results)
+
+    async def _poll_loop(self, client: AsyncClient, service: StatusServiceSettings) -> None:
+        while True:
+            await self.check(client, service)
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self, client: AsyncClient) -> None:
+        """
+        Start polling each configured service in the background.
+
+        Args:
+            client (AsyncClient): The HTTP client to use for making the requests.
+        """
+        if not self.running:
+            self._tasks = [
+                asyncio.create_task(self._poll_loop(client, service))
+                for service in config.status.services
+            ]
+
+    async def stop(self) -> None:
+        """
+        Stop the background polling.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+status_poller = StatusPoller(
+    poll_interval=config.status.poll_interval,
+    stale_after=config.status.stale_after,
+    history_size=config.status.history_size,
+    history_windows=config.status.history_windows,
+)
+
+
+@traced
 async def fetch_service_status(client: AsyncClient) -> StatusResponse:
     """
-    Fetch and cache the status of all configured external services.
+    Get the status of all configured external services.
 
-    Services are loaded from config. Results are cached in memory for
-    STATUS_CACHE_TTL seconds.
+    The status is served from the latest results of the background poller,
+    so the latency does not depend on how the monitored services behave.
 
     Args:
         client: The HTTP client used for making requests.
@@ -100,14 +344,65 @@ async def fetch_service_status(client: AsyncClient) -> StatusResponse:
         StatusResponse with overall and per-service status.
     """
     logger.debug("Got a request to check service status")
+    return await status_poller.get_status(client)
+
+
+async def stream_service_status(
+    client: AsyncClient, heartbeat: float, expires_at: float | None = None
+) -> AsyncIterator[str]:
+    """
+    Stream the status of all configured external services as server-sent events.
+
+    The status is sent on start and then only when the status of a service, the overall
+    status or the staleness of a result changes. A comment line is sent every `heartbeat`
+    seconds without changes to keep the connection open through proxies.
 
-    checks = [check_http_service(client, svc.name, svc.url) for svc in config.status.services]
+    Args:
+        client: The HTTP client used for making requests.
+        heartbeat: Seconds between the keep-alive comments.
+        expires_at: When to end the stream in seconds since the epoch,
+            e.g. when the access token of the client expires.
+
+    Yields:
+        str: The server-sent events.
+    """
+    last_sent = None
+    changed = True
+
+    while True:
+        if changed:
+            snapshot = await status_poller.get_status(client)
+            signature = (
+                snapshot.overall,
+                [(service.name, service.status, service.stale) for service in snapshot.services],
+            )
+            if signature != last_sent:
+                last_sent = signature
+                yield f"data: {snapshot.model_dump_json()}\n\n"
+
+        timeout = heartbeat
+        if expires_at is not None:
+            timeout = min(timeout, expires_at - time.time())
+            if timeout <= 0:
+                return
 
-    if not checks:
-        logger.warning("No services configured for status monitoring")
+        changed = await status_poller.wait_for_change(timeout)
+        if not changed:
+            yield ": heartbeat\n\n"
+            # Results turn stale without any check completing
+            changed = True
 
-    services = await asyncio.gather(*checks)
-    overall = determine_overall_status(services)
 
-    logger.debug("Service status check complete: %s", overall.value)
-    return StatusResponse(overall=overall, services=services)
+@traced
+async def fetch_service_history(client: AsyncClient) -> StatusHistoryResponse:
+    """
+    Get the uptime and latency percentiles of all configured external services.
+
+    Args:
+        client: The HTTP client used for making requests.
+
+    Returns:
+        StatusHistoryResponse with the history of each service.
+    """
+    logger.debug("Got a request for the service status history")
+    return await status_poller.get_history(client)
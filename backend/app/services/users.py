@@ -2,19 +2,25 @@
 Business logic for users handlers
 """
 
-from typing import Literal
+from typing import AsyncIterator, Literal
 import asyncio
 from httpx import AsyncClient
-from app.config import logger
-from app.exceptions import KeycloakError
+from app.config import logger, settings
+from app.exceptions import KeycloakError, VaultError
 from app.services import apikey, keycloak, apisix
 from app.models.keycloak import User as KeycloakUser, Group
-from app.models.request import User
+from app.models.request import BulkAction, User
+from app.models.response import BulkUserResult
 from app.models.apisix import APISixConsumer
 from app.exceptions import APISIXError
 from app.constants import EUMETNET_USER_GROUP
+from app.utils.report import mark_rolled_back, track_operation
+from app.utils.tracing import traced
 
+config = settings()
 
+
+@traced
 async def delete_or_disable_user(
     client: AsyncClient,
     user_uuid: str,
@@ -38,6 +44,8 @@ async def delete_or_disable_user(
 
     user = User(id=user_uuid, groups=[])
 
+    apikey.forget_provisioned_user(user.id)
+
     log_action = "Disabling" if action == "DISABLE" else "Deleting"
 
     vault_users, apisix_users = await apikey.get_user_from_vault_and_apisix_instances(
@@ -78,6 +86,7 @@ async def delete_or_disable_user(
         raise KeycloakError("Keycloak service error") from e
 
 
+@traced
 async def modify_user_group(
     client: AsyncClient,
     user_uuid: str,
@@ -143,6 +152,8 @@ async def modify_user_group(
                     "Attempting to rollback the successfull Keycloak and APISIX operation(s)..."
                 )
 
+                mark_rolled_back()
+
                 # Rollback the user's group membership in Keycloak
                 await keycloak.modify_user_group_membership(
                     client, user_uuid, group_to_update.id, "DELETE" if action == "PUT" else "PUT"
@@ -183,3 +194,178 @@ async def modify_user_group(
 
     except KeycloakError as e:
         raise KeycloakError("Keycloak service error") from e
+    finally:
+        # The user's APISIX consumers may have changed, even if the operation was rolled back
+        apikey.forget_provisioned_user(User(id=user_uuid, groups=[]).id)
+
+
+@traced
+async def run_bulk_action(
+    client: AsyncClient,
+    user_uuid: str,
+    action: BulkAction,
+    group: Group | None = None,
+) -> Literal["OK", "NOT_FOUND"]:
+    """
+    Run a bulk admin action for a single user.
+
+    Args:
+        client (AsyncClient): The HTTP client to use for making requests.
+        user_uuid (str): The UUID of the user.
+        action (BulkAction): The action to perform on the user.
+        group (Group | None): The group to add/remove the user to/from for group actions.
+
+    Returns:
+        Literal["OK", "NOT_FOUND"]: Whether the action was performed or the user does not exist.
+
+    Raises:
+        APISIXError: If there is an error communicating with APISIX.
+        VaultError: If there is an error communicating with Vault.
+        KeycloakError: If there is an error communicating with Keycloak.
+    """
+    keycloak_user = await keycloak.get_user(client, user_uuid)
+
+    if keycloak_user is None or not keycloak_user.id:
+        return "NOT_FOUND"
+
+    if action in ("disable", "delete"):
+        await delete_or_disable_user(
+            client, user_uuid, keycloak_user, "DISABLE" if action == "disable" else "DELETE"
+        )
+    elif action == "enable":
+        keycloak_user.enabled = True
+        await keycloak.update_user(client, user_uuid, keycloak_user)
+    elif group is not None:
+        await modify_user_group(
+            client,
+            user_uuid,
+            keycloak_user.groups or [],
+            group,
+            "PUT" if action == "add-group" else "DELETE",
+        )
+
+    return "OK"
+
+
+async def apply_bulk_action(
+    client: AsyncClient,
+    user_uuid: str,
+    action: BulkAction,
+    group: Group | None = None,
+) -> BulkUserResult:
+    """
+    Apply a bulk admin action to a single user and report the outcome.
+
+    Args:
+        client (AsyncClient): The HTTP client to use for making requests.
+        user_uuid (str): The UUID of the user.
+        action (BulkAction): The action to perform on the user.
+        group (Group | None): The group to add/remove the user to/from for group actions.
+
+    Returns:
+        BulkUserResult: The outcome of the action, errors are reported instead of raised.
+    """
+    status: Literal["OK", "NOT_FOUND", "ERROR"]
+    detail = None
+
+    with track_operation() as report:
+        try:
+            status = await run_bulk_action(client, user_uuid, action, group)
+        except (VaultError, APISIXError, KeycloakError) as e:
+            logger.warning("Bulk action '%s' failed for user '%s': %s", action, user_uuid, e)
+            status, detail = "ERROR", str(e)
+        # Anything else is a bug, but it must not stop the other users of the batch
+        except Exception:  # pylint: disable=broad-exception-caught
+            logger.exception(
+                "Unexpected error in bulk action '%s' for user '%s'", action, user_uuid
+            )
+            status, detail = "ERROR", "Internal server error"
+
+    return BulkUserResult(
+        userUuid=user_uuid,
+        status=status,
+        detail=detail,
+        timings=report.timings_ms(),
+        rolledBack=report.rolled_back,
+    )
+
+
+# Keep references to the workers so that they are not garbage collected
+# while completing the users in progress after the consumer has stopped
+_bulk_workers: set[asyncio.Task] = set()
+
+
+async def iter_bulk_action(
+    client: AsyncClient,
+    user_uuids: list[str],
+    action: BulkAction,
+    group: Group | None = None,
+) -> AsyncIterator[tuple[int, BulkUserResult]]:
+    """
+    Apply a bulk admin action to several users and yield the outcomes as users complete.
+
+    A fixed pool of `admin.bulk_concurrency` workers takes users from a queue and puts
+    the outcomes to a queue of the same size, so memory use does not grow with the batch
+    size and the workers wait for a slow consumer. If the consumer stops early (e.g. the
+    client disconnects) the users in progress are completed but the remaining users are skipped.
+
+    Args:
+        client (AsyncClient): The HTTP client to use for making requests.
+        user_uuids (list[str]): The UUIDs of the users, duplicates are processed once.
+        action (BulkAction): The action to perform on the users.
+        group (Group | None): The group to add/remove the users to/from for group actions.
+
+    Yields:
+        tuple[int, BulkUserResult]: The position of the user in the deduplicated list
+            and the outcome for the user.
+    """
+    pending: asyncio.Queue[tuple[int, str]] = asyncio.Queue()
+    for item in enumerate(dict.fromkeys(user_uuids)):
+        pending.put_nowait(item)
+    total = pending.qsize()
+    completed: asyncio.Queue[tuple[int, BulkUserResult]] = asyncio.Queue(
+        maxsize=config.admin.bulk_concurrency
+    )
+
+    async def worker() -> None:
+        while not pending.empty():
+            index, user_uuid = pending.get_nowait()
+            await completed.put((index, await apply_bulk_action(client, user_uuid, action, group)))
+
+    for _ in range(min(config.admin.bulk_concurrency, total)):
+        task = asyncio.create_task(worker())
+        _bulk_workers.add(task)
+        task.add_done_callback(_bulk_workers.discard)
+
+    try:
+        for _ in range(total):
+            yield await completed.get()
+    finally:
+        while not pending.empty():
+            pending.get_nowait()
+        # Unblock the workers waiting to put an outcome nobody is going to read
+        while not completed.empty():
+            completed.get_nowait()
+
+
+async def apply_bulk_action_to_users(
+    client: AsyncClient,
+    user_uuids: list[str],
+    action: BulkAction,
+    group: Group | None = None,
+) -> list[BulkUserResult]:
+    """
+    Apply a bulk admin action to several users concurrently.
+    At most `admin.bulk_concurrency` users are processed at the same time.
+
+    Args:
+        client (AsyncClient): The HTTP client to use for making requests.
+        user_uuids (list[str]): The UUIDs of the users, duplicates are processed once.
+        action (BulkAction): The action to perform on the users.
+        group (Group | None): The group to add/remove the users to/from for group actions.
+
+    Returns:
+        list[BulkUserResult]: The outcome for each user in the given order.
+    """
+    results = [result async for result in iter_bulk_action(client, user_uuids, action, group)]
+    return [result for _index, result in sorted(results, key=lambda item: item[0])]
@@ -12,6 +12,7 @@ from app.dependencies.http_client import http_request
 from app.models.vault import VaultUser
 from app.config import VaultInstanceSettings
 from app.exceptions import VaultError
+from app.utils.tracing import traced
 
 config = settings()
 
@@ -60,6 +61,7 @@ def generate_api_key(identifier: str) -> str:
     return api_key
 
 
+@traced
 async def save_user_to_vault(
     client: AsyncClient,
     instance: VaultInstanceSettings,
@@ -108,6 +110,7 @@ async def save_user_to_vault(
         raise VaultError("Vault service error") from e
 
 
+@traced
 async def get_user_info_from_vault(
     client: AsyncClient, instance: VaultInstanceSettings, identifier: str
 ) -> VaultUser | None:
@@ -152,6 +155,7 @@ async def get_user_info_from_vault(
         raise VaultError("Vault service error") from e
 
 
+@traced
 async def delete_user_from_vault(
     client: AsyncClient, instance: VaultInstanceSettings, user: VaultUser
 ) -> VaultUser:
@@ -184,6 +188,7 @@ async def delete_user_from_vault(
         raise VaultError("Vault service error") from e
 
 
+@traced
 async def healthcheck(client: AsyncClient, instance: VaultInstanceSettings) -> str:
     """
     Check the health of the Vault service.
@@ -0,0 +1,161 @@
+"""
+Helpers shared by the in-memory caches of the application
+"""
+
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from dataclasses import dataclass, field
+from typing import Generic, TypeVar
+from app.utils.metrics import CACHE_EVENTS
+
+V = TypeVar("V")
+
+
+@dataclass
+class CacheStats:
+    """
+    Counters describing how a cache has been used.
+
+    Attributes:
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups that were not found in the cache.
+        refreshes (int): Times the cache content was (re)loaded from its source.
+        evictions (int): Entries dropped because the cache was full.
+        name (str | None): The cache label of the exported metrics, None to not export them.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    refreshes: int = 0
+    evictions: int = 0
+    name: str | None = field(default=None, compare=False)
+
+    def as_dict(self) -> dict[str, int]:
+        """
+        Return the counters as a dictionary.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "evictions": self.evictions,
+        }
+
+    def _export(self, event: str) -> None:
+        if self.name is not None:
+            CACHE_EVENTS.labels(self.name, event).inc()
+
+    def hit(self) -> None:
+        """
+        Count a lookup answered from the cache.
+        """
+        self.hits += 1
+        self._export("hit")
+
+    def miss(self) -> None:
+        """
+        Count a lookup not found in the cache.
+        """
+        self.misses += 1
+        self._export("miss")
+
+    def refresh(self) -> None:
+        """
+        Count a (re)load of the cache content.
+        """
+        self.refreshes += 1
+        self._export("refresh")
+
+    def evict(self) -> None:
+        """
+        Count an entry dropped because the cache was full.
+        """
+        self.evictions += 1
+        self._export("eviction")
+
+
+class LRUCache(Generic[V]):
+    """
+    Bounded in-memory cache with least recently used eviction and per entry expiry.
+
+    Expiry times are wall clock timestamps (seconds since epoch) so that they can be
+    taken directly from e.g. the 'exp' claim of a token.
+    """
+
+    def __init__(self, max_size: int, ttl: float | None = None, name: str | None = None):
+        """
+        Args:
+            max_size (int): Maximum number of entries, the least recently used is evicted.
+            ttl (float | None): Default time to live in seconds for entries, None for no expiry.
+            name (str | None): The cache label of the exported metrics, None to not export them.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stats = CacheStats(name=name)
+        self._entries: OrderedDict[Hashable, tuple[V, float | None]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> V | None:
+        """
+        Get a value from the cache.
+
+        Args:
+            key (Hashable): The key of the entry.
+
+        Returns:
+            V | None: The cached value or None if not found or expired.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.miss()
+            return None
+
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._entries[key]
+            self.stats.miss()
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats.hit()
+        return value
+
+    def set(self, key: Hashable, value: V, expires_at: float | None = None) -> None:
+        """
+        Add or replace a value in the cache.
+
+        Args:
+            key (Hashable): The key of the entry.
+            value (V): The value to cache.
+            expires_at (float | None): Wall clock time when the entry expires.
+                Defaults to now + the cache ttl.
+        """
+        if self.max_size <= 0:
+            return
+        if expires_at is None and self.ttl is not None:
+            expires_at = time.time() + self.ttl
+
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats.evict()
+
+    def delete(self, key: Hashable) -> None:
+        """
+        Remove an entry from the cache if it exists.
+
+        Args:
+            key (Hashable): The key of the entry.
+        """
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Remove all the entries from the cache.
+        """
+        self._entries.clear()
@@ -0,0 +1,144 @@
+"""
+Circuit breaker failing calls to a known-bad upstream immediately
+"""
+
+import time
+from collections import deque
+from typing import Literal
+from httpx import TransportError
+from app.config import logger
+from app.utils.metrics import CIRCUIT_BREAKER_FAILURE_RATE, CIRCUIT_BREAKER_STATE
+
+CircuitState = Literal["closed", "open", "half-open"]
+
+# Values of the circuit breaker state gauge
+STATE_VALUES: dict[CircuitState, int] = {"closed": 0, "half-open": 1, "open": 2}
+
+
+class CircuitOpenError(TransportError):
+    """
+    Raised instead of calling an upstream whose circuit is open.
+    Derives from the httpx errors so that the existing HTTPError handling applies.
+    """
+
+
+# The settings, counters and call window of an upstream belong together
+class CircuitBreaker:  # pylint: disable=too-many-instance-attributes
+    """
+    Tracks the outcome of the latest calls to an upstream.
+
+    The circuit opens when at least `failure_rate_threshold` of the latest `window_size`
+    calls have failed (after `minimum_calls` calls). While open, calls are rejected without
+    contacting the upstream. After `open_seconds` the circuit is half-open and a single
+    trial call is let through: its success closes the circuit, its failure opens it again.
+    The state and the failure rate are exported as gauges labelled with the upstream name.
+    """
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float,
+        minimum_calls: int,
+        window_size: int,
+        open_seconds: float,
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.minimum_calls = minimum_calls
+        self.open_seconds = open_seconds
+        self.state: CircuitState = "closed"
+        self.rejected_calls = 0
+        self.times_opened = 0
+        self._outcomes: deque[bool] = deque(maxlen=window_size)
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        # Bumped on every state change, outcomes of calls allowed in an earlier state are ignored
+        self._generation = 0
+        self._export()
+
+    @property
+    def failure_rate(self) -> float:
+        """
+        The share of failed calls in the window.
+        """
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def _set_state(self, state: CircuitState) -> None:
+        self.state = state
+        self._generation += 1
+        self._export()
+
+    def _export(self) -> None:
+        CIRCUIT_BREAKER_STATE.labels(self.name).set(STATE_VALUES[self.state])
+        CIRCUIT_BREAKER_FAILURE_RATE.labels(self.name).set(self.failure_rate)
+
+    def _open(self) -> None:
+        if self.state != "open":
+            self.times_opened += 1
+            logger.warning("Circuit breaker of upstream '%s' opened", self.name)
+        self._opened_at = time.monotonic()
+        self._set_state("open")
+
+    def _close(self) -> None:
+        logger.info("Circuit breaker of upstream '%s' closed", self.name)
+        self._outcomes.clear()
+        self._set_state("closed")
+
+    def before_call(self) -> int:
+        """
+        Check that a call to the upstream is allowed.
+
+        Returns:
+            int: The generation of the state the call is allowed in, to pass to `record`.
+
+        Raises:
+            CircuitOpenError: If the circuit is open or a half-open trial call is in flight.
+        """
+        if self.state == "open" and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._set_state("half-open")
+
+        if self.state == "open" or (self.state == "half-open" and self._trial_in_flight):
+            self.rejected_calls += 1
+            raise CircuitOpenError(f"Circuit breaker of upstream '{self.name}' is open")
+
+        if self.state == "half-open":
+            self._trial_in_flight = True
+        return self._generation
+
+    def record(self, success: bool | None, generation: int) -> None:
+        """
+        Record the outcome of a call allowed by `before_call`.
+
+        Outcomes of calls allowed before the latest state change are ignored, e.g. a slow call
+        started before the circuit opened must not decide the half-open trial.
+
+        Args:
+            success (bool | None): Whether the call succeeded,
+                None if the outcome is unknown (e.g. the call was cancelled).
+            generation (int): The generation returned by `before_call` for the call.
+        """
+        if generation != self._generation:
+            return
+
+        if self.state == "half-open":
+            self._trial_in_flight = False
+            if success is True:
+                self._close()
+            elif success is False:
+                self._open()
+            return
+
+        if success is None:
+            return
+
+        self._outcomes.append(success)
+        if (
+            len(self._outcomes) >= self.minimum_calls
+            and self.failure_rate >= self.failure_rate_threshold
+        ):
+            self._open()
+        else:
+            CIRCUIT_BREAKER_FAILURE_RATE.labels(self.name).set(self.failure_rate)
@@ -0,0 +1,258 @@
+"""
+Negotiated gzip and brotli compression of responses
+"""
+
+import gzip
+from typing import Callable
+import brotli  # type: ignore[import-untyped]
+from fastapi import Response
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config import CompressionSettings
+from app.utils.cache import LRUCache
+from app.utils.etag import (
+    REVALIDATE_CACHE_CONTROL,
+    encoded_etag,
+    etag_matches,
+    make_etag,
+    not_modified,
+)
+from app.utils.responses import RawJSONResponse
+
+# Preferred first when the client accepts both with the same quality
+SUPPORTED_ENCODINGS = ("br", "gzip")
+
+
+def negotiate_encoding(accept_encoding: str | None) -> str | None:
+    """
+    Choose the content encoding for a response from the Accept-Encoding header.
+
+    Args:
+        accept_encoding (str | None): The Accept-Encoding header of the request.
+
+    Returns:
+        str | None: "br" or "gzip", None if the client accepts neither.
+    """
+    if not accept_encoding:
+        return None
+
+    qualities: dict[str, float] = {}
+    for entry in accept_encoding.split(","):
+        coding, _, params = entry.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.strip().lower()] = quality
+
+    wildcard = qualities.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        quality = qualities.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str, gzip_level: int, brotli_quality: int) -> bytes:
+    """
+    Compress a response body.
+
+    Args:
+        body (bytes): The body to compress.
+        encoding (str): "br" or "gzip".
+        gzip_level (int): The gzip compression level, 1-9.
+        brotli_quality (int): The brotli compression quality, 0-11.
+
+    Returns:
+        bytes: The compressed body.
+    """
+    if encoding == "br":
+        return bytes(brotli.compress(body, mode=brotli.MODE_TEXT, quality=brotli_quality))
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+class PrecompressedBody:
+    """
+    A response body kept together with its compressed variants.
+
+    Each variant is compressed the first time it is requested, so the compression cost
+    of a cached snapshot body is paid once per snapshot and encoding.
+    """
+
+    def __init__(self, body: bytes, settings: CompressionSettings):
+        self.body = body
+        self.settings = settings
+        self._variants: dict[str, bytes] = {}
+
+    def negotiate(self, accept_encoding: str | None) -> str | None:
+        """
+        Choose the content encoding of the body for the client, without compressing it.
+
+        Args:
+            accept_encoding (str | None): The Accept-Encoding header of the request.
+
+        Returns:
+            str | None: "br" or "gzip", None if the body is sent uncompressed.
+        """
+        if not self.settings.enabled or len(self.body) < self.settings.minimum_size:
+            return None
+        return negotiate_encoding(accept_encoding)
+
+    def encode(self, accept_encoding: str | None) -> tuple[bytes, str | None]:
+        """
+        Get the body variant for the client.
+
+        Args:
+            accept_encoding (str | None): The Accept-Encoding header of the request.
+
+        Returns:
+            tuple[bytes, str | None]: The body and its content encoding,
+                None if the body is not compressed.
+        """
+        if (encoding := self.negotiate(accept_encoding)) is None:
+            return self.body, None
+
+        if (variant := self._variants.get(encoding)) is None:
+            variant = compress(
+                self.body, encoding, self.settings.gzip_level, self.settings.brotli_quality
+            )
+            self._variants[encoding] = variant
+        return variant, encoding
+
+
+# A cache of bodies read through its single get method
+class SnapshotBodies:  # pylint: disable=too-few-public-methods
+    """
+    Serialized and pre-compressed response bodies of snapshot-backed endpoints,
+    keyed by the snapshot version.
+    """
+
+    def __init__(self, max_size: int, settings: CompressionSettings, name: str | None = None):
+        self.settings = settings
+        self._bodies: LRUCache[PrecompressedBody] = LRUCache(max_size=max_size, name=name)
+
+    def get(self, version: str, serialize: Callable[[], bytes]) -> PrecompressedBody:
+        """
+        Get the body of a snapshot version, serializing it if not cached.
+
+        Args:
+            version (str): The version of the snapshot.
+            serialize (Callable[[], bytes]): Creates the JSON body of the snapshot.
+
+        Returns:
+            PrecompressedBody: The body of the snapshot.
+        """
+        if (body := self._bodies.get(version)) is None:
+            body = PrecompressedBody(serialize(), self.settings)
+            self._bodies.set(version, body)
+        return body
+
+
+def snapshot_response(
+    body: PrecompressedBody,
+    accept_encoding: str | None,
+    version: str,
+    if_none_match: str | None = None,
+) -> Response:
+    """
+    Create a JSON response of a snapshot body in the encoding accepted by the client.
+
+    Each encoding of the body has an entity tag of its own, when the If-None-Match header
+    matches any of them a 304 response without body is returned.
+
+    Args:
+        body (PrecompressedBody): The body of the snapshot.
+        accept_encoding (str | None): The Accept-Encoding header of the request.
+        version (str): The version of the snapshot.
+        if_none_match (str | None): The If-None-Match header of the request.
+
+    Returns:
+        Response: The RawJSONResponse with the caching headers,
+            or 304 Not Modified if the client has the current snapshot.
+    """
+    etag = make_etag(version, body.negotiate(accept_encoding))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    content, encoding = body.encode(accept_encoding)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": REVALIDATE_CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+    }
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return RawJSONResponse(content=content, headers=headers)
+
+
+# Pure ASGI middleware, __call__ is its only interface
+class CompressionMiddleware:  # pylint: disable=too-few-public-methods
+    """
+    Compress complete responses of at least `settings.minimum_size` bytes with the encoding
+    negotiated from the Accept-Encoding header.
+
+    Responses already having a Content-Encoding (e.g. pre-compressed snapshot bodies)
+    and streamed responses (server-sent events, NDJSON) are sent as they are.
+    The encoding is appended to a strong ETag of a compressed response.
+    """
+
+    def __init__(self, app: ASGIApp, settings: CompressionSettings):
+        self.app = app
+        self.settings = settings
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Message | None = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message, passthrough
+
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                if "content-encoding" in Headers(raw=message["headers"]):
+                    passthrough = True
+                    await send(message)
+                return
+
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            passthrough = True
+            if message.get("more_body", False) or len(body) < self.settings.minimum_size:
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = compress(
+                body, encoding, self.settings.gzip_level, self.settings.brotli_quality
+            )
+            headers = MutableHeaders(raw=start_message["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            if (etag := headers.get("ETag")) is not None:
+                headers["ETag"] = encoded_etag(etag, encoding)
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,83 @@
+"""
+Entity tags for conditional GET requests
+"""
+
+from http import HTTPStatus
+from fastapi import Response
+
+# Clients may reuse the response but have to revalidate it with If-None-Match first
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(version: str, encoding: str | None = None) -> str:
+    """
+    Create a strong entity tag from a version identifier.
+
+    Args:
+        version (str): Identifies the content of the response,
+            must not contain quotes or dashes.
+        encoding (str | None): The content encoding of the body, None if not compressed.
+            Each encoding of the content is a different representation with a tag of its own.
+
+    Returns:
+        str: The quoted entity tag, e.g. '"<version>"' or '"<version>-br"'.
+    """
+    return f'"{version}-{encoding}"' if encoding else f'"{version}"'
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """
+    Create the entity tag of a compressed variant of a response.
+
+    Args:
+        etag (str): The entity tag of the uncompressed response.
+        encoding (str): The content encoding of the compressed body.
+
+    Returns:
+        str: The entity tag with the encoding appended if it is strong,
+            weak tags are kept since compression does not change the content.
+    """
+    if etag.startswith("W/") or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def _version(etag: str) -> str:
+    # The tags of the compressed variants have the encoding appended to the version
+    return etag.strip().removeprefix("W/").strip('"').partition("-")[0]
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Check whether an If-None-Match header matches the current entity tag.
+
+    Args:
+        if_none_match (str | None): The If-None-Match header of the request.
+        etag (str): The current entity tag.
+
+    Returns:
+        bool: True if the client already has the current representation,
+            in any content encoding.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, so weak tags match too
+    return any(_version(tag) == _version(etag) for tag in if_none_match.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    """
+    Create a 304 Not Modified response.
+
+    Args:
+        etag (str): The current entity tag.
+
+    Returns:
+        Response: The response without body.
+    """
+    return Response(
+        status_code=HTTPStatus.NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": REVALIDATE_CACHE_CONTROL},
+    )
@@ -0,0 +1,150 @@
+"""
+Prometheus metrics of the application
+
+When the app runs in several worker processes, set the PROMETHEUS_MULTIPROC_DIR environment
+variable to an empty directory shared by the workers. Each worker then writes its samples to
+memory-mapped files in the directory and /metrics aggregates the files of all the workers.
+"""
+
+import os
+import time
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Label of requests matching none of the routes, e.g. scans, to bound the number of series
+UNMATCHED_ROUTE = "unmatched"
+
+REQUEST_DURATION = Histogram(
+    "devportal_request_duration_seconds",
+    "Time spent handling requests, by route template",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "devportal_requests_in_progress",
+    "Requests being handled",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+UPSTREAM_DURATION = Histogram(
+    "devportal_upstream_request_duration_seconds",
+    "Time spent waiting for Vault, APISIX, Keycloak and monitored services",
+    ["upstream", "method"],
+)
+UPSTREAM_ERRORS = Counter(
+    "devportal_upstream_errors",
+    "Failed upstream calls: transport errors, 5xx responses and calls rejected by an open circuit",
+    ["upstream", "reason"],
+)
+CACHE_EVENTS = Counter(
+    "devportal_cache_events",
+    "In-memory cache hits, misses, refreshes and evictions",
+    ["cache", "event"],
+)
+CIRCUIT_BREAKER_STATE = Gauge(
+    "devportal_circuit_breaker_state",
+    "State of the circuit breaker of each upstream: 0 closed, 1 half-open, 2 open",
+    ["upstream"],
+    multiprocess_mode="livemax",
+)
+CIRCUIT_BREAKER_FAILURE_RATE = Gauge(
+    "devportal_circuit_breaker_failure_rate",
+    "Share of failed calls among the latest calls tracked by the circuit breaker",
+    ["upstream"],
+    multiprocess_mode="livemax",
+)
+ROLLBACKS = Counter(
+    "devportal_rollbacks",
+    "API key changes rolled back after a partial failure",
+    ["rollback_from"],
+)
+
+
+def multiprocess_enabled() -> bool:
+    """
+    Whether the metrics are shared between worker processes.
+    """
+    return "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+
+def render_metrics() -> bytes:
+    """
+    Render the metrics in the Prometheus text format.
+
+    Returns:
+        bytes: The metrics of this process, or of all the worker processes in multiprocess mode.
+    """
+    if multiprocess_enabled():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_worker_stopped() -> None:
+    """
+    Drop the in-progress gauges of this process from the shared metrics. Called on shutdown.
+    """
+    if multiprocess_enabled():
+        multiprocess.mark_process_dead(os.getpid())
+
+
+def route_template(scope: Scope) -> str:
+    """
+    Get the path template of the route that handled the request, e.g. '/admin/users/{user_id}',
+    so that requests to the same endpoint share their series.
+
+    Args:
+        scope (Scope): The ASGI scope of the request, after the router has matched it.
+
+    Returns:
+        str: The path template or UNMATCHED_ROUTE.
+    """
+    route = scope.get("route")
+    return str(getattr(route, "path_format", None) or getattr(route, "path", UNMATCHED_ROUTE))
+
+
+# Pure ASGI middleware, __call__ is its only interface
+class MetricsMiddleware:  # pylint: disable=too-few-public-methods
+    """
+    Record the duration of the requests to each route and the number of requests in progress.
+
+    The status is taken from the start of the response, so streamed responses are counted
+    until their last chunk is sent. Requests failing with an unhandled exception count as 500.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        # The route is only known once the router has matched the request
+        in_progress = REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_progress.dec()
+            REQUEST_DURATION.labels(method, route_template(scope), str(status)).observe(
+                time.perf_counter() - started
+            )
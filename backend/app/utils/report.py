@@ -0,0 +1,113 @@
+"""
+Per operation report of upstream timings and rollbacks
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator
+
+
+@dataclass
+class UpstreamCall:
+    """
+    A single call made to an upstream.
+
+    Attributes:
+        upstream (str): The name of the upstream, e.g. 'vault:EWC'.
+        method (str): The HTTP method of the call.
+        started (float): When the call was started, in perf_counter seconds.
+        seconds (float): How long the call took.
+    """
+
+    upstream: str
+    method: str
+    started: float
+    seconds: float
+
+    @property
+    def ended(self) -> float:
+        """
+        When the call ended, in perf_counter seconds.
+        """
+        return self.started + self.seconds
+
+
+@dataclass
+class OperationReport:
+    """
+    Collects what happened while running a single operation (e.g. one user of a bulk action).
+
+    Attributes:
+        timings (dict[str, float]): Total seconds spent waiting for each upstream.
+        calls (list[UpstreamCall]): The upstream calls in the order they completed.
+        rolled_back (bool): Whether a rollback was performed.
+        parent (OperationReport | None): The report of the enclosing operation, if any,
+            which also gets the upstream calls (e.g. the whole request of a bulk action).
+    """
+
+    timings: dict[str, float] = field(default_factory=dict)
+    calls: list[UpstreamCall] = field(default_factory=list)
+    rolled_back: bool = False
+    parent: "OperationReport | None" = field(default=None, repr=False)
+
+    def timings_ms(self) -> dict[str, float]:
+        """
+        Get the upstream timings in milliseconds.
+        """
+        return {upstream: round(seconds * 1000, 1) for upstream, seconds in self.timings.items()}
+
+
+# Tasks started within the operation (e.g. with asyncio.gather) share the same report
+_current_report: ContextVar[OperationReport | None] = ContextVar("operation_report", default=None)
+
+
+@contextmanager
+def track_operation() -> Iterator[OperationReport]:
+    """
+    Collect a report of the operation run within the context.
+    Operations may be nested, the calls are then added to the enclosing reports too.
+
+    Yields:
+        OperationReport: The report filled while the operation runs.
+    """
+    report = OperationReport(parent=_current_report.get())
+    reset_token = _current_report.set(report)
+    try:
+        yield report
+    finally:
+        _current_report.reset(reset_token)
+
+
+def record_upstream_timing(
+    upstream: str, seconds: float, method: str = "", started: float | None = None
+) -> None:
+    """
+    Add a call to an upstream to the current report and its enclosing reports, if any.
+
+    Args:
+        upstream (str): The name of the upstream.
+        seconds (float): The time spent in seconds.
+        method (str): The HTTP method of the call.
+        started (float | None): When the call was started in perf_counter seconds,
+            defaults to `seconds` ago.
+    """
+    if (report := _current_report.get()) is None:
+        return
+
+    if started is None:
+        started = time.perf_counter() - seconds
+    call = UpstreamCall(upstream=upstream, method=method, started=started, seconds=seconds)
+    while report is not None:
+        report.timings[upstream] = report.timings.get(upstream, 0.0) + seconds
+        report.calls.append(call)
+        report = report.parent
+
+
+def mark_rolled_back() -> None:
+    """
+    Mark the current operation as rolled back, if a report is being collected.
+    """
+    if (report := _current_report.get()) is not None:
+        report.rolled_back = True
@@ -0,0 +1,20 @@
+"""
+Response classes
+"""
+
+from typing import Any
+from fastapi import Response
+
+
+class RawJSONResponse(Response):
+    """
+    JSON response whose content is already serialized, e.g. the cached body of a snapshot.
+    The bytes are sent as they are, without validating or encoding them again.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if not isinstance(content, bytes):
+            raise TypeError("RawJSONResponse content must be serialized JSON bytes")
+        return content
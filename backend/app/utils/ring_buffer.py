@@ -0,0 +1,89 @@
+"""
+Fixed-size ring buffer of service probe results
+"""
+
+import math
+from array import array
+
+# Outcome codes stored in the buffer, matching the ServiceStatus values
+PROBE_UP = 0
+PROBE_DEGRADED = 1
+PROBE_DOWN = 2
+
+
+class ProbeHistory:
+    """
+    Keeps the timestamp, latency and outcome of the latest `capacity` probes of a service.
+
+    The values are stored in preallocated arrays, the oldest probe is overwritten
+    once the buffer is full.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._timestamps = array("d", bytes(8 * capacity))
+        self._latencies = array("d", bytes(8 * capacity))
+        self._outcomes = array("b", bytes(capacity))
+        self._next = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, timestamp: float, latency: float, outcome: int) -> None:
+        """
+        Store the result of a probe.
+
+        Args:
+            timestamp (float): When the probe was made, in seconds since the epoch.
+            latency (float): How long the probe took in seconds.
+            outcome (int): PROBE_UP, PROBE_DEGRADED or PROBE_DOWN.
+        """
+        self._timestamps[self._next] = timestamp
+        self._latencies[self._next] = latency
+        self._outcomes[self._next] = outcome
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def since(self, timestamp: float) -> tuple[list[float], list[int]]:
+        """
+        Get the probes made at or after the given time.
+
+        Args:
+            timestamp (float): The start of the window, in seconds since the epoch.
+
+        Returns:
+            tuple[list[float], list[int]]: The latencies and the outcomes of the probes,
+                from the oldest to the newest.
+        """
+        latencies: list[float] = []
+        outcomes: list[int] = []
+        # Walk from the newest probe backwards and stop at the first one out of the window
+        for offset in range(1, self._size + 1):
+            index = (self._next - offset) % self.capacity
+            if self._timestamps[index] < timestamp:
+                break
+            latencies.append(self._latencies[index])
+            outcomes.append(self._outcomes[index])
+        latencies.reverse()
+        outcomes.reverse()
+        return latencies, outcomes
+
+
+def percentile(sorted_values: list[float], share: float) -> float | None:
+    """
+    Nearest-rank percentile of already sorted values.
+
+    Args:
+        sorted_values (list[float]): The values in ascending order.
+        share (float): The percentile as a share, e.g. 0.95.
+
+    Returns:
+        float | None: The percentile, None if there are no values.
+    """
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(len(sorted_values) * share))
+    return sorted_values[rank - 1]
@@ -0,0 +1,130 @@
+"""
+Server-Timing response header with the time spent on each upstream
+"""
+
+import re
+import time
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config import ServerTimingSettings, logger
+from app.utils.report import OperationReport, UpstreamCall, track_operation
+
+# Characters not allowed in a Server-Timing metric name (an HTTP token)
+_NON_TOKEN = re.compile(r"[^A-Za-z0-9!#$%&'*+.^_`|~-]")
+
+
+def server_timing_header(report: OperationReport, total_seconds: float) -> str:
+    """
+    Create the Server-Timing header value of a request, e.g.
+    'vault_EWC;desc="vault:EWC, 2 calls";dur=35.2, total;dur=40.1'.
+
+    Args:
+        report (OperationReport): The report of the request.
+        total_seconds (float): The time spent handling the request so far.
+
+    Returns:
+        str: One entry per upstream, slowest first, and the total.
+    """
+    counts: dict[str, int] = {}
+    for call in report.calls:
+        counts[call.upstream] = counts.get(call.upstream, 0) + 1
+
+    entries = []
+    for upstream, seconds in sorted(report.timings.items(), key=lambda item: -item[1]):
+        name = _NON_TOKEN.sub("_", upstream)
+        desc = upstream.replace("\\", "").replace('"', "")
+        calls = "call" if counts.get(upstream) == 1 else "calls"
+        entries.append(
+            f'{name};desc="{desc}, {counts.get(upstream, 0)} {calls}";dur={seconds * 1000:.1f}'
+        )
+    entries.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ", ".join(entries)
+
+
+def critical_path(calls: list[UpstreamCall]) -> list[UpstreamCall]:
+    """
+    Find the chain of upstream calls that determined when the last call completed.
+
+    Starting from the call that ended last, the call before it is the one that ended last
+    before it started, and so on. Calls made concurrently with the chain (e.g. the other
+    instances of a fan-out that answered sooner) are left out.
+
+    Args:
+        calls (list[UpstreamCall]): The upstream calls of a request.
+
+    Returns:
+        list[UpstreamCall]: The calls of the critical path in the order they were made.
+    """
+    path: list[UpstreamCall] = []
+    remaining = sorted(calls, key=lambda call: call.ended)
+    while remaining:
+        call = remaining.pop()
+        path.append(call)
+        remaining = [previous for previous in remaining if previous.ended <= call.started]
+    path.reverse()
+    return path
+
+
+def describe_critical_path(calls: list[UpstreamCall]) -> str:
+    """
+    Describe the critical path of upstream calls for logging.
+
+    Args:
+        calls (list[UpstreamCall]): The upstream calls of a request.
+
+    Returns:
+        str: E.g. '95.3 ms in keycloak GET 20.1 ms > vault:EWC POST 75.2 ms'.
+    """
+    path = critical_path(calls)
+    if not path:
+        return "no upstream calls"
+    steps = " > ".join(
+        f"{call.upstream} {call.method} {call.seconds * 1000:.1f} ms" for call in path
+    )
+    return f"{sum(call.seconds for call in path) * 1000:.1f} ms in {steps}"
+
+
+# Pure ASGI middleware, __call__ is its only interface
+class ServerTimingMiddleware:  # pylint: disable=too-few-public-methods
+    """
+    Collect the upstream calls made while handling each request and add a Server-Timing
+    header with the time spent on each upstream, so that slow requests can be triaged
+    from the browser developer tools.
+
+    The header is added when the response starts, calls made while a response is streamed
+    are not included. The critical path of upstream calls can be logged at debug level.
+    """
+
+    def __init__(self, app: ASGIApp, settings: ServerTimingSettings):
+        self.app = app
+        self.settings = settings
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+
+        with track_operation() as report:
+
+            async def send_with_timing(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    headers.append(
+                        "Server-Timing",
+                        server_timing_header(report, time.perf_counter() - started),
+                    )
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                if self.settings.log_critical_path:
+                    logger.debug(
+                        "%s %s took %.1f ms, critical path %s",
+                        scope["method"],
+                        scope["path"],
+                        (time.perf_counter() - started) * 1000,
+                        describe_critical_path(report.calls),
+                    )
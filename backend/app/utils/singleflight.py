@@ -0,0 +1,55 @@
+"""
+Single-flight coalescing of concurrent identical operations
+"""
+
+import asyncio
+from typing import Any, Callable, Coroutine, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """
+    Shares one in-flight call between concurrent callers using the same key.
+
+    The first caller for a key starts the call, later callers await the same result
+    (or exception) until the call completes. The call runs as a task of its own so
+    a cancelled caller does not abort the operation for the others.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[str, asyncio.Task[T]] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(
+        self, key: str, func: Callable[..., Coroutine[Any, Any, T]], *args: Any, **kwargs: Any
+    ) -> T:
+        """
+        Run the function or join the call already in flight for the key.
+
+        Args:
+            key (str): The key identifying identical operations.
+            func (Callable[..., Awaitable[T]]): The function to call.
+            *args (Any): The positional arguments passed to the function.
+            **kwargs (Any): The keyword arguments passed to the function.
+
+        Returns:
+            T: The result of the shared call.
+
+        Raises:
+            Exception: Any exception raised by the shared call.
+        """
+        if (task := self._calls.get(key)) is None:
+            task = asyncio.create_task(func(*args, **kwargs))
+            self._calls[key] = task
+            task.add_done_callback(lambda task: self._forget(key, task))
+
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task[T]) -> None:
+        self._calls.pop(key, None)
+        # Mark the exception as retrieved in case every caller was cancelled
+        if not task.cancelled():
+            task.exception()
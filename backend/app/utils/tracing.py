@@ -0,0 +1,324 @@
+"""
+In-process request tracing
+
+Each request is traced with a root span, and the service functions and upstream calls made
+while handling it get child spans. Tasks started within a span (e.g. with asyncio.gather)
+inherit it as their parent. Spans are only created within a traced request, background
+refreshes are not traced. Finished traces taking at least the slow threshold are kept in an
+in-memory ring buffer, no external collector is needed.
+"""
+
+import re
+import secrets
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Any, Callable, Coroutine, Iterator, ParamSpec, TypeVar
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config import TracingSettings, settings as app_settings
+from app.utils.metrics import route_template
+
+config = app_settings()
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+AttributeValue = str | int | float | bool
+
+TRACE_ID_HEADER = "X-Trace-Id"
+
+# W3C trace context, https://www.w3.org/TR/trace-context/#traceparent-header
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+@dataclass(slots=True)
+class Span:
+    """
+    A timed unit of work within a trace.
+
+    Attributes:
+        span_id (str): The id of the span, 16 hex characters.
+        parent_id (str | None): The id of the parent span, None for the root of a new trace.
+        name (str): What was done, e.g. 'GET /apikey' or 'vault.save_user_to_vault'.
+        started (float): When the span started, in perf_counter seconds.
+        seconds (float | None): How long the span took, None while it is running.
+        attributes (dict[str, AttributeValue]): Details of the work, e.g. the upstream.
+        error (str | None): The exception the work failed with, if any.
+    """
+
+    span_id: str
+    parent_id: str | None
+    name: str
+    started: float
+    seconds: float | None = None
+    attributes: dict[str, AttributeValue] = field(default_factory=dict)
+    error: str | None = None
+
+
+@dataclass(slots=True)
+class Trace:
+    """
+    The spans of a single request.
+
+    Attributes:
+        trace_id (str): The id of the trace, 32 hex characters.
+        started_at (float): When the trace started, in seconds since the epoch.
+        root (Span): The span of the whole request.
+        max_spans (int): The number of child spans kept, the rest are only counted.
+        spans (list[Span]): The finished child spans.
+        dropped_spans (int): Child spans not kept because of `max_spans`.
+    """
+
+    trace_id: str
+    started_at: float
+    root: Span
+    max_spans: int
+    spans: list[Span] = field(default_factory=list)
+    dropped_spans: int = 0
+
+    @property
+    def seconds(self) -> float:
+        """
+        How long the request took.
+        """
+        return self.root.seconds or 0.0
+
+    def add(self, child: Span) -> None:
+        """
+        Add a finished child span to the trace.
+
+        Args:
+            child (Span): The finished span.
+        """
+        if len(self.spans) < self.max_spans:
+            self.spans.append(child)
+        else:
+            self.dropped_spans += 1
+
+
+class TraceBuffer:
+    """
+    Keeps the latest `capacity` traces that took at least `slow_threshold` seconds.
+    """
+
+    def __init__(self, capacity: int, slow_threshold: float):
+        self.slow_threshold = slow_threshold
+        self._traces: deque[Trace] = deque(maxlen=capacity)
+
+    def __len__(self) -> int:
+        return len(self._traces)
+
+    def export(self, trace: Trace) -> None:
+        """
+        Keep a finished trace if it was slow.
+
+        Args:
+            trace (Trace): The finished trace.
+        """
+        if trace.seconds >= self.slow_threshold:
+            self._traces.append(trace)
+
+    def slowest(self, min_seconds: float = 0.0, limit: int | None = None) -> list[Trace]:
+        """
+        Get the kept traces, slowest first.
+
+        Args:
+            min_seconds (float): Leave out traces faster than this.
+            limit (int | None): The maximum number of traces, None for all.
+
+        Returns:
+            list[Trace]: The traces.
+        """
+        traces = sorted(
+            (trace for trace in self._traces if trace.seconds >= min_seconds),
+            key=lambda trace: trace.seconds,
+            reverse=True,
+        )
+        return traces[:limit]
+
+    def clear(self) -> None:
+        """
+        Forget all the kept traces.
+        """
+        self._traces.clear()
+
+
+trace_buffer = TraceBuffer(config.tracing.buffer_size, config.tracing.slow_threshold_ms / 1000)
+
+# The span running in the current task and the trace it belongs to
+_current: ContextVar[tuple[Trace, Span] | None] = ContextVar("current_span", default=None)
+
+
+def new_span_id() -> str:
+    """
+    Create a random span id.
+    """
+    return secrets.token_hex(8)
+
+
+def parse_traceparent(traceparent: str | None) -> tuple[str, str] | None:
+    """
+    Parse a W3C traceparent header.
+
+    Args:
+        traceparent (str | None): The header value.
+
+    Returns:
+        tuple[str, str] | None: The trace id and the parent span id, None if not valid.
+    """
+    if traceparent is None or (match := _TRACEPARENT.match(traceparent.strip())) is None:
+        return None
+    trace_id, parent_id = match.groups()
+    if trace_id == "0" * 32 or parent_id == "0" * 16:
+        return None
+    return trace_id, parent_id
+
+
+def current_traceparent() -> str | None:
+    """
+    Create the traceparent header of the current span, for propagating the trace to upstreams.
+
+    Returns:
+        str | None: The header value, None outside of a trace.
+    """
+    if (current := _current.get()) is None:
+        return None
+    trace, running = current
+    return f"00-{trace.trace_id}-{running.span_id}-01"
+
+
+def set_span_attribute(key: str, value: AttributeValue) -> None:
+    """
+    Add a detail to the current span, if any.
+
+    Args:
+        key (str): The name of the attribute.
+        value (AttributeValue): The value of the attribute.
+    """
+    if (current := _current.get()) is not None:
+        current[1].attributes[key] = value
+
+
+@contextmanager
+def span(name: str, **attributes: AttributeValue) -> Iterator[Span | None]:
+    """
+    Time the work run within the context as a child of the current span.
+    Outside of a trace nothing is recorded.
+
+    Args:
+        name (str): What is done.
+        **attributes (AttributeValue): Details of the work.
+
+    Yields:
+        Span | None: The running span, None outside of a trace.
+    """
+    if (current := _current.get()) is None:
+        yield None
+        return
+
+    trace, parent = current
+    child = Span(new_span_id(), parent.span_id, name, time.perf_counter(), attributes=attributes)
+    reset_token = _current.set((trace, child))
+    try:
+        yield child
+    except BaseException as e:
+        child.error = type(e).__name__
+        raise
+    finally:
+        _current.reset(reset_token)
+        child.seconds = time.perf_counter() - child.started
+        trace.add(child)
+
+
+def traced(func: Callable[P, Coroutine[Any, Any, R]]) -> Callable[P, Coroutine[Any, Any, R]]:
+    """
+    Decorate an async service function to run it in a span named after its module and name,
+    e.g. 'vault.save_user_to_vault'.
+
+    Args:
+        func (Callable[P, Coroutine[Any, Any, R]]): The function to trace.
+
+    Returns:
+        Callable[P, Coroutine[Any, Any, R]]: The traced function.
+    """
+    name = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+    @wraps(func)
+    async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        if _current.get() is None:
+            return await func(*args, **kwargs)
+        with span(name):
+            return await func(*args, **kwargs)
+
+    return wrapper
+
+
+@contextmanager
+def trace_request(
+    name: str, traceparent: str | None, max_spans: int, buffer: TraceBuffer
+) -> Iterator[tuple[Trace, Span]]:
+    """
+    Trace a request, continuing the trace of the caller if it sent a valid traceparent.
+    The finished trace is exported to the buffer.
+
+    Args:
+        name (str): The name of the root span.
+        traceparent (str | None): The traceparent header of the request.
+        max_spans (int): The number of spans kept in the trace.
+        buffer (TraceBuffer): Where the finished trace is exported.
+
+    Yields:
+        tuple[Trace, Span]: The trace and its root span.
+    """
+    trace_id, parent_id = parse_traceparent(traceparent) or (secrets.token_hex(16), None)
+    root = Span(new_span_id(), parent_id, name, time.perf_counter())
+    trace = Trace(trace_id, time.time(), root, max_spans)
+    reset_token = _current.set((trace, root))
+    try:
+        yield trace, root
+    except BaseException as e:
+        root.error = type(e).__name__
+        raise
+    finally:
+        _current.reset(reset_token)
+        root.seconds = time.perf_counter() - root.started
+        buffer.export(trace)
+
+
+# Pure ASGI middleware, __call__ is its only interface
+class TracingMiddleware:  # pylint: disable=too-few-public-methods
+    """
+    Trace each request with a root span named after its method and route template.
+    The trace id is sent back in the X-Trace-Id header for finding the trace later.
+    """
+
+    def __init__(self, app: ASGIApp, settings: TracingSettings):
+        self.app = app
+        self.settings = settings
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.settings.excluded_paths:
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = Headers(scope=scope).get("traceparent")
+        with trace_request(scope["method"], traceparent, self.settings.max_spans, trace_buffer) as (
+            trace,
+            root,
+        ):
+
+            async def send_with_trace_id(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    root.attributes["status"] = message["status"]
+                    MutableHeaders(scope=message).append(TRACE_ID_HEADER, trace.trace_id)
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_trace_id)
+            finally:
+                root.name = f"{scope['method']} {route_template(scope)}"
+                root.attributes["path"] = scope["path"]
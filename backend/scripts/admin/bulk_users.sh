@@ -0,0 +1,34 @@
+#!/bin/bash
+
+# Export all variables from the configuration file
+set -a
+source "$(dirname "$0")/config/load_config.sh"
+set +a
+
+# Retrieve the token
+TOKEN=$($(dirname "$0")/get_admin_token.sh | tail -n 1)
+
+# KC_BULK_ACTION is one of disable, enable, delete, add-group, remove-group
+# KC_USER_UUIDS is a whitespace separated list of user UUIDs
+USER_UUIDS=$(printf '"%s",' $KC_USER_UUIDS)
+USER_UUIDS="[${USER_UUIDS%,}]"
+BODY="{\"action\": \"$KC_BULK_ACTION\", \"userUuids\": $USER_UUIDS, \"groupName\": \"$KC_GROUP_NAME\"}"
+
+# Print the outcome of each user as soon as it is completed
+if [ "$KC_STREAM" = "true" ]; then
+  curl -s -N -X POST "$API_URL/admin/users/bulk" \
+    -H "Authorization: Bearer $TOKEN" \
+    -H "Content-Type: application/json" \
+    -H "Accept: application/x-ndjson" \
+    -d "$BODY"
+  exit
+fi
+
+STATUS_CODE=$(curl -s -o response.txt -w "%{http_code}" -X POST "$API_URL/admin/users/bulk" \
+  -H "Authorization: Bearer $TOKEN" \
+  -H "Content-Type: application/json" \
+  -d "$BODY")
+RESPONSE=$(cat response.txt)
+rm response.txt
+echo -e "\nRESPOMSE STATUS CODE: $STATUS_CODE"
+echo -e "\nRESPONSE MSG: $RESPONSE\n"
@@ -0,0 +1,103 @@
+"""
+Microbenchmark comparing per request rate limit resolution with the precompiled limit table.
+
+Run from the backend directory:
+    poetry run python -m scripts.benchmarks.rate_limits
+"""
+
+import timeit
+from typing import Any
+from app.models.apisix import APISixConsumer, APISixConsumerGroup, APISixRouteSnapshot
+from app.services import apisix
+from app.services.route_catalog import RouteCatalog, parse_key_auth_routes
+
+ROUTE_COUNT = 1000
+GROUP_IDS = ["User", "EumetnetUser", "Partner", "Internal"]
+REPEAT = 200
+
+
+def create_raw_routes(count: int) -> list[dict[str, Any]]:
+    """
+    Create key-auth routes where every other route has its own limits.
+    """
+    routes = []
+    for i in range(count):
+        plugins: dict[str, Any] = {"key-auth": {}}
+        if i % 2:
+            plugins["limit-req"] = {"rate": 10 + i % 7, "burst": 20}
+            plugins["limit-count"] = {"count": 100 * (i % 5 + 1), "time_window": 3600}
+        routes.append({"modifiedIndex": i, "value": {"uri": f"/route-{i}", "plugins": plugins}})
+    return routes
+
+
+def create_groups() -> list[APISixConsumerGroup]:
+    """
+    Create consumer groups with different limits.
+    """
+    return [
+        APISixConsumerGroup(
+            instance_name="EWC",
+            id=group_id,
+            plugins={"limit-count": {"count": 1000 * (i + 1), "time_window": 86400}},
+        )
+        for i, group_id in enumerate(GROUP_IDS)
+    ]
+
+
+def resolve_per_request(
+    snapshot: APISixRouteSnapshot, consumer: APISixConsumer, group: APISixConsumerGroup
+) -> list[dict[str, str]]:
+    """
+    The limit resolution done for every route on every request before the limit table.
+    """
+    return [
+        {
+            "url": route.url,
+            "limits": apisix.format_rate_limits(
+                *apisix.determine_rate_limits(route.plugins, consumer, group)
+            ),
+        }
+        for route in snapshot.routes
+    ]
+
+
+def main() -> None:
+    """
+    Run the benchmark and print the results.
+    """
+    snapshot = APISixRouteSnapshot(
+        instance_name="EWC",
+        version="benchmark",
+        routes=parse_key_auth_routes(create_raw_routes(ROUTE_COUNT)),
+    )
+    groups = create_groups()
+    consumers = [
+        APISixConsumer(instance_name="EWC", username=f"user{i}", plugins={}, group_id=[group.id])
+        for i, group in enumerate(groups)
+    ]
+    catalog = RouteCatalog(refresh_interval=60)
+
+    for consumer, group in zip(consumers, groups):
+        assert resolve_per_request(snapshot, consumer, group) == catalog.get_limit_table(
+            snapshot, group
+        )
+
+    def old() -> None:
+        for consumer, group in zip(consumers, groups):
+            resolve_per_request(snapshot, consumer, group)
+
+    def new() -> None:
+        for group in groups:
+            catalog.get_limit_table(snapshot, group)
+
+    old_time = timeit.timeit(old, number=REPEAT) / (REPEAT * len(groups))
+    new_time = timeit.timeit(new, number=REPEAT) / (REPEAT * len(groups))
+
+    print(f"{ROUTE_COUNT} routes, {len(groups)} consumer groups, {REPEAT} rounds")
+    print(f"per request resolution: {old_time * 1e6:10.1f} us/request")
+    print(f"precompiled limit table: {new_time * 1e6:9.1f} us/request")
+    print(f"speedup: {old_time / new_time:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark of GET /status requests per second, serializing the StatusResponse on every
+request through the response model compared to returning the pre-serialized snapshot bytes.
+
+The requests are made in-process through the ASGI transport with token validation
+skipped and the status poller running, so the numbers show the cost of the middleware,
+the handler and the serialization only.
+
+Run from the backend directory:
+    poetry run python -m scripts.benchmarks.status_rps
+"""
+
+import asyncio
+import time
+from typing import Callable, cast
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+from httpx import ASGITransport, AsyncClient
+from app.config import StatusServiceSettings
+from app.dependencies.http_client import get_http_client
+from app.dependencies.jwt_token import AccessToken, validate_token
+from app.main import app
+from app.models.response import StatusResponse
+from app.models.status import ServiceHealth, ServiceStatus
+from app.services import status
+
+SERVICE_COUNT = 20
+REQUESTS = 5000
+
+
+async def check_http_service(_client: AsyncClient, name: str, url: str) -> ServiceHealth:
+    """
+    Answer the checks without contacting the services.
+    """
+    return ServiceHealth(name=name, status=ServiceStatus.UP, url=url, latency_ms=42.0)
+
+
+MODEL_PATH = "/benchmark/status-model"
+
+
+def add_model_route() -> None:
+    """
+    Add the /status endpoint as it was, returning the model validated and serialized
+    per request, so that both variants go through the same middleware.
+    """
+    router = APIRouter()
+
+    @router.get(MODEL_PATH, response_model=StatusResponse, response_class=JSONResponse)
+    async def service_status(
+        _token: AccessToken = Depends(validate_token),
+        client: AsyncClient = Depends(get_http_client),
+    ) -> StatusResponse:
+        return await status.fetch_service_status(client)
+
+    app.include_router(router)
+
+
+async def measure(path: str, headers: dict[str, str]) -> float:
+    """
+    Make the requests one after another and return the requests per second.
+    """
+    async with AsyncClient(
+        transport=ASGITransport(app=cast(Callable, app)), base_url="http://benchmark"
+    ) as ac:
+        for _ in range(100):
+            (await ac.get(path, headers=headers)).raise_for_status()
+
+        started = time.perf_counter()
+        for _ in range(REQUESTS):
+            (await ac.get(path, headers=headers)).raise_for_status()
+        return REQUESTS / (time.perf_counter() - started)
+
+
+async def run() -> None:
+    """
+    Run the benchmark and print the results.
+    """
+    status.check_http_service = check_http_service  # type: ignore[assignment]
+    status.config.status.services = [
+        StatusServiceSettings(name=f"Service {i}", url=f"https://service-{i}.example.com")
+        for i in range(SERVICE_COUNT)
+    ]
+    app.dependency_overrides[validate_token] = lambda: None
+    add_model_route()
+
+    async with AsyncClient() as client:
+        status.status_poller.start(client)
+        await status.fetch_service_status(client)
+
+        before = await measure(MODEL_PATH, {})
+        after = await measure("/status", {})
+        compressed = await measure("/status", {"Accept-Encoding": "br, gzip"})
+
+        await status.status_poller.stop()
+
+    print(f"{SERVICE_COUNT} services, {REQUESTS} sequential requests")
+    print(f"response model, serialized per request: {before:8.0f} requests/s")
+    print(f"pre-serialized snapshot bytes:          {after:8.0f} requests/s")
+    print(f"pre-serialized and pre-compressed:      {compressed:8.0f} requests/s")
+    print(f"speedup: {after / before:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -2,11 +2,12 @@
 Pytest fixtures for actual tests.
 """
 
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Generator
 import asyncio
 import pytest
 from httpx import AsyncClient
 from app.config import settings, APISixInstanceSettings
+from app.dependencies.http_client import reset_circuit_breakers
 from tests.data import apisix, keycloak
 
 config = settings()
@@ -59,6 +60,16 @@ def anyio_backend() -> str:
     return "asyncio"
 
 
+@pytest.fixture(autouse=True)
+def circuit_breakers() -> Generator[None, None, None]:
+    """
+    Pytest fixture that resets the circuit breakers after each test
+    so that upstream failures simulated in one test do not affect the others.
+    """
+    yield
+    reset_circuit_breakers()
+
+
 @pytest.fixture(scope="session")
 async def client() -> AsyncGenerator[AsyncClient, None]:
     """
@@ -0,0 +1,114 @@
+"""
+Upstream HTTP client tests
+"""
+
+from typing import Callable, cast
+import pytest
+from pytest import MonkeyPatch
+from fastapi import Depends, FastAPI
+from httpx import AsyncClient, ASGITransport, MockTransport, Request, Response
+from app import main
+from app.config import settings
+from app.dependencies import http_client
+from app.dependencies.http_client import (
+    configured_upstreams,
+    create_upstream_mounts,
+    find_upstream,
+    get_http_client,
+    http_request,
+    mount_pattern,
+)
+
+pytestmark = pytest.mark.anyio
+
+config = settings()
+
+
+def test_each_upstream_has_own_connection_pool() -> None:
+    """
+    Test that every configured upstream gets a transport of its own.
+    """
+    mounts = create_upstream_mounts()
+    expected = {
+        *[mount_pattern(instance.url) for instance in config.vault.instances],
+        *[mount_pattern(instance.admin_url) for instance in config.apisix.instances],
+        mount_pattern(config.keycloak.url),
+    }
+
+    assert set(mounts) == expected
+    assert len({id(transport) for transport in mounts.values()}) == len(expected)
+
+
+def test_upstream_is_matched_on_path_boundaries() -> None:
+    """
+    Test that a url belongs to an upstream only if it is its base url or a path below it.
+    """
+    keycloak_url = config.keycloak.url.rstrip("/")
+
+    assert configured_upstreams() is configured_upstreams()
+    for url in (keycloak_url, f"{keycloak_url}/", f"{keycloak_url}/realms"):
+        assert getattr(find_upstream(url), "name", None) == "keycloak"
+    assert find_upstream(f"{keycloak_url}0/realms") is None
+    assert find_upstream(f"{keycloak_url}.example.org/realms") is None
+
+
+async def test_requests_use_upstream_timeouts(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that requests to an upstream use its timeouts and others use the client defaults.
+    """
+    # The upstreams are built once, so their timeout settings are changed in place
+    for name, value in {"connect": 1, "read": 10, "write": 2, "pool": 0.5}.items():
+        monkeypatch.setattr(config.keycloak.timeout, name, value)
+    timeouts: dict[str, dict[str, float]] = {}
+
+    def handler(request: Request) -> Response:
+        timeouts[request.url.host] = request.extensions["timeout"]
+        return Response(200)
+
+    async with AsyncClient(transport=MockTransport(handler), timeout=3) as client:
+        await http_request(client, "GET", f"{config.keycloak.url}/realms")
+        await http_request(client, "GET", "https://example.org/health")
+
+    keycloak_host = Request("GET", config.keycloak.url).url.host
+    assert timeouts[keycloak_host] == {"connect": 1, "read": 10, "write": 2, "pool": 0.5}
+    assert timeouts["example.org"] == {"connect": 3, "read": 3, "write": 3, "pool": 3}
+
+
+async def test_lifespan_shares_one_client_between_requests(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that the client is created once on startup, used by every request
+    and closed on shutdown.
+    """
+    created: list[AsyncClient] = []
+
+    def create_http_client() -> AsyncClient:
+        created.append(AsyncClient(transport=MockTransport(lambda _request: Response(200))))
+        return created[-1]
+
+    monkeypatch.setattr(http_client, "_client", None)
+    monkeypatch.setattr(http_client, "create_http_client", create_http_client)
+    # The background refreshes are not needed to check the client
+    for background in (main.service_account_token, main.route_catalog, main.status_poller):
+        monkeypatch.setattr(background, "start", lambda _client: None)
+
+    app = FastAPI(lifespan=main.lifespan)
+    used: list[AsyncClient] = []
+
+    @app.get("/client")
+    async def use_client(client: AsyncClient = Depends(get_http_client)) -> dict[str, str]:
+        used.append(client)
+        return {"message": "OK"}
+
+    async with main.lifespan(app):
+        async with AsyncClient(
+            transport=ASGITransport(app=cast(Callable, app)), base_url="http://test"
+        ) as ac:
+            for _ in range(3):
+                assert (await ac.get("/client")).status_code == 200
+
+        assert len(created) == 1
+        assert not created[0].is_closed
+
+    assert used == created * 3
+    assert created[0].is_closed
+    assert http_client._client is None
@@ -0,0 +1,95 @@
+"""
+JWKS store tests
+"""
+
+from typing import Any
+import asyncio
+import json
+import pytest
+from pytest import MonkeyPatch
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt import PyJWKClientConnectionError, PyJWKClientError
+from jwt.algorithms import RSAAlgorithm
+from app.dependencies import jwks
+from app.dependencies.jwks import JWKSStore
+
+# This is the same as using the @pytest.mark.anyio on all test functions in the module
+pytestmark = pytest.mark.anyio
+
+
+def create_jwk(kid: str) -> dict:
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(RSAAlgorithm.to_jwk(key.public_key()))
+    return {**jwk, "kid": kid, "alg": "RS256", "use": "sig"}
+
+
+def mock_fetch(monkeypatch: MonkeyPatch, key_sets: list[list[dict]]) -> list[str]:
+    calls: list[str] = []
+
+    async def fetch(url: str) -> dict:
+        calls.append(url)
+        return {"keys": key_sets[min(len(calls), len(key_sets)) - 1]}
+
+    monkeypatch.setattr(jwks, "fetch_jwks", fetch)
+    return calls
+
+
+async def test_keys_are_fetched_once_and_served_from_memory(monkeypatch: MonkeyPatch) -> None:
+    calls = mock_fetch(monkeypatch, [[create_jwk("a"), create_jwk("b")]])
+    store = JWKSStore("http://keycloak/certs", refresh_interval=300, min_refresh_interval=30)
+
+    for _ in range(5):
+        key = await store.get_signing_key("a")
+        assert key.key_id == "a"
+    assert (await store.get_signing_key("b")).key_id == "b"
+
+    assert len(calls) == 1
+    assert store.stats.as_dict() == {"hits": 6, "misses": 0, "refreshes": 1, "evictions": 0}
+
+
+async def test_unknown_kid_refreshes_keys(monkeypatch: MonkeyPatch) -> None:
+    calls = mock_fetch(monkeypatch, [[create_jwk("old")], [create_jwk("new")]])
+    store = JWKSStore("http://keycloak/certs", refresh_interval=300, min_refresh_interval=0)
+
+    assert (await store.get_signing_key("old")).key_id == "old"
+    assert (await store.get_signing_key("new")).key_id == "new"
+
+    assert len(calls) == 2
+    assert store.stats.misses == 1
+
+
+async def test_forced_refreshes_are_rate_limited(monkeypatch: MonkeyPatch) -> None:
+    calls = mock_fetch(monkeypatch, [[create_jwk("a")]])
+    store = JWKSStore("http://keycloak/certs", refresh_interval=300, min_refresh_interval=30)
+
+    await store.get_signing_key("a")
+    for _ in range(3):
+        with pytest.raises(PyJWKClientError):
+            await store.get_signing_key("unknown")
+
+    assert len(calls) == 1
+    assert store.stats.misses == 3
+
+
+async def test_failed_refresh_keeps_previous_keys(monkeypatch: MonkeyPatch) -> None:
+    mock_fetch(monkeypatch, [[create_jwk("a")]])
+    store = JWKSStore("http://keycloak/certs", refresh_interval=0, min_refresh_interval=0)
+    await store.get_signing_key("a")
+
+    async def failing_fetch(_url: str) -> dict:
+        raise PyJWKClientError("Keycloak is down")
+
+    monkeypatch.setattr(jwks, "fetch_jwks", failing_fetch)
+
+    assert (await store.get_signing_key("a")).key_id == "a"
+
+
+async def test_fetch_times_out_on_slow_keycloak(monkeypatch: MonkeyPatch) -> None:
+    async def slow_request(*_args: Any, **_kwargs: Any) -> None:
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(jwks, "http_request", slow_request)
+    monkeypatch.setattr(jwks.config.keycloak, "jwks_timeout", 0.1)
+
+    with pytest.raises(PyJWKClientConnectionError):
+        await jwks.fetch_jwks("http://keycloak/certs")
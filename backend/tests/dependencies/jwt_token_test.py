@@ -0,0 +1,115 @@
+"""
+Token validation dependency tests
+"""
+
+from typing import Callable, cast
+import asyncio
+import json
+import time
+import jwt
+import pytest
+from pytest import MonkeyPatch
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import Depends, FastAPI
+from httpx import AsyncClient, ASGITransport, MockTransport, Request, Response
+from jwt.algorithms import RSAAlgorithm
+from app.dependencies import jwks, jwt_token
+from app.dependencies.jwks import JWKSStore
+from app.dependencies.jwt_token import validate_token
+from app.models.request import AccessToken
+from app.utils.cache import LRUCache
+
+pytestmark = pytest.mark.anyio
+
+JWKS_DELAY = 0.5
+
+token_app = FastAPI()
+
+
+@token_app.get("/protected")
+async def protected(token: AccessToken = Depends(validate_token)) -> dict[str, str]:
+    return {"sub": token.sub}
+
+
+@token_app.get("/ping")
+async def ping() -> dict[str, str]:
+    return {"message": "pong"}
+
+
+def create_key_and_token() -> tuple[dict, str]:
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = {**json.loads(RSAAlgorithm.to_jwk(private_key.public_key())), "kid": "test"}
+    token = jwt.encode(
+        {
+            "sub": "user",
+            "preferred_username": "user",
+            "groups": ["User"],
+            "aud": "account",
+            "exp": int(time.time()) + 60,
+        },
+        private_key,
+        algorithm="RS256",
+        headers={"kid": "test"},
+    )
+    return jwk, token
+
+
+async def test_requests_progress_while_jwks_fetch_is_delayed(monkeypatch: MonkeyPatch) -> None:
+    jwk, token = create_key_and_token()
+
+    async def slow_keycloak(_request: Request) -> Response:
+        await asyncio.sleep(JWKS_DELAY)
+        return Response(200, json={"keys": [jwk]})
+
+    keycloak_client = AsyncClient(transport=MockTransport(slow_keycloak))
+
+    async def shared_http_client() -> AsyncClient:
+        return keycloak_client
+
+    # The keys are fetched and parsed as usual, only the Keycloak response is delayed
+    monkeypatch.setattr(jwks, "shared_http_client", shared_http_client)
+    monkeypatch.setattr(
+        jwt_token, "jwks_store", JWKSStore("http://keycloak/certs", 300, min_refresh_interval=30)
+    )
+    monkeypatch.setattr(jwt_token, "token_cache", LRUCache(max_size=10))
+
+    async with keycloak_client, AsyncClient(
+        transport=ASGITransport(app=cast(Callable, token_app)), base_url="http://test"
+    ) as ac:
+        started = time.monotonic()
+        protected_request = asyncio.create_task(
+            ac.get("/protected", headers={"Authorization": f"Bearer {token}"})
+        )
+        # Let the protected request start waiting for the keys
+        await asyncio.sleep(0.05)
+
+        ping_responses = await asyncio.gather(*[ac.get("/ping") for _ in range(20)])
+        ping_elapsed = time.monotonic() - started
+
+        assert not protected_request.done()
+        protected_response = await protected_request
+
+    assert all(response.status_code == 200 for response in ping_responses)
+    assert ping_elapsed < JWKS_DELAY
+    assert protected_response.status_code == 200
+    assert protected_response.json() == {"sub": "user"}
+
+
+async def test_verified_token_is_served_from_cache(monkeypatch: MonkeyPatch) -> None:
+    jwk, token = create_key_and_token()
+
+    async def fetch(_url: str) -> dict:
+        return {"keys": [jwk]}
+
+    store = JWKSStore("http://keycloak/certs", 300, min_refresh_interval=30)
+    cache: LRUCache[AccessToken] = LRUCache(max_size=10)
+    monkeypatch.setattr(jwks, "fetch_jwks", fetch)
+    monkeypatch.setattr(jwt_token, "jwks_store", store)
+    monkeypatch.setattr(jwt_token, "token_cache", cache)
+
+    first = await validate_token(token)
+    second = await validate_token(token)
+
+    assert first is second
+    assert store.stats.hits == 1
+    assert cache.stats.hits == 1
@@ -2,6 +2,7 @@
 Tests for users routes
 """
 
+import json
 from typing import Callable, cast
 import pytest
 from httpx import AsyncClient, ASGITransport
@@ -11,6 +12,7 @@ from app.services import keycloak, apikey, apisix
 from app.models.keycloak import User as KeycloakUser
 from app.models.request import User
 from app.exceptions import KeycloakError
+from app.utils.tracing import trace_buffer
 from tests.data.keycloak import KEYCLOAK_USERS
 
 pytestmark = pytest.mark.anyio
@@ -496,3 +498,155 @@ async def test_remove_user_from_other_group_persists_group_in_apisix(
         user = await keycloak.get_user(client, uuid)
 
         assert user is None
+
+
+async def test_invalidate_consumer_groups_without_admin_role_fails(
+    get_keycloak_user_token: Callable,
+) -> None:
+    async with AsyncClient(
+        transport=ASGITransport(app=cast(Callable, app)), base_url=BASE_URL
+    ) as ac:
+        response = await ac.delete(
+            "/admin/cache/consumer-groups",
+            headers={"Authorization": f"Bearer {get_keycloak_user_token}"},
+        )
+
+        assert response.status_code == 403
+
+
+async def test_invalidate_consumer_groups_with_admin_role_succeeds(
+    get_keycloak_realm_admin_token: Callable,
+) -> None:
+    async with AsyncClient(
+        transport=ASGITransport(app=cast(Callable, app)), base_url=BASE_URL
+    ) as ac:
+        response = await ac.delete(
+            "/admin/cache/consumer-groups",
+            headers={"Authorization": f"Bearer {get_keycloak_realm_admin_token}"},
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {"message": "OK"}
+
+
+async def test_bulk_disable_users(
+    client: AsyncClient, get_keycloak_realm_admin_token: Callable
+) -> None:
+    uuid = await keycloak.create_user(client, KeycloakUser(**KEYCLOAK_USERS[3]))
+
+    async with AsyncClient(
+        transport=ASGITransport(app=cast(Callable, app)), base_url=BASE_URL
+    ) as ac:
+        response = await ac.post(
+            "/admin/users/bulk",
+            headers={"Authorization": f"Bearer {get_keycloak_realm_admin_token}"},
+            json={"action": "disable", "userUuids": [uuid, "123-456-789"]},
+        )
+
+        assert response.status_code == 200
+        assert [
+            (result["userUuid"], result["status"]) for result in response.json()["results"]
+        ] == [(uuid, "OK"), ("123-456-789", "NOT_FOUND")]
+        assert "keycloak" in response.json()["results"][0]["timings"]
+
+        user = await keycloak.get_user(client, uuid)
+
+        assert user.enabled == False
+
+        await keycloak.delete_user(client, uuid)
+
+
+async def test_bulk_enable_users_streams_ndjson(
+    client: AsyncClient, get_keycloak_realm_admin_token: Callable
+) -> None:
+    uuid = await keycloak.create_user(client, KeycloakUser(**KEYCLOAK_USERS[3]))
+
+    async with AsyncClient(
+        transport=ASGITransport(app=cast(Callable, app)), base_url=BASE_URL
+    ) as ac:
+        response = await ac.post(
+            "/admin/users/bulk",
+            headers={
+                "Authorization": f"Bearer {get_keycloak_realm_admin_token}",
+                "Accept": "application/x-ndjson",
+            },
+            json={"action": "enable", "userUuids": [uuid]},
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+
+        lines = [json.loads(line) for line in response.text.splitlines()]
+
+        assert len(lines) == 1
+        assert lines[0]["userUuid"] == uuid
+        assert lines[0]["status"] == "OK"
+        assert lines[0]["rolledBack"] is False
+
+        await keycloak.delete_user(client, uuid)
+
+
+async def test_bulk_add_group_with_unknown_group_fails(
+    get_keycloak_realm_admin_token: Callable,
+) -> None:
+    async with AsyncClient(
+        transport=ASGITransport(app=cast(Callable, app)), base_url=BASE_URL
+    ) as ac:
+        response = await ac.post(
+            "/admin/users/bulk",
+            headers={"Authorization": f"Bearer {get_keycloak_realm_admin_token}"},
+            json={"action": "add-group", "userUuids": ["123"], "groupName": "NoSuchGroup"},
+        )
+
+        assert response.status_code == 404
+
+
+async def test_bulk_users_without_admin_role_fails(get_keycloak_user_token: Callable) -> None:
+    async with AsyncClient(
+        transport=ASGITransport(app=cast(Callable, app)), base_url=BASE_URL
+    ) as ac:
+        response = await ac.post(
+            "/admin/users/bulk",
+            headers={"Authorization": f"Bearer {get_keycloak_user_token}"},
+            json={"action": "delete", "userUuids": ["123"]},
+        )
+
+        assert response.status_code == 403
+
+
+async def test_slow_traces_with_admin_role_succeeds(
+    get_keycloak_realm_admin_token: Callable, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(trace_buffer, "slow_threshold", 0)
+    trace_buffer.clear()
+
+    async with AsyncClient(
+        transport=ASGITransport(app=cast(Callable, app)), base_url=BASE_URL
+    ) as ac:
+        traced_response = await ac.get("/health")
+        response = await ac.get(
+            "/admin/traces",
+            headers={"Authorization": f"Bearer {get_keycloak_realm_admin_token}"},
+        )
+
+        assert response.status_code == 200
+        traces = {trace["traceId"]: trace for trace in response.json()["traces"]}
+        trace = traces[traced_response.headers["X-Trace-Id"]]
+
+        assert trace["name"] == "GET /health"
+        assert trace["spans"][0]["name"] == "GET /health"
+        assert "vault.healthcheck" in [span["name"] for span in trace["spans"]]
+
+    trace_buffer.clear()
+
+
+async def test_slow_traces_without_admin_role_fails(get_keycloak_user_token: Callable) -> None:
+    async with AsyncClient(
+        transport=ASGITransport(app=cast(Callable, app)), base_url=BASE_URL
+    ) as ac:
+        response = await ac.get(
+            "/admin/traces",
+            headers={"Authorization": f"Bearer {get_keycloak_user_token}"},
+        )
+
+        assert response.status_code == 403
@@ -2,14 +2,14 @@
 Tests for status routes
 """
 
-from typing import Callable, cast
+from typing import AsyncIterator, Callable, cast
 from unittest.mock import AsyncMock, patch
 import pytest
 from httpx import AsyncClient, ASGITransport
 from app.main import app
 from app.config import settings
-from app.models.status import ServiceHealth, ServiceStatus
-from app.models.response import StatusResponse
+from app.models.status import LatencyWindow, ServiceHealth, ServiceHistory, ServiceStatus
+from app.models.response import StatusHistoryResponse, StatusResponse
 
 pytestmark = pytest.mark.anyio
 
@@ -110,4 +110,111 @@ async def test_get_status_with_no_services(get_keycloak_user_token: Callable) ->
     data = response.json()
 
     assert data["overall"] == "up"
-    assert data["services"] == []
\ No newline at end of file
+    assert data["services"] == []
+
+
+async def test_get_status_history_without_token_fails() -> None:
+    async with AsyncClient(
+        transport=ASGITransport(app=cast(Callable, app)), base_url=BASE_URL
+    ) as ac:
+        response = await ac.get("/status/history")
+
+    assert response.status_code == 401
+
+
+async def test_get_status_history_with_valid_token_succeeds(
+    get_keycloak_user_token: Callable,
+) -> None:
+    mock_response = StatusHistoryResponse(
+        services=[
+            ServiceHistory(
+                name="Test Service",
+                url="https://example.com",
+                windows=[
+                    LatencyWindow(
+                        window=3600, samples=120, uptime=0.99, p50_ms=80, p95_ms=150, p99_ms=400
+                    )
+                ],
+            ),
+        ],
+    )
+
+    with patch(
+        "app.services.status.fetch_service_history",
+        new_callable=AsyncMock,
+        return_value=mock_response,
+    ):
+        async with AsyncClient(
+            transport=ASGITransport(app=cast(Callable, app)), base_url=BASE_URL
+        ) as ac:
+            response = await ac.get(
+                "/status/history", headers={"Authorization": f"Bearer {get_keycloak_user_token}"}
+            )
+
+    assert response.status_code == 200
+    data = response.json()
+
+    assert data["services"][0]["name"] == "Test Service"
+    assert data["services"][0]["windows"] == [
+        {
+            "window": 3600,
+            "samples": 120,
+            "uptime": 0.99,
+            "p50_ms": 80.0,
+            "p95_ms": 150.0,
+            "p99_ms": 400.0,
+        }
+    ]
+
+
+async def test_get_status_stream_without_token_fails() -> None:
+    async with AsyncClient(
+        transport=ASGITransport(app=cast(Callable, app)), base_url=BASE_URL
+    ) as ac:
+        response = await ac.get("/status/stream")
+
+    assert response.status_code == 401
+
+
+async def test_get_status_stream_with_valid_token_succeeds(
+    get_keycloak_user_token: Callable,
+) -> None:
+    async def stream_service_status(*_args: object) -> AsyncIterator[str]:
+        yield "data: {}\n\n"
+
+    with patch("app.services.status.stream_service_status", stream_service_status):
+        async with AsyncClient(
+            transport=ASGITransport(app=cast(Callable, app)), base_url=BASE_URL
+        ) as ac:
+            response = await ac.get(
+                "/status/stream", headers={"Authorization": f"Bearer {get_keycloak_user_token}"}
+            )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text == "data: {}\n\n"
+
+
+async def test_get_status_returns_not_modified_for_current_etag(
+    get_keycloak_user_token: Callable,
+) -> None:
+    mock_response = StatusResponse(overall=ServiceStatus.UP, services=[], version="3a00")
+
+    with patch(
+        "app.services.status.fetch_service_status",
+        new_callable=AsyncMock,
+        return_value=mock_response,
+    ):
+        async with AsyncClient(
+            transport=ASGITransport(app=cast(Callable, app)), base_url=BASE_URL
+        ) as ac:
+            headers = {"Authorization": f"Bearer {get_keycloak_user_token}"}
+            response = await ac.get("/status", headers=headers)
+            etag = response.headers["ETag"]
+            not_modified = await ac.get("/status", headers={**headers, "If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert etag == '"3a00"'
+    assert not_modified.status_code == 304
+    assert not_modified.headers["ETag"] == etag
+    assert not_modified.content == b""
@@ -0,0 +1,106 @@
+"""
+Tests for the APISIX read strategies
+"""
+
+import asyncio
+import pytest
+from pytest import MonkeyPatch
+from httpx import AsyncClient
+from app.config import settings, APISixInstanceSettings
+from app.exceptions import APISIXError
+from app.services import apisix
+
+pytestmark = pytest.mark.anyio
+
+config = settings()
+
+
+def create_reader(delays: dict[str, float], failing: set[str]) -> tuple:
+    called: list[str] = []
+
+    async def read(_client: AsyncClient, instance: APISixInstanceSettings, value: str) -> str:
+        called.append(instance.name)
+        await asyncio.sleep(delays.get(instance.name, 0))
+        if instance.name in failing:
+            raise APISIXError("APISIX service error")
+        return f"{instance.name}:{value}"
+
+    return read, called
+
+
+async def test_primary_queries_only_the_first_instance(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(config.apisix, "read_strategy", "primary")
+    read, called = create_reader({}, set())
+
+    result = await apisix.read_from_instances(read, AsyncClient(), "x")
+
+    assert result == f"{config.apisix.instances[0].name}:x"
+    assert called == [config.apisix.instances[0].name]
+
+
+async def test_primary_falls_back_to_next_instance(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(config.apisix, "read_strategy", "primary")
+    first, second = config.apisix.instances[0].name, config.apisix.instances[1].name
+    read, called = create_reader({}, {first})
+
+    result = await apisix.read_from_instances(read, AsyncClient(), "x")
+
+    assert result == f"{second}:x"
+    assert called == [first, second]
+
+
+async def test_error_is_raised_when_all_instances_fail(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(config.apisix, "read_strategy", "primary")
+    read, _called = create_reader({}, {instance.name for instance in config.apisix.instances})
+
+    with pytest.raises(APISIXError):
+        await apisix.read_from_instances(read, AsyncClient(), "x")
+
+
+async def test_hedged_uses_faster_instance_when_primary_is_slow(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(config.apisix, "read_strategy", "hedged")
+    monkeypatch.setattr(config.apisix, "hedge_delay", 0.05)
+    first, second = config.apisix.instances[0].name, config.apisix.instances[1].name
+    read, called = create_reader({first: 1}, set())
+
+    result = await apisix.read_from_instances(read, AsyncClient(), "x")
+
+    assert result == f"{second}:x"
+    assert called == [first, second]
+
+
+async def test_hedged_does_not_query_second_instance_when_primary_is_fast(
+    monkeypatch: MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(config.apisix, "read_strategy", "hedged")
+    monkeypatch.setattr(config.apisix, "hedge_delay", 0.5)
+    read, called = create_reader({}, set())
+
+    await apisix.read_from_instances(read, AsyncClient(), "x")
+
+    assert called == [config.apisix.instances[0].name]
+
+
+async def test_all_queries_every_instance(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(config.apisix, "read_strategy", "all")
+    first = config.apisix.instances[0].name
+    read, called = create_reader({}, {first})
+
+    result = await apisix.read_from_instances(read, AsyncClient(), "x")
+
+    assert result == f"{config.apisix.instances[1].name}:x"
+    assert sorted(called) == sorted(instance.name for instance in config.apisix.instances)
+
+
+async def test_all_skips_cancelled_instances(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(config.apisix, "read_strategy", "all")
+    first = config.apisix.instances[0].name
+
+    async def read(_client: AsyncClient, instance: APISixInstanceSettings, value: str) -> str:
+        if instance.name == first:
+            raise asyncio.CancelledError()
+        return f"{instance.name}:{value}"
+
+    result = await apisix.read_from_instances(read, AsyncClient(), "x")
+
+    assert result == f"{config.apisix.instances[1].name}:x"
@@ -0,0 +1,125 @@
+"""
+Keycloak user and group cache tests
+"""
+
+import asyncio
+from typing import Any, Iterator
+import pytest
+from pytest import MonkeyPatch
+from httpx import AsyncClient, Request, Response
+from app.models.keycloak import User
+from app.services import keycloak
+
+pytestmark = pytest.mark.anyio
+
+MOCK_UUID = "mock-uuid"
+
+
+@pytest.fixture(autouse=True)
+def clear_caches() -> Iterator[None]:
+    keycloak.users_cache.clear()
+    keycloak.groups_by_name.clear()
+    yield
+    keycloak.users_cache.clear()
+    keycloak.groups_by_name.clear()
+
+
+def mock_admin_api(
+    monkeypatch: MonkeyPatch, delay: float = 0, write_delay: float = 0
+) -> list[tuple[str, str]]:
+    requests: list[tuple[str, str]] = []
+
+    async def admin_request(
+        _client: AsyncClient, method: str, url: str, **_kwargs: Any
+    ) -> Response:
+        requests.append((method, url.rsplit("/", 1)[-1]))
+        await asyncio.sleep(delay if method == "GET" else write_delay)
+        if url.endswith("/groups") and MOCK_UUID in url:
+            body: Any = [{"id": "1", "name": "EUMETNET_USER"}]
+        elif url.endswith("/groups"):
+            body = [{"id": "1", "name": "EUMETNET_USER"}, {"id": "2", "name": "USER"}]
+        else:
+            body = {"id": MOCK_UUID, "enabled": True}
+        return Response(200, json=body, request=Request(method, url))
+
+    monkeypatch.setattr(keycloak, "admin_request", admin_request)
+    return requests
+
+
+async def test_user_and_groups_are_fetched_concurrently(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that the user and the user's groups are requested at the same time.
+    """
+    requests = mock_admin_api(monkeypatch, delay=0.1)
+
+    async with AsyncClient() as client:
+        started = asyncio.get_running_loop().time()
+        user = await keycloak.get_user(client, MOCK_UUID)
+        elapsed = asyncio.get_running_loop().time() - started
+
+    assert user is not None and user.groups == ["EUMETNET_USER"]
+    assert len(requests) == 2
+    assert elapsed < 0.2
+
+
+async def test_user_is_cached_until_modified(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that users are served from the cache and dropped from it when modified.
+    """
+    requests = mock_admin_api(monkeypatch)
+
+    async with AsyncClient() as client:
+        user = await keycloak.get_user(client, MOCK_UUID)
+        assert user is not None
+
+        # Changes to the returned user must not leak into the cache
+        user.enabled = False
+        cached_user = await keycloak.get_user(client, MOCK_UUID)
+        assert cached_user is not None and cached_user.enabled is True
+        assert len(requests) == 2
+
+        await keycloak.update_user(client, MOCK_UUID, user)
+        await keycloak.get_user(client, MOCK_UUID)
+
+    assert [method for method, _ in requests] == ["GET", "GET", "PUT", "GET", "GET"]
+
+
+@pytest.mark.parametrize("write", ["delete", "update", "membership"])
+async def test_user_cached_during_write_is_dropped(monkeypatch: MonkeyPatch, write: str) -> None:
+    """
+    Test that a user looked up while a write is in flight is not served after the write.
+    """
+    requests = mock_admin_api(monkeypatch, write_delay=0.05)
+
+    async with AsyncClient() as client:
+        if write == "delete":
+            write_request = keycloak.delete_user(client, MOCK_UUID)
+        elif write == "update":
+            write_request = keycloak.update_user(client, MOCK_UUID, User(id=MOCK_UUID, groups=[]))
+        else:
+            write_request = keycloak.modify_user_group_membership(client, MOCK_UUID, "1", "PUT")
+        await asyncio.gather(write_request, keycloak.get_user(client, MOCK_UUID))
+        requests.clear()
+
+        await keycloak.get_user(client, MOCK_UUID)
+
+    assert [method for method, _ in requests] == ["GET", "GET"]
+
+
+async def test_group_by_name_is_served_from_index(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that groups are resolved by name from the cached index.
+    """
+    requests = mock_admin_api(monkeypatch)
+
+    async with AsyncClient() as client:
+        eumetnet_group = await keycloak.get_group_by_name(client, "EUMETNET_USER")
+        user_group = await keycloak.get_group_by_name(client, "USER")
+        assert len(requests) == 1
+
+        # Unknown group names reload the index
+        assert await keycloak.get_group_by_name(client, "UNKNOWN") is None
+        assert len(requests) == 2
+
+    assert eumetnet_group is not None and eumetnet_group.id == "1"
+    assert user_group is not None and user_group.id == "2"
@@ -0,0 +1,175 @@
+"""
+Keycloak service account token tests
+"""
+
+import asyncio
+from typing import Any
+import pytest
+from pytest import MonkeyPatch
+from freezegun import freeze_time
+from httpx import AsyncClient, HTTPStatusError, Request, Response
+from app.exceptions import KeycloakError
+from app.models.keycloak import TokenResponse
+from app.services import keycloak
+from app.services.keycloak import ServiceAccountToken
+
+pytestmark = pytest.mark.anyio
+
+
+def mock_token_endpoint(
+    monkeypatch: MonkeyPatch, expires_in: int = 300, delay: float = 0
+) -> list[str]:
+    issued: list[str] = []
+
+    async def fetch_service_account_token(_client: AsyncClient) -> TokenResponse:
+        await asyncio.sleep(delay)
+        issued.append(f"token-{len(issued) + 1}")
+        return TokenResponse(access_token=issued[-1], expires_in=expires_in)
+
+    monkeypatch.setattr(keycloak, "fetch_service_account_token", fetch_service_account_token)
+    return issued
+
+
+async def test_concurrent_token_requests_are_coalesced(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that concurrent callers without a token share one token request.
+    """
+    issued = mock_token_endpoint(monkeypatch, delay=0.01)
+    token_store = ServiceAccountToken(refresh_margin=30)
+
+    async with AsyncClient() as client:
+        tokens = await asyncio.gather(*(token_store.get_token(client) for _ in range(5)))
+
+    assert tokens == ["token-1"] * 5
+    assert issued == ["token-1"]
+
+
+async def test_token_is_renewed_before_expiry(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that the token honours expires_in and is renewed in the background before expiry.
+    """
+    issued = mock_token_endpoint(monkeypatch, expires_in=60)
+    token_store = ServiceAccountToken(refresh_margin=10)
+
+    async with AsyncClient() as client:
+        with freeze_time() as frozen_time:
+            assert await token_store.get_token(client) == "token-1"
+
+            frozen_time.tick(45)
+            assert await token_store.get_token(client) == "token-1"
+            assert issued == ["token-1"]
+
+            # Within the refresh margin the current token is served while renewing
+            frozen_time.tick(10)
+            assert await token_store.get_token(client) == "token-1"
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            assert await token_store.get_token(client) == "token-2"
+
+
+async def test_expired_token_is_fetched_again(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that an expired token is not served.
+    """
+    issued = mock_token_endpoint(monkeypatch, expires_in=60)
+    token_store = ServiceAccountToken(refresh_margin=10)
+
+    async with AsyncClient() as client:
+        with freeze_time() as frozen_time:
+            await token_store.get_token(client)
+            frozen_time.tick(61)
+            assert await token_store.get_token(client) == "token-2"
+
+    assert len(issued) == 2
+
+
+async def test_background_refresh_keeps_token_fresh(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that the background refresh renews the token without callers waiting.
+    """
+    issued = mock_token_endpoint(monkeypatch, expires_in=1)
+    token_store = ServiceAccountToken(refresh_margin=10)
+
+    async with AsyncClient() as client:
+        token_store.start(client)
+        await asyncio.sleep(1.2)
+        misses = token_store.stats.misses
+        await token_store.get_token(client)
+        await token_store.stop()
+
+    assert len(issued) >= 2
+    assert token_store.stats.misses == misses == 0
+
+
+async def test_background_refresh_retries_after_any_error(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that the background refresh keeps running after unexpected errors
+    and waits longer after each consecutive failure.
+    """
+    delays: list[float] = []
+    sleep = asyncio.sleep
+
+    async def fetch_service_account_token(_client: AsyncClient) -> TokenResponse:
+        if len(delays) < 3:
+            raise ValueError("unexpected response")
+        return TokenResponse(access_token="token-1", expires_in=300)
+
+    async def record_sleep(delay: float) -> None:
+        delays.append(delay)
+        await sleep(0)
+
+    monkeypatch.setattr(keycloak, "fetch_service_account_token", fetch_service_account_token)
+    monkeypatch.setattr(keycloak.asyncio, "sleep", record_sleep)
+    token_store = ServiceAccountToken(refresh_margin=10)
+
+    async with AsyncClient() as client:
+        token_store.start(client)
+        for _ in range(10):
+            await sleep(0)
+        assert token_store.running
+        await token_store.stop()
+
+    assert delays[:3] == [5, 10, 20]
+    assert delays[3] > 20
+    assert token_store.stats.refreshes == 1
+
+
+async def test_failed_token_request_raises_error(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that an error is raised when there is no token and it cannot be fetched.
+    """
+
+    async def fetch_service_account_token(_client: AsyncClient) -> TokenResponse:
+        raise KeycloakError("Keycloak service error")
+
+    monkeypatch.setattr(keycloak, "fetch_service_account_token", fetch_service_account_token)
+
+    async with AsyncClient() as client:
+        with pytest.raises(KeycloakError):
+            await ServiceAccountToken(refresh_margin=30).get_token(client)
+
+
+async def test_admin_request_retries_once_on_unauthorized(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that a request rejected with 401 is retried once with a renewed token.
+    """
+    issued = mock_token_endpoint(monkeypatch)
+    monkeypatch.setattr(keycloak, "service_account_token", ServiceAccountToken(refresh_margin=30))
+    authorizations: list[str] = []
+
+    async def http_request(_client: AsyncClient, method: str, url: str, **kwargs: Any) -> Response:
+        authorizations.append(kwargs["headers"]["Authorization"])
+        status_code = 401 if len(authorizations) == 1 else 200
+        response = Response(status_code, request=Request(method, url))
+        if status_code == 401:
+            raise HTTPStatusError("Unauthorized", request=response.request, response=response)
+        return response
+
+    monkeypatch.setattr(keycloak, "http_request", http_request)
+
+    async with AsyncClient() as client:
+        response = await keycloak.admin_request(client, "GET", "http://keycloak/admin")
+
+    assert response.status_code == 200
+    assert authorizations == ["Bearer token-1", "Bearer token-2"]
+    assert issued == ["token-1", "token-2"]
@@ -0,0 +1,170 @@
+"""
+Provisioned users cache tests
+"""
+
+import asyncio
+from typing import Any, Iterator
+import pytest
+from pytest import MonkeyPatch
+from httpx import AsyncClient
+from app.config import settings, APISixInstanceSettings, VaultInstanceSettings
+from app.models.apisix import APISixConsumer
+from app.models.request import User
+from app.models.vault import VaultUser
+from app.services import apikey, apisix, vault
+
+pytestmark = pytest.mark.anyio
+
+config = settings()
+
+MOCK_UUID = "mockuuid"
+
+
+@pytest.fixture(autouse=True)
+def clear_provisioned_users() -> Iterator[None]:
+    apikey.provisioned_users.clear()
+    yield
+    apikey.provisioned_users.clear()
+
+
+def vault_user(instance_name: str) -> VaultUser:
+    return VaultUser(
+        id=MOCK_UUID, auth_key="mockkey", date="2024-01-01", instance_name=instance_name
+    )
+
+
+def apisix_consumer(instance_name: str) -> APISixConsumer:
+    return APISixConsumer(instance_name=instance_name, username=MOCK_UUID, plugins={})
+
+
+def mock_upstreams(monkeypatch: MonkeyPatch, found_in_apisix: list[str]) -> dict[str, int]:
+    calls = {"vault": 0, "apisix": 0}
+
+    async def get_user_info_from_vault(
+        _client: AsyncClient, instance: VaultInstanceSettings, _identifier: str
+    ) -> VaultUser:
+        calls["vault"] += 1
+        return vault_user(instance.name)
+
+    async def get_apisix_consumer(
+        _client: AsyncClient, instance: APISixInstanceSettings, _identifier: str
+    ) -> APISixConsumer | None:
+        calls["apisix"] += 1
+        return apisix_consumer(instance.name) if instance.name in found_in_apisix else None
+
+    async def delete(_client: AsyncClient, instance: Any, _user: Any) -> Any:
+        return (
+            vault_user(instance.name)
+            if isinstance(instance, VaultInstanceSettings)
+            else apisix_consumer(instance.name)
+        )
+
+    monkeypatch.setattr(vault, "get_user_info_from_vault", get_user_info_from_vault)
+    monkeypatch.setattr(apisix, "get_apisix_consumer", get_apisix_consumer)
+    monkeypatch.setattr(vault, "delete_user_from_vault", delete)
+    monkeypatch.setattr(apisix, "delete_apisix_consumer", delete)
+    return calls
+
+
+async def test_user_found_in_all_instances_is_cached(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that a user found in every Vault and APISIX instance is cached.
+    """
+    mock_upstreams(monkeypatch, [instance.name for instance in config.apisix.instances])
+
+    async with AsyncClient() as client:
+        await apikey.get_user_from_vault_and_apisix_instances(client, MOCK_UUID)
+
+    assert apikey.get_provisioned_api_key(MOCK_UUID) == "mockkey"
+
+
+async def test_partially_provisioned_user_is_not_cached(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that a user missing from an APISIX instance is not cached.
+    """
+    mock_upstreams(monkeypatch, [config.apisix.instances[0].name])
+    monkeypatch.setattr(
+        config.apisix,
+        "instances",
+        [
+            *config.apisix.instances,
+            APISixInstanceSettings(name="Other", admin_url="http://x", admin_api_key="x"),
+        ],
+    )
+
+    async with AsyncClient() as client:
+        await apikey.get_user_from_vault_and_apisix_instances(client, MOCK_UUID)
+
+    assert apikey.get_provisioned_api_key(MOCK_UUID) is None
+
+
+async def test_new_instance_invalidates_cached_user(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that a cached user is not served when an instance is added to the configuration.
+    """
+    mock_upstreams(monkeypatch, [instance.name for instance in config.apisix.instances])
+
+    async with AsyncClient() as client:
+        await apikey.get_user_from_vault_and_apisix_instances(client, MOCK_UUID)
+
+    monkeypatch.setattr(
+        config.apisix,
+        "instances",
+        [
+            *config.apisix.instances,
+            APISixInstanceSettings(name="Other", admin_url="http://x", admin_api_key="x"),
+        ],
+    )
+
+    assert apikey.get_provisioned_api_key(MOCK_UUID) is None
+
+
+async def test_deleting_user_invalidates_cache(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that deleting a user's API key removes the user from the cache.
+    """
+    mock_upstreams(monkeypatch, [instance.name for instance in config.apisix.instances])
+
+    async with AsyncClient() as client:
+        vault_users, apisix_users = await apikey.get_user_from_vault_and_apisix_instances(
+            client, MOCK_UUID
+        )
+        assert apikey.get_provisioned_api_key(MOCK_UUID) == "mockkey"
+
+        await apikey.delete_user_from_vault_and_apisixes(
+            client, User(id=MOCK_UUID, groups=[]), vault_users, apisix_users
+        )
+
+    assert apikey.get_provisioned_api_key(MOCK_UUID) is None
+
+
+async def test_concurrent_provisioning_is_coalesced(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that concurrent provisioning calls of the same user create the user once.
+    """
+    calls = mock_upstreams(monkeypatch, [])
+    created: list[str] = []
+
+    async def create_user_to_vault_and_apisixes(
+        _client: AsyncClient, user: User, *_args: Any
+    ) -> VaultUser:
+        created.append(user.id)
+        await asyncio.sleep(0.01)
+        return vault_user(config.vault.instances[0].name)
+
+    monkeypatch.setattr(
+        apikey, "create_user_to_vault_and_apisixes", create_user_to_vault_and_apisixes
+    )
+    user = User(id=MOCK_UUID, groups=[])
+
+    async with AsyncClient() as client:
+        api_keys = await asyncio.gather(
+            *(
+                apikey.provisioning.do(user.id, apikey.provision_user, client, user)
+                for _ in range(3)
+            )
+        )
+
+    assert api_keys == ["mockkey"] * 3
+    assert created == [MOCK_UUID]
+    assert calls["vault"] == len(config.vault.instances)
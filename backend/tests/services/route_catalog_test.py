@@ -0,0 +1,268 @@
+"""
+APISIX route catalog tests
+"""
+
+from typing import Any
+import pytest
+from pytest import MonkeyPatch
+from httpx import AsyncClient
+from app.config import settings, APISixInstanceSettings
+from app.exceptions import APISIXError
+from app.models.apisix import APISixConsumer, APISixConsumerGroup, APISixRouteSnapshot
+from app.services import apisix, route_catalog
+from app.services.route_catalog import RouteCatalog, route_list_version, routes_version
+
+pytestmark = pytest.mark.anyio
+
+config = settings()
+
+
+def raw_route(uri: str, modified_index: int, key_auth: bool = True) -> dict[str, Any]:
+    plugins: dict[str, Any] = {"key-auth": {}} if key_auth else {}
+    return {
+        "modifiedIndex": modified_index,
+        "value": {"uri": uri, "plugins": plugins, "update_time": modified_index},
+    }
+
+
+def mock_raw_routes(monkeypatch: MonkeyPatch, responses: list[Any]) -> list[str]:
+    calls: list[str] = []
+
+    async def get_raw_routes(
+        _client: AsyncClient, instance: APISixInstanceSettings
+    ) -> list[dict[str, Any]]:
+        calls.append(instance.name)
+        response = responses[min(len(calls), len(responses)) - 1]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(apisix, "get_raw_routes", get_raw_routes)
+    return calls
+
+
+def test_route_list_version_changes_with_routes() -> None:
+    routes = [raw_route("/foo", 10), raw_route("/bar", 12)]
+
+    assert route_list_version(routes) == route_list_version(list(routes))
+    assert route_list_version(routes) != route_list_version([*routes, raw_route("/baz", 13)])
+    assert route_list_version(routes) != route_list_version(routes[:1])
+    assert route_list_version(routes) != route_list_version([routes[0], raw_route("/bar", 14)])
+
+
+async def test_snapshot_contains_only_key_auth_routes(monkeypatch: MonkeyPatch) -> None:
+    mock_raw_routes(monkeypatch, [[raw_route("/foo", 1), raw_route("/baz", 2, key_auth=False)]])
+    catalog = RouteCatalog(refresh_interval=60)
+
+    snapshot = await catalog.get_snapshot(AsyncClient(), config.apisix.instances[0])
+
+    assert [route.url for route in snapshot.routes] == [f"{config.apisix.global_gateway_url}/foo"]
+
+
+async def test_snapshot_is_served_from_memory(monkeypatch: MonkeyPatch) -> None:
+    calls = mock_raw_routes(monkeypatch, [[raw_route("/foo", 1)]])
+    catalog = RouteCatalog(refresh_interval=60)
+    instance = config.apisix.instances[0]
+
+    first = await catalog.get_snapshot(AsyncClient(), instance)
+    second = await catalog.get_snapshot(AsyncClient(), instance)
+
+    assert first is second
+    assert len(calls) == 1
+    assert catalog.stats.hits == 1
+
+
+async def test_unchanged_routes_keep_the_snapshot(monkeypatch: MonkeyPatch) -> None:
+    mock_raw_routes(monkeypatch, [[raw_route("/foo", 1)], [raw_route("/foo", 1)]])
+    catalog = RouteCatalog(refresh_interval=60)
+    instance = config.apisix.instances[0]
+
+    first = await catalog.refresh(AsyncClient(), instance)
+    second = await catalog.refresh(AsyncClient(), instance)
+
+    assert first is second
+    assert catalog.stats.refreshes == 1
+
+
+async def test_stale_snapshot_is_served_when_refresh_fails(monkeypatch: MonkeyPatch) -> None:
+    mock_raw_routes(monkeypatch, [[raw_route("/foo", 1)], APISIXError("APISIX service error")])
+    catalog = RouteCatalog(refresh_interval=0)
+    instance = config.apisix.instances[0]
+
+    first = await catalog.get_snapshot(AsyncClient(), instance)
+    second = await catalog.get_snapshot(AsyncClient(), instance)
+
+    assert first is second
+
+
+async def test_health_fails_when_routes_cannot_be_loaded(monkeypatch: MonkeyPatch) -> None:
+    mock_raw_routes(monkeypatch, [APISIXError("APISIX service error")])
+    catalog = RouteCatalog(refresh_interval=60)
+
+    with pytest.raises(APISIXError):
+        await catalog.check_health(AsyncClient(), config.apisix.instances[0])
+
+
+async def test_routes_with_limits_use_the_catalog(monkeypatch: MonkeyPatch) -> None:
+    routes = [raw_route("/foo", 1)]
+    routes[0]["value"]["plugins"]["limit-count"] = {"count": 10, "time_window": 60}
+    calls = mock_raw_routes(monkeypatch, [routes])
+    monkeypatch.setattr(route_catalog, "route_catalog", RouteCatalog(refresh_interval=60))
+    instance = config.apisix.instances[0]
+
+    for _ in range(3):
+        result = await route_catalog.get_routes_with_limits(AsyncClient(), instance)
+
+    assert result == [
+        {
+            "url": f"{config.apisix.global_gateway_url}/foo",
+            "limits": "Quota: 10 req/1m (Route limit)",
+        }
+    ]
+    assert len(calls) == 1
+
+
+async def test_limit_table_matches_per_route_resolution(monkeypatch: MonkeyPatch) -> None:
+    routes = [raw_route("/foo", 1), raw_route("/bar", 2)]
+    routes[0]["value"]["plugins"]["limit-req"] = {"rate": 5, "burst": 10}
+    mock_raw_routes(monkeypatch, [routes])
+    catalog = RouteCatalog(refresh_interval=60)
+    snapshot = await catalog.get_snapshot(AsyncClient(), config.apisix.instances[0])
+    group = APISixConsumerGroup(
+        instance_name="EWC",
+        id="EumetnetUser",
+        plugins={"limit-count": {"count": 100, "time_window": 3600}},
+    )
+
+    table = catalog.get_limit_table(snapshot, group)
+
+    assert table == route_catalog.resolve_route_limits(snapshot.routes, None, group)
+    assert (
+        table[0]["limits"]
+        == "Quota: 100 req/1h | Rate: 5 req/s | Burst: 10 req (Group quota, Route rate)"
+    )
+    assert catalog.get_limit_table(snapshot, group) is table
+
+
+async def test_limit_table_is_recompiled_when_group_changes(monkeypatch: MonkeyPatch) -> None:
+    mock_raw_routes(monkeypatch, [[raw_route("/foo", 1)]])
+    catalog = RouteCatalog(refresh_interval=60)
+    snapshot = await catalog.get_snapshot(AsyncClient(), config.apisix.instances[0])
+    group = APISixConsumerGroup(
+        instance_name="EWC", id="User", plugins={"limit-count": {"count": 100, "time_window": 60}}
+    )
+    changed_group = APISixConsumerGroup(
+        instance_name="EWC", id="User", plugins={"limit-count": {"count": 50, "time_window": 60}}
+    )
+
+    assert (
+        catalog.get_limit_table(snapshot, group)[0]["limits"] == "Quota: 100 req/1m (Group limit)"
+    )
+    assert (
+        catalog.get_limit_table(snapshot, changed_group)[0]["limits"]
+        == "Quota: 50 req/1m (Group limit)"
+    )
+
+
+async def test_consumer_limits_override_the_limit_table(monkeypatch: MonkeyPatch) -> None:
+    async def get_consumer_groups(*_args: Any) -> list[APISixConsumerGroup]:
+        return []
+
+    mock_raw_routes(monkeypatch, [[raw_route("/foo", 1)]])
+    monkeypatch.setattr(apisix, "get_apisix_consumer_groups", get_consumer_groups)
+    monkeypatch.setattr(route_catalog, "route_catalog", RouteCatalog(refresh_interval=60))
+    consumer = APISixConsumer(
+        instance_name="EWC",
+        username="user",
+        plugins={"limit-req": {"rate": 1, "burst": 2}},
+        group_id=[],
+    )
+
+    result = await route_catalog.get_routes_with_limits(
+        AsyncClient(), config.apisix.instances[0], consumer
+    )
+
+    assert result[0]["limits"] == "Rate: 1 req/s | Burst: 2 req (Consumer limit)"
+
+
+def mock_consumer_groups(monkeypatch: MonkeyPatch, groups: list[APISixConsumerGroup]) -> list[str]:
+    calls: list[str] = []
+
+    async def get_consumer_groups(
+        _client: AsyncClient, instance: APISixInstanceSettings
+    ) -> list[APISixConsumerGroup]:
+        calls.append(instance.name)
+        return groups
+
+    monkeypatch.setattr(apisix, "get_apisix_consumer_groups", get_consumer_groups)
+    return calls
+
+
+async def test_consumer_groups_are_loaded_in_bulk_once(monkeypatch: MonkeyPatch) -> None:
+    calls = mock_consumer_groups(
+        monkeypatch,
+        [
+            APISixConsumerGroup(instance_name="EWC", id="User"),
+            APISixConsumerGroup(instance_name="EWC", id="EumetnetUser"),
+        ],
+    )
+    catalog = RouteCatalog(refresh_interval=60)
+    instance = config.apisix.instances[0]
+
+    user_group = await catalog.get_consumer_group(AsyncClient(), instance, "User")
+    eumetnet_group = await catalog.get_consumer_group(AsyncClient(), instance, "EumetnetUser")
+    missing_group = await catalog.get_consumer_group(AsyncClient(), instance, "Missing")
+
+    assert user_group is not None and user_group.id == "User"
+    assert eumetnet_group is not None and eumetnet_group.id == "EumetnetUser"
+    assert missing_group is None
+    assert len(calls) == 1
+
+
+async def test_invalidated_consumer_groups_are_reloaded(monkeypatch: MonkeyPatch) -> None:
+    calls = mock_consumer_groups(monkeypatch, [APISixConsumerGroup(instance_name="EWC", id="User")])
+    catalog = RouteCatalog(refresh_interval=60)
+    instance = config.apisix.instances[0]
+
+    await catalog.get_consumer_group(AsyncClient(), instance, "User")
+    catalog.invalidate_consumer_groups()
+    await catalog.get_consumer_group(AsyncClient(), instance, "User")
+
+    assert len(calls) == 2
+
+
+async def test_limit_tables_are_compiled_when_groups_are_loaded(monkeypatch: MonkeyPatch) -> None:
+    group = APISixConsumerGroup(
+        instance_name="EWC", id="User", plugins={"limit-count": {"count": 10, "time_window": 60}}
+    )
+    mock_raw_routes(monkeypatch, [[raw_route("/foo", 1)]])
+    mock_consumer_groups(monkeypatch, [group])
+    catalog = RouteCatalog(refresh_interval=60)
+    instance = config.apisix.instances[0]
+
+    await catalog.refresh_all(AsyncClient())
+    stats_before = catalog.stats.as_dict()
+    snapshot = await catalog.get_snapshot(AsyncClient(), instance)
+
+    assert catalog.get_limit_table(snapshot, group)[0]["limits"] == "Quota: 10 req/1m (Group limit)"
+    assert catalog.stats.refreshes == stats_before["refreshes"]
+
+
+def test_routes_version_changes_with_routes_and_limits() -> None:
+    snapshot = APISixRouteSnapshot(instance_name="EWC", version="1-1-1", routes=[])
+    group = APISixConsumerGroup(
+        instance_name="EWC", id="User", plugins={"limit-count": {"count": 100, "time_window": 60}}
+    )
+    same_limits = APISixConsumerGroup(
+        instance_name="EWC", id="Other", plugins={"limit-count": {"count": 100, "time_window": 60}}
+    )
+    override = APISixConsumer(
+        instance_name="EWC", username="user", plugins={"limit-req": {"rate": 1, "burst": 2}}
+    )
+
+    version = routes_version(snapshot, None, group)
+
+    assert version == routes_version(snapshot, None, same_limits)
+    assert version != routes_version(snapshot, None, None)
+    assert version != routes_version(snapshot.model_copy(update={"version": "1-2-2"}), None, group)
+    assert version != routes_version(snapshot, override, group)
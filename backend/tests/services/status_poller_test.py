@@ -0,0 +1,233 @@
+"""
+Status poller tests
+"""
+
+import asyncio
+import json
+import time
+import pytest
+from pytest import MonkeyPatch
+from httpx import AsyncClient
+from app.config import CompressionSettings, StatusServiceSettings
+from app.models.status import ServiceHealth, ServiceStatus
+from app.services import status
+from app.services.status import StatusPoller
+from app.utils.compression import SnapshotBodies, snapshot_response
+
+pytestmark = pytest.mark.anyio
+
+SERVICES = [
+    StatusServiceSettings(name="A-Service", url="https://a-example.com"),
+    StatusServiceSettings(name="B-Service", url="https://b-example.com"),
+]
+
+
+def mock_checks(
+    monkeypatch: MonkeyPatch,
+    hanging: set[str] | None = None,
+    outcomes: dict[str, list[tuple[ServiceStatus, float | None]]] | None = None,
+) -> list[str]:
+    """
+    Record the checked services. Services in `hanging` answer the first check only,
+    services in `outcomes` answer the given status and latency on consecutive checks.
+    """
+    checked: list[str] = []
+
+    async def check_http_service(_client: AsyncClient, name: str, url: str) -> ServiceHealth:
+        if hanging and name in hanging and name in checked:
+            await asyncio.Event().wait()
+        checked.append(name)
+        if outcomes and name in outcomes:
+            status, latency_ms = outcomes[name][checked.count(name) - 1]
+            return ServiceHealth(name=name, status=status, url=url, latency_ms=latency_ms)
+        return ServiceHealth(name=name, status=ServiceStatus.UP, url=url)
+
+    monkeypatch.setattr(status, "check_http_service", check_http_service)
+    monkeypatch.setattr(status.config.status, "services", SERVICES)
+    return checked
+
+
+async def test_services_are_checked_on_read_when_not_polling(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that without background polling results are reused within the poll interval.
+    """
+    checked = mock_checks(monkeypatch)
+    poller = StatusPoller(poll_interval=60, stale_after=90, history_size=10, history_windows=[60])
+
+    async with AsyncClient() as client:
+        first, second = await asyncio.gather(poller.get_status(client), poller.get_status(client))
+
+    assert checked == ["A-Service", "B-Service"]
+    assert first == second
+    assert first.overall == ServiceStatus.UP
+    assert [service.name for service in first.services] == ["A-Service", "B-Service"]
+    assert all(service.last_checked is not None for service in first.services)
+
+
+async def test_hanging_service_does_not_block_status(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that a service whose check hangs is served from its last result, marked stale.
+    """
+    checked = mock_checks(monkeypatch, hanging={"B-Service"})
+    poller = StatusPoller(
+        poll_interval=0.01, stale_after=0.05, history_size=10, history_windows=[60]
+    )
+
+    async with AsyncClient() as client:
+        poller.start(client)
+        try:
+            await poller.get_status(client)
+            await asyncio.sleep(0.1)
+
+            result = await asyncio.wait_for(poller.get_status(client), timeout=0.01)
+        finally:
+            await poller.stop()
+
+    assert checked.count("A-Service") > 1
+    assert checked.count("B-Service") == 1
+    assert [(service.name, service.stale) for service in result.services] == [
+        ("A-Service", False),
+        ("B-Service", True),
+    ]
+    assert not poller.running
+
+
+async def test_history_reports_uptime_and_latency_percentiles(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that the history counts every check for uptime and answered checks for latency.
+    """
+    mock_checks(
+        monkeypatch,
+        outcomes={
+            "A-Service": [(ServiceStatus.UP, 10.0 * (i + 1)) for i in range(3)]
+            + [(ServiceStatus.DOWN, 5000.0)],
+        },
+    )
+    poller = StatusPoller(poll_interval=0, stale_after=90, history_size=10, history_windows=[60])
+
+    async with AsyncClient() as client:
+        for _ in range(3):
+            await poller.get_status(client)
+        history = await poller.get_history(client)
+
+    service_a, service_b = history.services
+    assert service_a.windows[0].model_dump() == {
+        "window": 60,
+        "samples": 4,
+        "uptime": 0.75,
+        "p50_ms": 20.0,
+        "p95_ms": 30.0,
+        "p99_ms": 30.0,
+    }
+    assert service_b.windows[0].samples == 4
+    assert service_a.latency_ms == 5000.0
+    assert service_a.last_checked is not None
+    assert service_b.windows[0].uptime == 1.0
+
+
+async def test_stream_sends_status_on_change_and_heartbeats(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that the stream starts with the status, then sends heartbeats and changes only.
+    """
+    mock_checks(
+        monkeypatch,
+        outcomes={"A-Service": [(ServiceStatus.UP, 10.0), (ServiceStatus.DOWN, None)]},
+    )
+    monkeypatch.setattr(
+        status,
+        "status_poller",
+        StatusPoller(poll_interval=0, stale_after=90, history_size=10, history_windows=[60]),
+    )
+
+    async with AsyncClient() as client:
+        stream = status.stream_service_status(client, heartbeat=0.01)
+        events = [await anext(stream) for _ in range(3)]
+        await stream.aclose()
+
+    assert events[0].startswith("data: ")
+    assert json.loads(events[0].removeprefix("data: "))["overall"] == "up"
+    assert events[1] == ": heartbeat\n\n"
+    assert json.loads(events[2].removeprefix("data: "))["overall"] == "degraded"
+
+
+async def test_stream_ends_when_token_expires(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that the stream ends once the given expiry time has passed.
+    """
+    mock_checks(monkeypatch)
+    monkeypatch.setattr(
+        status,
+        "status_poller",
+        StatusPoller(poll_interval=60, stale_after=90, history_size=10, history_windows=[60]),
+    )
+
+    async with AsyncClient() as client:
+        events = [
+            event
+            async for event in status.stream_service_status(
+                client, heartbeat=10, expires_at=time.time() - 1
+            )
+        ]
+
+    assert len(events) == 1
+    assert events[0].startswith("data: ")
+
+
+async def test_snapshot_is_reused_until_a_status_changes(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that checks with the same statuses keep the same status object and ETag,
+    so that conditional requests get a 304, and that a changed status gets a new ETag.
+    """
+    mock_checks(
+        monkeypatch,
+        outcomes={
+            "A-Service": [(ServiceStatus.UP, 10.0), (ServiceStatus.UP, 30.0)]
+            + [(ServiceStatus.DOWN, None)],
+        },
+    )
+    poller = StatusPoller(poll_interval=0, stale_after=90, history_size=10, history_windows=[60])
+    bodies = SnapshotBodies(max_size=10, settings=CompressionSettings())
+
+    async with AsyncClient() as client:
+        first = await poller.get_status(client)
+        second = await poller.get_status(client)
+        third = await poller.get_status(client)
+
+    assert first.version is not None and third.version is not None
+    body = bodies.get(first.version, lambda: first.model_dump_json().encode())
+    etag = snapshot_response(body, None, first.version).headers["ETag"]
+
+    # The second check only changed the latency and check time
+    assert second is first
+    assert snapshot_response(body, None, first.version, etag).status_code == 304
+    assert third.version != first.version
+    assert snapshot_response(body, None, third.version, etag).status_code == 200
+    assert "version" not in json.loads(first.model_dump_json())
+    assert "last_checked" not in json.loads(first.model_dump_json())["services"][0]
+
+
+async def test_version_depends_on_the_statuses_only(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that pollers with the same statuses, e.g. in different workers, agree on the
+    version whatever the latencies and check times, and that different statuses get
+    a different version.
+    """
+    mock_checks(
+        monkeypatch,
+        outcomes={
+            "A-Service": [(ServiceStatus.UP, 10.0), (ServiceStatus.UP, 25.0)]
+            + [(ServiceStatus.DOWN, None)],
+            "B-Service": [(ServiceStatus.UP, 20.0)] * 3,
+        },
+    )
+    pollers = [
+        StatusPoller(poll_interval=0, stale_after=90, history_size=10, history_windows=[60])
+        for _ in range(3)
+    ]
+
+    async with AsyncClient() as client:
+        first, second, third = [await poller.get_status(client) for poller in pollers]
+
+    assert first is not second
+    assert first.version == second.version
+    assert third.version != first.version
@@ -0,0 +1,175 @@
+"""
+Bulk admin operation tests
+"""
+
+import asyncio
+from typing import Any
+import pytest
+from pytest import MonkeyPatch
+from httpx import AsyncClient
+from pydantic import ValidationError
+from app.config import settings
+from app.exceptions import VaultError
+from app.models.keycloak import User as KeycloakUser, Group
+from app.models.request import BulkUserOperation
+from app.services import keycloak, users
+from app.utils.report import mark_rolled_back, record_upstream_timing
+
+pytestmark = pytest.mark.anyio
+
+config = settings()
+
+
+def mock_keycloak_users(monkeypatch: MonkeyPatch, existing: set[str]) -> None:
+    async def get_user(_client: AsyncClient, user_uuid: str) -> KeycloakUser | None:
+        return KeycloakUser(id=user_uuid, groups=[]) if user_uuid in existing else None
+
+    monkeypatch.setattr(keycloak, "get_user", get_user)
+
+
+async def test_bulk_action_reports_outcome_per_user(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that a failing user does not stop the others and outcomes keep the given order.
+    """
+    mock_keycloak_users(monkeypatch, {"a", "b"})
+
+    async def delete_or_disable_user(
+        _client: AsyncClient, user_uuid: str, _user: KeycloakUser, action: str
+    ) -> None:
+        assert action == "DELETE"
+        if user_uuid == "b":
+            raise VaultError("Vault service error")
+
+    monkeypatch.setattr(users, "delete_or_disable_user", delete_or_disable_user)
+
+    async with AsyncClient() as client:
+        results = await users.apply_bulk_action_to_users(client, ["a", "b", "c", "a"], "delete")
+
+    assert [(result.userUuid, result.status) for result in results] == [
+        ("a", "OK"),
+        ("b", "ERROR"),
+        ("c", "NOT_FOUND"),
+    ]
+    assert results[1].detail == "Vault service error"
+
+
+async def test_bulk_action_concurrency_is_limited(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that at most `admin.bulk_concurrency` users are processed at the same time.
+    """
+    user_uuids = [str(i) for i in range(10)]
+    mock_keycloak_users(monkeypatch, set(user_uuids))
+    monkeypatch.setattr(config.admin, "bulk_concurrency", 3)
+    in_flight = 0
+    max_in_flight = 0
+
+    async def modify_user_group(*_args: Any) -> None:
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+
+    monkeypatch.setattr(users, "modify_user_group", modify_user_group)
+
+    async with AsyncClient() as client:
+        results = await users.apply_bulk_action_to_users(
+            client, user_uuids, "add-group", Group(id="1", name="EumetnetUser")
+        )
+
+    assert all(result.status == "OK" for result in results)
+    assert max_in_flight == 3
+
+
+def test_group_actions_require_group_name() -> None:
+    """
+    Test that group actions without a group name are rejected.
+    """
+    with pytest.raises(ValidationError):
+        BulkUserOperation(action="add-group", userUuids=["a"])
+
+    assert BulkUserOperation(action="enable", userUuids=["a"]).group_name is None
+
+
+async def test_outcomes_are_yielded_as_users_complete(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that a fast user is reported before a slow one and that the report is filled.
+    """
+    mock_keycloak_users(monkeypatch, {"slow", "fast"})
+
+    async def delete_or_disable_user(
+        _client: AsyncClient, user_uuid: str, _user: KeycloakUser, _action: str
+    ) -> None:
+        record_upstream_timing("vault:EWC", 0.002)
+        if user_uuid == "slow":
+            await asyncio.sleep(0.05)
+            mark_rolled_back()
+            raise VaultError("Vault service error")
+
+    monkeypatch.setattr(users, "delete_or_disable_user", delete_or_disable_user)
+
+    async with AsyncClient() as client:
+        outcomes = [
+            outcome async for outcome in users.iter_bulk_action(client, ["slow", "fast"], "disable")
+        ]
+
+    assert [(index, result.userUuid) for index, result in outcomes] == [(1, "fast"), (0, "slow")]
+    assert outcomes[0][1].timings == {"vault:EWC": 2.0}
+    assert outcomes[0][1].rolledBack is False
+    assert outcomes[1][1].rolledBack is True
+
+
+async def test_stopping_early_skips_remaining_users(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that users not yet started are skipped when the consumer stops.
+    """
+    user_uuids = [str(i) for i in range(10)]
+    mock_keycloak_users(monkeypatch, set(user_uuids))
+    monkeypatch.setattr(config.admin, "bulk_concurrency", 2)
+    started: list[str] = []
+
+    async def delete_or_disable_user(
+        _client: AsyncClient, user_uuid: str, _user: KeycloakUser, _action: str
+    ) -> None:
+        started.append(user_uuid)
+        await asyncio.sleep(0.01)
+
+    monkeypatch.setattr(users, "delete_or_disable_user", delete_or_disable_user)
+
+    async with AsyncClient() as client:
+        outcomes = users.iter_bulk_action(client, user_uuids, "delete")
+        await anext(outcomes)
+        await outcomes.aclose()
+        await asyncio.sleep(0.05)
+
+    assert len(started) < len(user_uuids)
+    assert not users._bulk_workers
+
+
+async def test_workers_wait_for_a_slow_consumer(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that at most `admin.bulk_concurrency` outcomes wait for the consumer.
+    """
+    user_uuids = [str(i) for i in range(10)]
+    mock_keycloak_users(monkeypatch, set(user_uuids))
+    monkeypatch.setattr(config.admin, "bulk_concurrency", 2)
+    started: list[str] = []
+
+    async def delete_or_disable_user(
+        _client: AsyncClient, user_uuid: str, _user: KeycloakUser, _action: str
+    ) -> None:
+        started.append(user_uuid)
+
+    monkeypatch.setattr(users, "delete_or_disable_user", delete_or_disable_user)
+
+    async with AsyncClient() as client:
+        outcomes = users.iter_bulk_action(client, user_uuids, "delete")
+        await anext(outcomes)
+        await asyncio.sleep(0.05)
+        # One outcome taken, two queued and one held by each of the two workers
+        assert len(started) == 5
+
+        remaining = [outcome async for outcome in outcomes]
+
+    assert len(remaining) == len(user_uuids) - 1
+    assert len(started) == len(user_uuids)
@@ -0,0 +1,58 @@
+"""
+In-memory cache helper tests
+"""
+
+from freezegun import freeze_time
+from app.utils.cache import LRUCache
+
+
+def test_least_recently_used_entry_is_evicted() -> None:
+    cache: LRUCache[int] = LRUCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats.evictions == 1
+
+
+def test_entry_expires_at_given_time() -> None:
+    cache: LRUCache[str] = LRUCache(max_size=10)
+    with freeze_time("2024-01-01 00:00:00") as frozen_time:
+        cache.set("token", "value", expires_at=frozen_time().timestamp() + 60)
+        assert cache.get("token") == "value"
+
+        frozen_time.tick(60)
+        assert cache.get("token") is None
+        assert len(cache) == 0
+
+
+def test_default_ttl_is_applied() -> None:
+    cache: LRUCache[str] = LRUCache(max_size=10, ttl=30)
+    with freeze_time("2024-01-01 00:00:00") as frozen_time:
+        cache.set("key", "value")
+        frozen_time.tick(29)
+        assert cache.get("key") == "value"
+        frozen_time.tick(1)
+        assert cache.get("key") is None
+
+
+def test_hits_and_misses_are_counted() -> None:
+    cache: LRUCache[str] = LRUCache(max_size=10)
+    cache.set("key", "value")
+    cache.get("key")
+    cache.get("key")
+    cache.get("other")
+
+    assert cache.stats.hits == 2
+    assert cache.stats.misses == 1
+
+
+def test_zero_max_size_disables_cache() -> None:
+    cache: LRUCache[str] = LRUCache(max_size=0)
+    cache.set("key", "value")
+    assert cache.get("key") is None
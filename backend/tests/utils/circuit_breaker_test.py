@@ -0,0 +1,223 @@
+"""
+Circuit breaker tests
+"""
+
+from typing import Iterator
+import pytest
+from pytest import MonkeyPatch
+from freezegun import freeze_time
+from httpx import AsyncClient, ConnectError, HTTPError, MockTransport, Request, Response
+from prometheus_client import REGISTRY
+from app.config import settings
+from app.dependencies.http_client import get_circuit_breakers, http_request, reset_circuit_breakers
+from app.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+pytestmark = pytest.mark.anyio
+
+config = settings()
+
+
+@pytest.fixture(autouse=True)
+def clear_circuit_breakers() -> Iterator[None]:
+    reset_circuit_breakers()
+    yield
+    reset_circuit_breakers()
+
+
+def create_circuit_breaker() -> CircuitBreaker:
+    return CircuitBreaker(
+        "vault:EWC", failure_rate_threshold=0.5, minimum_calls=4, window_size=10, open_seconds=30
+    )
+
+
+def call(circuit_breaker: CircuitBreaker, success: bool) -> None:
+    generation = circuit_breaker.before_call()
+    circuit_breaker.record(success, generation)
+
+
+def test_circuit_opens_on_failure_rate() -> None:
+    """
+    Test that the circuit opens once the failure rate reaches the threshold.
+    """
+    circuit_breaker = create_circuit_breaker()
+
+    for success in (True, False, False):
+        call(circuit_breaker, success)
+    assert circuit_breaker.state == "closed"
+
+    call(circuit_breaker, True)
+    assert circuit_breaker.state == "open"
+
+    with pytest.raises(CircuitOpenError):
+        circuit_breaker.before_call()
+    assert circuit_breaker.rejected_calls == 1
+    assert circuit_breaker.times_opened == 1
+
+
+def test_state_and_failure_rate_are_exported() -> None:
+    """
+    Test that the gauges follow the failure rate and each state change.
+    """
+    circuit_breaker = CircuitBreaker(
+        "metrics:test", failure_rate_threshold=0.5, minimum_calls=4, window_size=10, open_seconds=30
+    )
+
+    def exported() -> tuple[float | None, float | None]:
+        labels = {"upstream": "metrics:test"}
+        return (
+            REGISTRY.get_sample_value("devportal_circuit_breaker_state", labels),
+            REGISTRY.get_sample_value("devportal_circuit_breaker_failure_rate", labels),
+        )
+
+    assert exported() == (0, 0)
+
+    with freeze_time() as frozen_time:
+        for success in (True, False, False):
+            call(circuit_breaker, success)
+        assert exported() == (0, 2 / 3)
+
+        call(circuit_breaker, True)
+        assert exported() == (2, 0.5)
+
+        frozen_time.tick(31)
+        generation = circuit_breaker.before_call()
+        assert exported() == (1, 0.5)
+
+        circuit_breaker.record(True, generation)
+        assert exported() == (0, 0)
+
+
+def test_half_open_trial_closes_or_reopens_circuit() -> None:
+    """
+    Test that a single trial call is let through after the cool-down.
+    """
+    circuit_breaker = create_circuit_breaker()
+
+    with freeze_time() as frozen_time:
+        for _ in range(4):
+            call(circuit_breaker, False)
+        assert circuit_breaker.state == "open"
+
+        frozen_time.tick(31)
+        generation = circuit_breaker.before_call()
+        assert circuit_breaker.state == "half-open"
+
+        # Only one trial call at a time
+        with pytest.raises(CircuitOpenError):
+            circuit_breaker.before_call()
+
+        circuit_breaker.record(False, generation)
+        assert circuit_breaker.state == "open"
+
+        frozen_time.tick(31)
+        call(circuit_breaker, True)
+        assert circuit_breaker.state == "closed"
+        assert circuit_breaker.failure_rate == 0.0
+
+
+def test_cancelled_trial_releases_half_open_slot() -> None:
+    """
+    Test that a trial call with unknown outcome lets the next call through.
+    """
+    circuit_breaker = create_circuit_breaker()
+
+    with freeze_time() as frozen_time:
+        for _ in range(4):
+            call(circuit_breaker, False)
+        frozen_time.tick(31)
+
+        generation = circuit_breaker.before_call()
+        circuit_breaker.record(None, generation)
+
+        circuit_breaker.before_call()
+        assert circuit_breaker.state == "half-open"
+
+
+def test_late_call_does_not_decide_half_open_trial() -> None:
+    """
+    Test that a call started before the circuit opened does not change the half-open state.
+    """
+    circuit_breaker = create_circuit_breaker()
+
+    with freeze_time() as frozen_time:
+        slow_generation = circuit_breaker.before_call()
+        for _ in range(4):
+            call(circuit_breaker, False)
+        frozen_time.tick(31)
+
+        trial_generation = circuit_breaker.before_call()
+        assert circuit_breaker.state == "half-open"
+
+        # The slow call finishes during the trial, in either outcome
+        circuit_breaker.record(True, slow_generation)
+        circuit_breaker.record(False, slow_generation)
+        assert circuit_breaker.state == "half-open"
+        assert circuit_breaker.times_opened == 1
+
+        # The trial is still in flight
+        with pytest.raises(CircuitOpenError):
+            circuit_breaker.before_call()
+
+        circuit_breaker.record(True, trial_generation)
+        assert circuit_breaker.state == "closed"
+
+        # Nor is it counted once the circuit closed again
+        circuit_breaker.record(False, slow_generation)
+        assert circuit_breaker.failure_rate == 0.0
+
+
+async def test_open_circuit_fails_requests_without_calling_upstream(
+    monkeypatch: MonkeyPatch,
+) -> None:
+    """
+    Test that requests to a failing instance are rejected once its circuit is open.
+    """
+    monkeypatch.setattr(config.circuit_breaker, "minimum_calls", 2)
+    calls: list[str] = []
+
+    def handler(request: Request) -> Response:
+        calls.append(request.url.host)
+        if request.url.path.startswith("/down"):
+            raise ConnectError("Connection refused", request=request)
+        return Response(200)
+
+    vault_url = config.vault.instances[0].url
+
+    async with AsyncClient(transport=MockTransport(handler)) as client:
+        for _ in range(2):
+            with pytest.raises(ConnectError):
+                await http_request(client, "GET", f"{vault_url}/down")
+
+        # The existing HTTPError handling applies to rejected calls
+        with pytest.raises(HTTPError):
+            await http_request(client, "GET", f"{vault_url}/v1/sys/health")
+
+        # Other upstreams are not affected
+        await http_request(client, "GET", f"{config.keycloak.url}/realms")
+
+    assert len(calls) == 3
+    assert get_circuit_breakers()[f"vault:{config.vault.instances[0].name}"].state == "open"
+
+
+async def test_server_errors_count_as_failures(monkeypatch: MonkeyPatch) -> None:
+    """
+    Test that 5xx responses are failures but client errors are not.
+    """
+    monkeypatch.setattr(config.circuit_breaker, "minimum_calls", 2)
+
+    def handler(request: Request) -> Response:
+        return Response(404 if request.url.path == "/missing" else 503)
+
+    keycloak_url = config.keycloak.url
+
+    async with AsyncClient(transport=MockTransport(handler)) as client:
+        for _ in range(3):
+            await http_request(
+                client, "GET", f"{keycloak_url}/missing", valid_status_codes=(200, 404)
+            )
+        assert get_circuit_breakers()["keycloak"].state == "closed"
+
+        for _ in range(3):
+            await http_request(client, "GET", f"{keycloak_url}/error", valid_status_codes=(503,))
+
+    assert get_circuit_breakers()["keycloak"].state == "open"
@@ -0,0 +1,180 @@
+"""
+Response compression tests
+"""
+
+import gzip
+from typing import Callable, cast
+import brotli  # type: ignore[import-untyped]
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from httpx import AsyncClient, ASGITransport
+from app.config import CompressionSettings
+from app.utils.compression import (
+    CompressionMiddleware,
+    PrecompressedBody,
+    SnapshotBodies,
+    negotiate_encoding,
+    snapshot_response,
+)
+from app.utils.responses import RawJSONResponse
+
+pytestmark = pytest.mark.anyio
+
+SETTINGS = CompressionSettings(minimum_size=100)
+
+LARGE_BODY = "routes " * 100
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        (None, None),
+        ("identity", None),
+        ("gzip, deflate", "gzip"),
+        ("gzip, deflate, br", "br"),
+        ("br;q=0, gzip", "gzip"),
+        ("br;q=0.5, gzip;q=0.8", "gzip"),
+        ("*", "br"),
+        ("*;q=0, gzip", "gzip"),
+    ],
+)
+def test_negotiate_encoding(accept_encoding: str | None, expected: str | None) -> None:
+    assert negotiate_encoding(accept_encoding) == expected
+
+
+def test_precompressed_body_compresses_each_encoding_once() -> None:
+    body = PrecompressedBody(LARGE_BODY.encode(), SETTINGS)
+
+    content, encoding = body.encode("gzip")
+
+    assert encoding == "gzip"
+    assert gzip.decompress(content) == LARGE_BODY.encode()
+    assert body.encode("gzip")[0] is content
+    assert brotli.decompress(body.encode("br")[0]) == LARGE_BODY.encode()
+
+
+def test_small_or_disabled_bodies_are_not_compressed() -> None:
+    assert PrecompressedBody(b"{}", SETTINGS).encode("gzip") == (b"{}", None)
+
+    disabled = CompressionSettings(enabled=False, minimum_size=100)
+    assert PrecompressedBody(LARGE_BODY.encode(), disabled).encode("gzip") == (
+        LARGE_BODY.encode(),
+        None,
+    )
+
+
+def test_snapshot_bodies_are_serialized_once_per_version() -> None:
+    bodies = SnapshotBodies(max_size=10, settings=SETTINGS)
+    serialized: list[str] = []
+
+    def serialize(version: str) -> Callable[[], bytes]:
+        def create() -> bytes:
+            serialized.append(version)
+            return version.encode()
+
+        return create
+
+    first = bodies.get("v1", serialize("v1"))
+
+    assert bodies.get("v1", serialize("v1")) is first
+    assert bodies.get("v2", serialize("v2")).body == b"v2"
+    assert serialized == ["v1", "v2"]
+
+
+def test_snapshot_response_sends_the_serialized_body() -> None:
+    body = PrecompressedBody(LARGE_BODY.encode(), SETTINGS)
+
+    plain = snapshot_response(body, None, "v1")
+    compressed = snapshot_response(body, "gzip", "v1")
+
+    assert isinstance(plain, RawJSONResponse)
+    assert plain.body is body.body
+    assert plain.headers["Content-Type"] == "application/json"
+    assert plain.headers["ETag"] == '"v1"'
+    assert "Content-Encoding" not in plain.headers
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.headers["ETag"] == '"v1-gzip"'
+    assert gzip.decompress(compressed.body) == body.body
+
+
+@pytest.mark.parametrize("if_none_match", ['"v1"', '"v1-gzip"', 'W/"v1-br"'])
+def test_snapshot_response_matches_the_tag_of_any_encoding(if_none_match: str) -> None:
+    body = PrecompressedBody(LARGE_BODY.encode(), SETTINGS)
+
+    response = snapshot_response(body, "br", "v1", if_none_match)
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == '"v1-br"'
+    assert snapshot_response(body, "br", "v2", if_none_match).status_code == 200
+
+
+def test_raw_json_response_requires_bytes() -> None:
+    with pytest.raises(TypeError):
+        RawJSONResponse({"not": "serialized"})
+
+
+def create_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, settings=SETTINGS)
+
+    @app.get("/large")
+    async def large() -> PlainTextResponse:
+        return PlainTextResponse(LARGE_BODY, headers={"ETag": '"v1"'})
+
+    @app.get("/small")
+    async def small() -> PlainTextResponse:
+        return PlainTextResponse("ok")
+
+    @app.get("/precompressed")
+    async def precompressed() -> PlainTextResponse:
+        return PlainTextResponse(
+            gzip.compress(LARGE_BODY.encode()), headers={"Content-Encoding": "gzip"}
+        )
+
+    @app.get("/stream")
+    async def stream() -> StreamingResponse:
+        async def lines():  # type: ignore[no-untyped-def]
+            yield LARGE_BODY
+            yield LARGE_BODY
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    return app
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br"])
+async def test_middleware_compresses_large_responses(encoding: str) -> None:
+    async with AsyncClient(
+        transport=ASGITransport(app=cast(Callable, create_app())), base_url="http://test"
+    ) as ac:
+        response = await ac.get("/large", headers={"Accept-Encoding": encoding})
+
+    assert response.headers["Content-Encoding"] == encoding
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.headers["ETag"] == f'"v1-{encoding}"'
+    assert int(response.headers["Content-Length"]) < len(LARGE_BODY)
+    assert response.text == LARGE_BODY
+
+
+@pytest.mark.parametrize(
+    "path, accept_encoding",
+    [("/small", "gzip"), ("/large", "identity"), ("/stream", "gzip")],
+)
+async def test_middleware_leaves_responses_uncompressed(path: str, accept_encoding: str) -> None:
+    async with AsyncClient(
+        transport=ASGITransport(app=cast(Callable, create_app())), base_url="http://test"
+    ) as ac:
+        response = await ac.get(path, headers={"Accept-Encoding": accept_encoding})
+
+    assert "Content-Encoding" not in response.headers
+
+
+async def test_middleware_does_not_compress_twice() -> None:
+    async with AsyncClient(
+        transport=ASGITransport(app=cast(Callable, create_app())), base_url="http://test"
+    ) as ac:
+        response = await ac.get("/precompressed", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.text == LARGE_BODY
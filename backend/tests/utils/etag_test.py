@@ -0,0 +1,39 @@
+"""
+Entity tag tests
+"""
+
+import pytest
+from app.utils.etag import encoded_etag, etag_matches, make_etag, not_modified
+
+
+@pytest.mark.parametrize(
+    "if_none_match, expected",
+    [
+        (None, False),
+        ("", False),
+        ('"v1"', True),
+        ('W/"v1"', True),
+        ('"v0", "v1"', True),
+        ('"v1-gzip"', True),
+        ('W/"v1-br"', True),
+        ('"v2-br"', False),
+        ("*", True),
+        ('"v2"', False),
+    ],
+)
+def test_etag_matches_if_none_match(if_none_match: str | None, expected: bool) -> None:
+    assert etag_matches(if_none_match, make_etag("v1")) is expected
+
+
+def test_compressed_variants_have_their_own_tag() -> None:
+    assert make_etag("v1", "br") == '"v1-br"'
+    assert encoded_etag('"v1"', "gzip") == '"v1-gzip"'
+    assert encoded_etag('W/"v1"', "gzip") == 'W/"v1"'
+
+
+def test_not_modified_has_no_body() -> None:
+    response = not_modified(make_etag("v1"))
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == '"v1"'
+    assert response.body == b""
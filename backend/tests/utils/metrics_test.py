@@ -0,0 +1,145 @@
+"""
+Prometheus metrics tests
+"""
+
+from typing import Callable, Iterator, cast
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport, ConnectError, MockTransport, Request, Response
+from prometheus_client import REGISTRY
+from app.config import settings
+from app.dependencies.http_client import http_request, reset_circuit_breakers
+from app.utils.cache import LRUCache
+from app.utils.metrics import MetricsMiddleware, UNMATCHED_ROUTE, render_metrics
+
+pytestmark = pytest.mark.anyio
+
+config = settings()
+
+
+@pytest.fixture(autouse=True)
+def clear_circuit_breakers() -> Iterator[None]:
+    reset_circuit_breakers()
+    yield
+    reset_circuit_breakers()
+
+
+def sample(name: str, **labels: str) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def create_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics-test/users/{user_id}")
+    async def get_user(user_id: str) -> dict[str, str]:
+        return {"id": user_id}
+
+    return app
+
+
+async def test_requests_are_recorded_by_route_template() -> None:
+    """
+    Test that requests to the same route share a series, whatever the path parameters.
+    """
+    route = "/metrics-test/users/{user_id}"
+    before = sample(
+        "devportal_request_duration_seconds_count", method="GET", route=route, status="200"
+    )
+    unmatched_before = sample(
+        "devportal_request_duration_seconds_count",
+        method="GET",
+        route=UNMATCHED_ROUTE,
+        status="404",
+    )
+
+    async with AsyncClient(
+        transport=ASGITransport(app=cast(Callable, create_app())), base_url="http://test"
+    ) as ac:
+        for user_id in ("a", "b"):
+            assert (await ac.get(f"/metrics-test/users/{user_id}")).status_code == 200
+        assert (await ac.get("/wp-login.php")).status_code == 404
+
+    assert (
+        sample("devportal_request_duration_seconds_count", method="GET", route=route, status="200")
+        == before + 2
+    )
+    assert (
+        sample(
+            "devportal_request_duration_seconds_count",
+            method="GET",
+            route=UNMATCHED_ROUTE,
+            status="404",
+        )
+        == unmatched_before + 1
+    )
+    assert sample("devportal_requests_in_progress", method="GET") == 0
+
+
+async def test_http_request_records_upstream_latency_and_errors() -> None:
+    """
+    Test that upstream calls are timed and that 5xx responses and transport errors are counted.
+    """
+    upstream = f"vault:{config.vault.instances[0].name}"
+    url = config.vault.instances[0].url
+
+    def handler(request: Request) -> Response:
+        if request.url.path == "/unreachable":
+            raise ConnectError("unreachable")
+        return Response(503 if request.url.path == "/fail" else 200)
+
+    calls_before = sample(
+        "devportal_upstream_request_duration_seconds_count", upstream=upstream, method="GET"
+    )
+    server_errors_before = sample(
+        "devportal_upstream_errors_total", upstream=upstream, reason="server_error"
+    )
+    transport_errors_before = sample(
+        "devportal_upstream_errors_total", upstream=upstream, reason="transport"
+    )
+
+    async with AsyncClient(transport=MockTransport(handler)) as client:
+        await http_request(client, "GET", f"{url}/ok")
+        await http_request(client, "GET", f"{url}/fail", valid_status_codes=(503,))
+        with pytest.raises(ConnectError):
+            await http_request(client, "GET", f"{url}/unreachable")
+
+    assert (
+        sample("devportal_upstream_request_duration_seconds_count", upstream=upstream, method="GET")
+        == calls_before + 3
+    )
+    assert (
+        sample("devportal_upstream_errors_total", upstream=upstream, reason="server_error")
+        == server_errors_before + 1
+    )
+    assert (
+        sample("devportal_upstream_errors_total", upstream=upstream, reason="transport")
+        == transport_errors_before + 1
+    )
+
+
+def test_named_cache_exports_its_events() -> None:
+    """
+    Test that hits, misses and evictions of a named cache are exported.
+    """
+    cache: LRUCache[int] = LRUCache(max_size=1, name="metrics_test")
+
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("b")
+    cache.set("b", 2)
+
+    for event in ("hit", "miss", "eviction"):
+        assert sample("devportal_cache_events_total", cache="metrics_test", event=event) == 1
+    assert cache.stats.as_dict() == {"hits": 1, "misses": 1, "refreshes": 0, "evictions": 1}
+
+
+def test_render_metrics_uses_the_prometheus_text_format() -> None:
+    """
+    Test that the metrics are rendered in the Prometheus text format.
+    """
+    body = render_metrics().decode()
+
+    assert "# TYPE devportal_request_duration_seconds histogram" in body
+    assert "# TYPE devportal_rollbacks_total counter" in body
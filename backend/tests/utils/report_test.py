@@ -0,0 +1,63 @@
+"""
+Operation report tests
+"""
+
+import asyncio
+import pytest
+from httpx import AsyncClient, HTTPStatusError, MockTransport, Request, Response
+from app.config import settings
+from app.dependencies.http_client import http_request, resolve_upstream
+from app.utils.report import mark_rolled_back, record_upstream_timing, track_operation
+
+pytestmark = pytest.mark.anyio
+
+config = settings()
+
+
+def test_resolve_upstream() -> None:
+    """
+    Test that urls are resolved to the configured upstream names.
+    """
+    vault = config.vault.instances[0]
+    apisix = config.apisix.instances[0]
+
+    assert resolve_upstream(f"{vault.url}/v1/secret") == f"vault:{vault.name}"
+    assert resolve_upstream(f"{apisix.admin_url}/routes") == f"apisix:{apisix.name}"
+    assert resolve_upstream(f"{config.keycloak.url}/admin/realms") == "keycloak"
+    assert resolve_upstream("https://example.org/health") == "example.org"
+
+
+async def test_report_collects_timings_of_concurrent_tasks() -> None:
+    """
+    Test that tasks started within the operation add to the same report.
+    """
+
+    async def work() -> None:
+        record_upstream_timing("keycloak", 0.25)
+
+    with track_operation() as report:
+        await asyncio.gather(work(), work())
+        mark_rolled_back()
+
+    # Outside of an operation nothing is collected
+    record_upstream_timing("keycloak", 1)
+
+    assert report.timings_ms() == {"keycloak": 500.0}
+    assert report.rolled_back is True
+
+
+async def test_http_request_records_upstream_timing() -> None:
+    """
+    Test that requests are timed per upstream, also when they fail.
+    """
+
+    def handler(request: Request) -> Response:
+        return Response(500 if request.url.path == "/fail" else 200)
+
+    async with AsyncClient(transport=MockTransport(handler)) as client:
+        with track_operation() as report:
+            await http_request(client, "GET", f"{config.keycloak.url}/ok")
+            with pytest.raises(HTTPStatusError):
+                await http_request(client, "GET", "https://example.org/fail")
+
+    assert set(report.timings) == {"keycloak", "example.org"}
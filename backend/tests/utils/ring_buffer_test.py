@@ -0,0 +1,45 @@
+"""
+Probe history ring buffer tests
+"""
+
+import pytest
+from app.utils.ring_buffer import PROBE_DOWN, PROBE_UP, ProbeHistory, percentile
+
+
+def test_oldest_probes_are_overwritten_when_full() -> None:
+    history = ProbeHistory(capacity=3)
+
+    for second in range(5):
+        history.append(float(second), second / 10, PROBE_UP if second % 2 else PROBE_DOWN)
+
+    assert len(history) == 3
+    assert history.since(0) == ([0.2, 0.3, 0.4], [PROBE_DOWN, PROBE_UP, PROBE_DOWN])
+
+
+def test_since_returns_only_probes_in_window() -> None:
+    history = ProbeHistory(capacity=10)
+
+    for second in range(5):
+        history.append(float(second), second / 10, PROBE_UP)
+
+    assert history.since(3) == ([0.3, 0.4], [PROBE_UP, PROBE_UP])
+    assert history.since(10) == ([], [])
+
+
+def test_capacity_must_be_positive() -> None:
+    with pytest.raises(ValueError):
+        ProbeHistory(capacity=0)
+
+
+@pytest.mark.parametrize(
+    "share, expected",
+    [(0.5, 50.0), (0.95, 95.0), (0.99, 99.0), (0.0, 1.0), (1.0, 100.0)],
+)
+def test_percentile_uses_nearest_rank(share: float, expected: float) -> None:
+    values = [float(value) for value in range(1, 101)]
+
+    assert percentile(values, share) == expected
+
+
+def test_percentile_of_no_values_is_none() -> None:
+    assert percentile([], 0.5) is None
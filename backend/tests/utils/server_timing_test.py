@@ -0,0 +1,118 @@
+"""
+Server-Timing header tests
+"""
+
+import asyncio
+import logging
+from typing import Callable, cast
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport, MockTransport, Request, Response
+from app.config import ServerTimingSettings, settings
+from app.dependencies.http_client import http_request
+from app.utils.report import OperationReport, UpstreamCall, track_operation
+from app.utils.server_timing import (
+    ServerTimingMiddleware,
+    critical_path,
+    describe_critical_path,
+    server_timing_header,
+)
+
+pytestmark = pytest.mark.anyio
+
+config = settings()
+
+
+def test_server_timing_header_lists_upstreams_slowest_first() -> None:
+    """
+    Test that each upstream gets an entry with its call count and total duration.
+    """
+    report = OperationReport(
+        timings={"keycloak": 0.01, "vault:EWC": 0.05},
+        calls=[
+            UpstreamCall("keycloak", "GET", 0.0, 0.01),
+            UpstreamCall("vault:EWC", "GET", 0.01, 0.02),
+            UpstreamCall("vault:EWC", "POST", 0.03, 0.03),
+        ],
+    )
+
+    assert server_timing_header(report, 0.0625) == (
+        'vault_EWC;desc="vault:EWC, 2 calls";dur=50.0, '
+        'keycloak;desc="keycloak, 1 call";dur=10.0, '
+        "total;dur=62.5"
+    )
+
+
+def test_critical_path_follows_the_slowest_chain() -> None:
+    """
+    Test that calls overlapping a slower call of the same fan-out are left out of the path.
+    """
+    keycloak = UpstreamCall("keycloak", "GET", 0.0, 0.02)
+    vault_ewc = UpstreamCall("vault:EWC", "GET", 0.02, 0.03)
+    vault_ecmwf = UpstreamCall("vault:ECMWF", "GET", 0.02, 0.08)
+    apisix = UpstreamCall("apisix:EWC", "PUT", 0.1, 0.01)
+
+    path = critical_path([vault_ewc, keycloak, apisix, vault_ecmwf])
+
+    assert path == [keycloak, vault_ecmwf, apisix]
+    assert describe_critical_path(path) == (
+        "110.0 ms in keycloak GET 20.0 ms > vault:ECMWF GET 80.0 ms > apisix:EWC PUT 10.0 ms"
+    )
+    assert describe_critical_path([]) == "no upstream calls"
+
+
+async def test_nested_operations_add_calls_to_the_request() -> None:
+    """
+    Test that calls of an operation within the request are also in the request report.
+    """
+
+    def handler(_request: Request) -> Response:
+        return Response(200)
+
+    async with AsyncClient(transport=MockTransport(handler)) as client:
+        with track_operation() as request_report:
+            with track_operation() as operation_report:
+                await http_request(client, "GET", f"{config.keycloak.url}/users")
+            await http_request(client, "POST", f"{config.keycloak.url}/groups")
+
+    assert [call.method for call in operation_report.calls] == ["GET"]
+    assert [call.method for call in request_report.calls] == ["GET", "POST"]
+    assert set(request_report.timings) == {"keycloak"}
+
+
+async def test_middleware_adds_server_timing_header(caplog: pytest.LogCaptureFixture) -> None:
+    """
+    Test that the upstream calls made by a handler end up in the Server-Timing header
+    and in the critical path log line.
+    """
+
+    def handler(_request: Request) -> Response:
+        return Response(200)
+
+    app = FastAPI()
+    app.add_middleware(
+        ServerTimingMiddleware, settings=ServerTimingSettings(log_critical_path=True)
+    )
+
+    @app.get("/fan-out")
+    async def fan_out() -> dict[str, str]:
+        async with AsyncClient(transport=MockTransport(handler)) as client:
+            await asyncio.gather(
+                *(
+                    http_request(client, "GET", f"{instance.url}/v1/health")
+                    for instance in config.vault.instances
+                )
+            )
+        return {"message": "OK"}
+
+    with caplog.at_level(logging.DEBUG):
+        async with AsyncClient(
+            transport=ASGITransport(app=cast(Callable, app)), base_url="http://test"
+        ) as ac:
+            response = await ac.get("/fan-out")
+
+    server_timing = response.headers["Server-Timing"]
+    for instance in config.vault.instances:
+        assert f'vault_{instance.name};desc="vault:{instance.name}, 1 call"' in server_timing
+    assert "total;dur=" in server_timing
+    assert any("GET /fan-out took" in record.getMessage() for record in caplog.records)
@@ -0,0 +1,73 @@
+"""
+Single-flight tests
+"""
+
+import asyncio
+import pytest
+from app.utils.singleflight import SingleFlight
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_concurrent_calls_share_one_result() -> None:
+    """
+    Test that concurrent calls with the same key run the function once.
+    """
+    single_flight: SingleFlight[int] = SingleFlight()
+    calls: list[str] = []
+
+    async def work(key: str) -> int:
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    results = await asyncio.gather(
+        *(single_flight.do("a", work, "a") for _ in range(5)), single_flight.do("b", work, "b")
+    )
+
+    assert results == [2, 2, 2, 2, 2, 2]
+    assert calls == ["a", "b"]
+    assert len(single_flight) == 0
+
+
+async def test_exception_is_shared_and_next_call_runs_again() -> None:
+    """
+    Test that an exception reaches every caller and the key is released afterwards.
+    """
+    single_flight: SingleFlight[int] = SingleFlight()
+    calls = 0
+
+    async def work() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        if calls == 1:
+            raise ValueError("boom")
+        return calls
+
+    results = await asyncio.gather(
+        single_flight.do("a", work), single_flight.do("a", work), return_exceptions=True
+    )
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert await single_flight.do("a", work) == 2
+
+
+async def test_cancelled_caller_does_not_cancel_shared_call() -> None:
+    """
+    Test that cancelling one caller leaves the call running for the others.
+    """
+    single_flight: SingleFlight[str] = SingleFlight()
+
+    async def work() -> str:
+        await asyncio.sleep(0.05)
+        return "done"
+
+    first = asyncio.create_task(single_flight.do("a", work))
+    second = asyncio.create_task(single_flight.do("a", work))
+    await asyncio.sleep(0.01)
+    first.cancel()
+
+    assert await second == "done"
+    with pytest.raises(asyncio.CancelledError):
+        await first
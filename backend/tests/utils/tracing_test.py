@@ -0,0 +1,139 @@
+"""
+Request tracing tests
+"""
+
+import asyncio
+import secrets
+import pytest
+from httpx import AsyncClient, MockTransport, Request, Response
+from app.config import settings
+from app.dependencies.http_client import http_request
+from app.utils.tracing import (
+    Span,
+    Trace,
+    TraceBuffer,
+    new_span_id,
+    parse_traceparent,
+    span,
+    trace_request,
+    traced,
+)
+
+pytestmark = pytest.mark.anyio
+
+config = settings()
+
+
+@traced
+async def save_user(delay: float) -> str:
+    await asyncio.sleep(delay)
+    return "saved"
+
+
+@pytest.mark.parametrize(
+    "traceparent, expected",
+    [
+        (
+            "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01",
+            ("0af7651916cd43dd8448eb211c80319c", "b7ad6b7169203331"),
+        ),
+        (None, None),
+        ("00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331", None),
+        ("00-00000000000000000000000000000000-b7ad6b7169203331-01", None),
+        ("00-0AF7651916CD43DD8448EB211C80319C-B7AD6B7169203331-01", None),
+    ],
+)
+def test_parse_traceparent(traceparent: str | None, expected: tuple[str, str] | None) -> None:
+    assert parse_traceparent(traceparent) == expected
+
+
+async def test_spans_of_concurrent_tasks_share_the_parent() -> None:
+    """
+    Test that functions run with asyncio.gather get the span they were started in as parent.
+    """
+    buffer = TraceBuffer(capacity=10, slow_threshold=0)
+
+    with trace_request("POST /apikey", None, 100, buffer) as (trace, root):
+        with span("fan-out", instances=2) as fan_out:
+            assert await asyncio.gather(save_user(0.01), save_user(0)) == ["saved", "saved"]
+
+    assert fan_out is not None
+    assert buffer.slowest() == [trace]
+    assert [child.name for child in trace.spans] == [
+        "tracing_test.save_user",
+        "tracing_test.save_user",
+        "fan-out",
+    ]
+    assert [child.parent_id for child in trace.spans] == [
+        fan_out.span_id,
+        fan_out.span_id,
+        root.span_id,
+    ]
+    assert fan_out.attributes == {"instances": 2}
+
+
+async def test_failed_spans_record_the_error() -> None:
+    """
+    Test that the exception a span fails with is recorded and that nothing is recorded
+    outside of a trace.
+    """
+    buffer = TraceBuffer(capacity=10, slow_threshold=0)
+
+    with span("outside") as outside:
+        assert outside is None
+    assert await save_user(0) == "saved"
+
+    with pytest.raises(ValueError):
+        with trace_request("GET /routes", None, 100, buffer) as (trace, root):
+            with span("parse"):
+                raise ValueError("invalid")
+
+    assert trace.spans[0].error == "ValueError"
+    assert root.error == "ValueError"
+
+
+def test_trace_buffer_keeps_recent_slow_traces() -> None:
+    """
+    Test that only slow traces are kept, at most `capacity`, and are returned slowest first.
+    """
+    buffer = TraceBuffer(capacity=2, slow_threshold=0.5)
+
+    for seconds in (0.1, 0.6, 0.9, 0.7):
+        root = Span(new_span_id(), None, "GET /apikey", 0.0, seconds=seconds)
+        buffer.export(Trace(secrets.token_hex(16), 0.0, root, max_spans=100))
+
+    assert len(buffer) == 2
+    assert [trace.seconds for trace in buffer.slowest()] == [0.9, 0.7]
+    assert [trace.seconds for trace in buffer.slowest(min_seconds=0.8)] == [0.9]
+    assert [trace.seconds for trace in buffer.slowest(limit=1)] == [0.9]
+
+
+async def test_trace_is_propagated_to_configured_upstreams_only() -> None:
+    """
+    Test that Vault, APISIX and Keycloak get the traceparent of the http_request span
+    and that spans beyond `max_spans` are only counted.
+    """
+    traceparents: dict[str, str | None] = {}
+
+    def handler(request: Request) -> Response:
+        traceparents[request.url.host] = request.headers.get("traceparent")
+        return Response(200)
+
+    buffer = TraceBuffer(capacity=10, slow_threshold=0)
+
+    async with AsyncClient(transport=MockTransport(handler)) as client:
+        with trace_request("GET /health", None, 1, buffer) as (trace, _root):
+            await http_request(client, "GET", f"{config.keycloak.url}/realms")
+            await http_request(client, "GET", "https://example.org/health")
+
+    request_span = trace.spans[0]
+    keycloak_host = next(host for host in traceparents if host != "example.org")
+
+    assert request_span.attributes == {
+        "upstream": "keycloak",
+        "method": "GET",
+        "status_code": 200,
+    }
+    assert traceparents[keycloak_host] == f"00-{trace.trace_id}-{request_span.span_id}-01"
+    assert traceparents["example.org"] is None
+    assert trace.dropped_spans == 1
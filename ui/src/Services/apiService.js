@@ -39,6 +39,7 @@ async function httpRequest(path, options, retryCount = 0) {
     method: options.method,
     headers,
     body,
+    signal: options.signal,
   });
 
   if (response.status === 401) {
@@ -82,3 +83,40 @@ export async function getServiceStatus() {
 
   return { data, isError: !response.ok };
 }
+
+// Server-sent events are read with fetch, EventSource cannot send the Authorization header
+export async function streamServiceStatus(onStatus, signal) {
+  const response = await httpRequest('/status/stream', {
+    method: 'GET',
+    headers: { Accept: 'text/event-stream' },
+    signal,
+  });
+
+  if (!response.ok || !response.body) {
+    throw new Error('Failed to open service status stream');
+  }
+
+  const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = '';
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) {
+      return;
+    }
+
+    // Events are separated by a blank line, comment lines are only sent as heartbeats
+    buffer += value;
+    const events = buffer.split('\n\n');
+    buffer = events.pop();
+    for (const event of events) {
+      const data = event
+        .split('\n')
+        .filter((line) => line.startsWith('data:'))
+        .map((line) => line.slice(5).trimStart())
+        .join('\n');
+      if (data) {
+        onStatus(JSON.parse(data));
+      }
+    }
+  }
+}
@@ -2,7 +2,7 @@
 import React, { useState, useEffect, useCallback } from 'react';
 import { Card } from 'primereact/card';
 import { Tag } from 'primereact/tag';
-import { getServiceStatus } from '../Services/apiService';
+import { getServiceStatus, streamServiceStatus } from '../Services/apiService';
 import './ServiceStatus.css';
 
 const severityMap = {
@@ -17,14 +17,18 @@ const labelMap = {
   down: 'Down',
 };
 
+// Seconds to wait before reconnecting to the status stream, the status is polled meanwhile
 const POLL_INTERVAL = 30;
+// Seconds to wait before reconnecting after the stream ended, e.g. the access token expired
+const RECONNECT_DELAY = 1;
 
 const cardFooter = (
   <div className="status-card-footer">
     <h3 className="footer-title">About Service Status</h3>
 
     <p className="footer-text">
-      {`Status Dashboard shows the current availability of MeteoGate services. Status is automatically refreshed every ${POLL_INTERVAL} seconds.`}
+      Status Dashboard shows the current availability of MeteoGate services. Status is automatically updated as soon as
+      it changes.
     </p>
 
     <h4 className="footer-subtitle">Status Indicators</h4>
@@ -79,9 +83,38 @@ const ServiceStatus = () => {
   }, []);
 
   useEffect(() => {
-    fetchStatus();
-    const interval = setInterval(fetchStatus, POLL_INTERVAL * 1000);
-    return () => clearInterval(interval);
+    const controller = new AbortController();
+    let reconnectTimeout;
+
+    const onStatus = (data) => {
+      setStatus(data);
+      setError(null);
+      setLastUpdated(new Date());
+      setLoading(false);
+    };
+
+    const connect = async () => {
+      let delay = RECONNECT_DELAY;
+      try {
+        await streamServiceStatus(onStatus, controller.signal);
+      } catch {
+        if (controller.signal.aborted) {
+          return;
+        }
+        // Fall back to polling until the stream is available again
+        await fetchStatus();
+        delay = POLL_INTERVAL;
+      }
+      if (!controller.signal.aborted) {
+        reconnectTimeout = setTimeout(connect, delay * 1000);
+      }
+    };
+
+    connect();
+    return () => {
+      controller.abort();
+      clearTimeout(reconnectTimeout);
+    };
   }, [fetchStatus]);
 
   const formatTime = (date) => {